@@ -5,15 +5,31 @@ Import this module to add the validation tween to your pyramid app.
 from __future__ import absolute_import
 
 import pyramid
+from pyramid.events import ApplicationCreated
+from pyramid.settings import asbool
 
 from pyramid_swagger.api import build_swagger_20_swagger_schema_views
 from pyramid_swagger.api import register_api_doc_endpoints
+from pyramid_swagger.artifact import load_compiled_artifact
+from pyramid_swagger.bulk import validate_many  # noqa: F401
+from pyramid_swagger.cache import build_request_cache
+from pyramid_swagger.codegen import compile_swagger_20_spec
+from pyramid_swagger.codegen import get_validation_backend
+from pyramid_swagger.codegen import VALIDATION_BACKEND_COMPILED
 from pyramid_swagger.ingest import get_swagger_schema
 from pyramid_swagger.ingest import get_swagger_spec
+from pyramid_swagger.offload import build_offload_pool
+from pyramid_swagger.profiling import build_startup_profiler
+from pyramid_swagger.profiling import startup_phase
+from pyramid_swagger.reload import build_spec_reloader
+from pyramid_swagger.renderer import build_streaming_renderer_factory
 from pyramid_swagger.renderer import PyramidSwaggerRendererFactory
+from pyramid_swagger.stats import build_stats_endpoint
+from pyramid_swagger.stats import build_validation_stats
 from pyramid_swagger.tween import get_swagger_versions
 from pyramid_swagger.tween import SWAGGER_12
 from pyramid_swagger.tween import SWAGGER_20
+from pyramid_swagger.warmup import start_warm_up_thread
 
 
 def includeme(config):
@@ -21,6 +37,19 @@ def includeme(config):
     :type config: :class:`pyramid.config.Configurator`
     """
     settings = config.registry.settings
+    profiler = build_startup_profiler(settings)
+    settings['pyramid_swagger.startup_profiler'] = profiler
+
+    with startup_phase(settings, 'includeme'):
+        _include_swagger(config, settings)
+
+    if profiler:
+        settings['pyramid_swagger.startup_profile'] = profiler.finish()
+        # Specs reloaded later on are not part of the startup
+        settings['pyramid_swagger.startup_profiler'] = None
+
+
+def _include_swagger(config, settings):
     swagger_versions = get_swagger_versions(settings)
 
     # for rendering /swagger.yaml
@@ -32,29 +61,70 @@ def includeme(config):
     # tween and `register_api_doc_endpoints`
     settings['pyramid_swagger.schema12'] = None
     settings['pyramid_swagger.schema20'] = None
+    settings['pyramid_swagger.schema20_artifact'] = None
+    settings['pyramid_swagger.spec_reloader'] = None
+    settings['pyramid_swagger.request_cache'] = None
+    settings['pyramid_swagger.stats'] = None
+    settings['pyramid_swagger.offload_pool'] = None
 
     # Store under two keys so that 1.2 and 2.0 can co-exist.
     if SWAGGER_12 in swagger_versions:
-        settings['pyramid_swagger.schema12'] = get_swagger_schema(settings)
+        with startup_phase(settings, 'get_swagger_schema'):
+            settings['pyramid_swagger.schema12'] = get_swagger_schema(settings)
 
     if SWAGGER_20 in swagger_versions:
-        settings['pyramid_swagger.schema20'] = get_swagger_spec(settings)
+        if settings.get('pyramid_swagger.compiled_artifact'):
+            with startup_phase(settings, 'load_compiled_artifact'):
+                artifact = load_compiled_artifact(settings)
+            settings['pyramid_swagger.schema20_artifact'] = artifact
+            settings['pyramid_swagger.schema20'] = artifact.spec
+        else:
+            reloader = build_spec_reloader(settings)
+            settings['pyramid_swagger.spec_reloader'] = reloader
+            with startup_phase(settings, 'get_swagger_spec'):
+                settings['pyramid_swagger.schema20'] = get_swagger_spec(
+                    settings,
+                    file_loader=reloader.file_loader if reloader else None,
+                )
+
+        if get_validation_backend(settings) == VALIDATION_BACKEND_COMPILED:
+            with startup_phase(settings, 'compile_swagger_20_spec'):
+                compile_swagger_20_spec(settings['pyramid_swagger.schema20'])
+
+        settings['pyramid_swagger.request_cache'] = build_request_cache(settings)
+        settings['pyramid_swagger.stats'] = build_validation_stats(settings)
+        settings['pyramid_swagger.offload_pool'] = build_offload_pool(
+            settings, settings['pyramid_swagger.schema20'])
 
     config.add_tween(
         "pyramid_swagger.tween.validation_tween_factory",
         under=pyramid.tweens.EXCVIEW
     )
 
-    config.add_renderer('pyramid_swagger', PyramidSwaggerRendererFactory())
+    config.add_renderer('pyramid_swagger', PyramidSwaggerRendererFactory(
+        fused=asbool(settings.get('pyramid_swagger.fused_renderer', False)),
+    ))
+    config.add_renderer(
+        'pyramid_swagger_stream', build_streaming_renderer_factory(settings))
+
+    config.add_subscriber(start_warm_up_thread, ApplicationCreated)
 
     if settings.get('pyramid_swagger.enable_api_doc_views', True):
         if SWAGGER_12 in swagger_versions:
-            register_api_doc_endpoints(
-                config,
-                settings['pyramid_swagger.schema12'].get_api_doc_endpoints())
+            with startup_phase(settings, 'register 1.2 api doc views'):
+                register_api_doc_endpoints(
+                    config,
+                    settings['pyramid_swagger.schema12'].get_api_doc_endpoints())
 
         if SWAGGER_20 in swagger_versions:
-            register_api_doc_endpoints(
-                config,
-                build_swagger_20_swagger_schema_views(config),
-                base_path=settings.get('pyramid_swagger.base_path_api_docs', ''))
+            with startup_phase(settings, 'register 2.0 api doc views'):
+                register_api_doc_endpoints(
+                    config,
+                    build_swagger_20_swagger_schema_views(config),
+                    base_path=settings.get('pyramid_swagger.base_path_api_docs', ''))
+
+    if settings['pyramid_swagger.stats'] is not None:
+        register_api_doc_endpoints(
+            config,
+            [build_stats_endpoint(settings['pyramid_swagger.stats'])],
+            base_path=settings.get('pyramid_swagger.base_path_api_docs', ''))
@@ -10,12 +10,20 @@ import os.path
 import simplejson
 import yaml
 from bravado_core.spec import strip_xscope
+from pyramid.settings import asbool
 from six.moves.urllib.parse import urlparse
 from six.moves.urllib.parse import urlunparse
 from six.moves.urllib.request import pathname2url
 
+from pyramid_swagger.compaction import compact
+from pyramid_swagger.compaction import log_compaction
 from pyramid_swagger.model import PyramidEndpoint
 
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:  # pragma: no cover
+    from yaml import SafeDumper
+
 
 # TODO: document that this is now a public interface
 def register_api_doc_endpoints(config, endpoints, base_path='/api-docs'):
@@ -233,12 +241,15 @@ class YamlRendererFactory(object):
     def __call__(self, value, system):
         response = system['request'].response
         response.headers['Content-Type'] = 'application/x-yaml; charset=UTF-8'
-        return yaml.safe_dump(value).encode('utf-8')
+        return yaml.dump(value, Dumper=SafeDumper).encode('utf-8')
 
 
 def build_swagger_20_swagger_schema_views(config):
     settings = config.registry.settings
-    if settings.get('pyramid_swagger.dereference_served_schema'):
+    artifact = settings.get('pyramid_swagger.schema20_artifact')
+    if artifact:
+        views = _build_precompiled_swagger_20_schema_views(artifact.api_docs)
+    elif settings.get('pyramid_swagger.dereference_served_schema'):
         views = _build_dereferenced_swagger_20_schema_views(config)
     else:
         views = _build_swagger_20_schema_views(config)
@@ -251,6 +262,9 @@ def _build_dereferenced_swagger_20_schema_views(config):
         resolved_dict = settings.get('pyramid_swagger.schema20_resolved')
         if not resolved_dict:
             resolved_dict = settings['pyramid_swagger.schema20'].flattened_spec
+            if asbool(settings.get('pyramid_swagger.compact_spec', False)):
+                log_compaction('dereferenced swagger 2.0 spec',
+                               compact([resolved_dict]))
             settings['pyramid_swagger.schema20_resolved'] = resolved_dict
         return resolved_dict
 
@@ -265,12 +279,33 @@ def _build_dereferenced_swagger_20_schema_views(config):
         )
 
 
+def _build_precompiled_swagger_20_schema_views(api_docs):
+    """
+    :param api_docs: (path, route_name, schema_format, payload) tuples as
+        stored in a :class:`pyramid_swagger.artifact.CompiledArtifact`
+    :rtype: iterable of :class:`pyramid_swagger.model.PyramidEndpoint`
+    """
+    for path, route_name, schema_format, payload in api_docs:
+        yield PyramidEndpoint(
+            path=path,
+            route_name=route_name,
+            view=build_swagger_20_precompiled_view(payload),
+            renderer=schema_format,
+        )
+
+
+def build_swagger_20_precompiled_view(payload):
+    """Serve a spec document rendered at compile time, without touching the
+    resolver at request time.
+    """
+    def view_for_swagger_schema(request):
+        return payload
+    return view_for_swagger_schema
+
+
 def _build_swagger_20_schema_views(config):
     spec = config.registry.settings['pyramid_swagger.schema20']
 
-    walker = NodeWalkerForRefFiles()
-    all_files = walker.walk(spec)
-
     file_map = {}
 
     def view_for_swagger_schema(request):
@@ -284,11 +319,31 @@ def _build_swagger_20_schema_views(config):
 
         actual_fname = file_map[key_path]
 
-        with spec.resolver.resolving(actual_fname) as spec_dict:
-            clean_response = strip_xscope(spec_dict)
-            ref_walker = NodeWalkerForCleaningRefs()
-            fixed_spec = ref_walker.walk(clean_response, ext)
-            return fixed_spec
+        # Not `spec`: the spec is replaced when `pyramid_swagger.reload_spec`
+        # is enabled
+        current_spec = config.registry.settings['pyramid_swagger.schema20']
+        return resolve_swagger_20_schema_file(current_spec, actual_fname, ext)
+
+    for path, route_name, ref_fname, schema_format in \
+            iter_swagger_20_schema_files(spec):
+        file_map[path] = ref_fname
+        yield PyramidEndpoint(
+            path=path,
+            route_name=route_name,
+            view=view_for_swagger_schema,
+            renderer=schema_format,
+        )
+
+
+def iter_swagger_20_schema_files(spec):
+    """Find every file making up a Swagger 2.0 spec, and the api doc path
+    each of them is served from.
+
+    :type spec: :class:`bravado_core.spec.Spec`
+    :returns: iterable of (path, route_name, ref_fname, schema_format) tuples
+    """
+    walker = NodeWalkerForRefFiles()
+    all_files = walker.walk(spec)
 
     for ref_fname in all_files:
         ref_fname_parts = os.path.splitext(pathname2url(ref_fname))
@@ -296,10 +351,19 @@ def _build_swagger_20_schema_views(config):
             route_name = 'pyramid_swagger.swagger20.api_docs.{0}.{1}'\
                 .format(ref_fname.replace('/', '.'), schema_format)
             path = '/{0}.{1}'.format(ref_fname_parts[0], schema_format)
-            file_map[path] = ref_fname
-            yield PyramidEndpoint(
-                path=path,
-                route_name=route_name,
-                view=view_for_swagger_schema,
-                renderer=schema_format,
-            )
+            yield path, route_name, ref_fname, schema_format
+
+
+def resolve_swagger_20_schema_file(spec, ref_fname, schema_format):
+    """Return the content of a single Swagger 2.0 spec file, with x-scope
+    metadata removed and relative refs pointing at `schema_format` files.
+
+    :type spec: :class:`bravado_core.spec.Spec`
+    :param ref_fname: file name relative to the root spec file
+    :param schema_format: 'yaml' or 'json'
+    :rtype: dict
+    """
+    with spec.resolver.resolving(ref_fname) as spec_dict:
+        clean_response = strip_xscope(spec_dict)
+        ref_walker = NodeWalkerForCleaningRefs()
+        return ref_walker.walk(clean_response, schema_format)
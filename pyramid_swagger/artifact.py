@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+Compile a Swagger 2.0 spec ahead of time into a single deployable artifact.
+
+Building a :class:`bravado_core.spec.Spec` means reading every spec file,
+resolving `$ref`s and running the spec validator. Doing that once at build
+time, and loading the result in every worker, lets broken specs fail the build
+and keeps worker startup cheap.
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+
+import argparse
+import hashlib
+import os
+import pickle
+import sys
+from collections import namedtuple
+from importlib.metadata import version
+
+from jsonschema import FormatChecker
+from pyramid.settings import asbool
+from six import iteritems
+
+from pyramid_swagger.__about__ import __version__
+from pyramid_swagger.api import iter_swagger_20_schema_files
+from pyramid_swagger.api import NodeWalkerForRefFiles
+from pyramid_swagger.api import resolve_swagger_20_schema_file
+from pyramid_swagger.ingest import create_bravado_core_config
+from pyramid_swagger.ingest import get_swagger_spec
+
+
+ARTIFACT_FORMAT_VERSION = 1
+
+# bravado-core config keys which do not change the compiled spec
+_UNCHECKED_CONFIG_KEYS = ('formats', 'validate_swagger_spec')
+
+
+class CompiledArtifactError(Exception):
+    pass
+
+
+CompiledArtifact = namedtuple(
+    'CompiledArtifact',
+    'format_version pyramid_swagger_version fingerprint spec api_docs')
+
+
+def _hash_file(path):
+    try:
+        with open(path, 'rb') as spec_file:
+            return hashlib.sha256(spec_file.read()).hexdigest()
+    except IOError:
+        return None
+
+
+def get_artifact_fingerprint(settings, spec_files=()):
+    """Return what a compiled artifact depends on: the settings, the
+    versions of the libraries whose objects are pickled in it, and the
+    contents of the spec files. An artifact can only be loaded by an
+    application with the same fingerprint.
+
+    :type settings: dict
+    :param spec_files: names of the spec files, relative to the schema
+        directory
+    :rtype: dict
+    """
+    bravado_core_config = dict(
+        (key, value)
+        for key, value in iteritems(create_bravado_core_config(settings))
+        if key not in _UNCHECKED_CONFIG_KEYS
+    )
+    schema_directory = settings.get(
+        'pyramid_swagger.schema_directory', 'api_docs/')
+    return {
+        'bravado_core_config': bravado_core_config,
+        'dereference_served_schema': asbool(settings.get(
+            'pyramid_swagger.dereference_served_schema', False)),
+        'dereference_schemas': asbool(settings.get(
+            'pyramid_swagger.dereference_schemas', False)),
+        'compact_spec': asbool(settings.get(
+            'pyramid_swagger.compact_spec', False)),
+        'schema_directory': schema_directory,
+        'schema_file': settings.get(
+            'pyramid_swagger.schema_file', 'swagger.json'),
+        'versions': {
+            'pyramid_swagger': __version__,
+            'bravado-core': version('bravado-core'),
+            'jsonschema': version('jsonschema'),
+        },
+        'spec_files': dict(
+            (spec_file, _hash_file(os.path.join(schema_directory, spec_file)))
+            for spec_file in spec_files
+        ),
+    }
+
+
+def build_api_docs(spec, dereference_served_schema):
+    """Render every api doc payload served for `spec`.
+
+    :type spec: :class:`bravado_core.spec.Spec`
+    :rtype: list of (path, route_name, schema_format, payload) tuples
+    """
+    if dereference_served_schema:
+        return [
+            (
+                '/swagger.{0}'.format(schema_format),
+                'pyramid_swagger.swagger20.api_docs.{0}'.format(schema_format),
+                schema_format,
+                spec.flattened_spec,
+            )
+            for schema_format in ['yaml', 'json']
+        ]
+
+    return [
+        (
+            path,
+            route_name,
+            schema_format,
+            resolve_swagger_20_schema_file(spec, ref_fname, schema_format),
+        )
+        for path, route_name, ref_fname, schema_format
+        in sorted(iter_swagger_20_schema_files(spec))
+    ]
+
+
+def compile_artifact(settings):
+    """Build, validate and render the Swagger 2.0 spec described by
+    `settings`.
+
+    :type settings: dict
+    :rtype: :class:`CompiledArtifact`
+    """
+    spec = get_swagger_spec(settings)
+    fingerprint = get_artifact_fingerprint(
+        settings, sorted(NodeWalkerForRefFiles().walk(spec)))
+
+    # Build the (http_method, path) -> operation index so it is shipped too
+    spec.get_op_for_request('get', '')
+
+    api_docs = build_api_docs(spec, fingerprint['dereference_served_schema'])
+
+    # User-defined formats hold arbitrary callables. They are registered again
+    # from the settings of the application loading the artifact.
+    spec.config = dict(spec.config, formats=[])
+    spec.user_defined_formats = {}
+    spec.format_checker = FormatChecker()
+
+    return CompiledArtifact(
+        format_version=ARTIFACT_FORMAT_VERSION,
+        pyramid_swagger_version=__version__,
+        fingerprint=fingerprint,
+        spec=spec,
+        api_docs=api_docs,
+    )
+
+
+def write_artifact(artifact, path):
+    """
+    :type artifact: :class:`CompiledArtifact`
+    :param path: file to write the artifact to
+    """
+    with open(path, 'wb') as artifact_file:
+        pickle.dump(
+            dict(artifact._asdict()),
+            artifact_file,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+
+
+def read_artifact(path):
+    """
+    :param path: file written by :func:`write_artifact`
+    :rtype: :class:`CompiledArtifact`
+    :raises: CompiledArtifactError when the artifact is missing or was
+        written by an incompatible version of pyramid_swagger.
+    """
+    try:
+        with open(path, 'rb') as artifact_file:
+            data = pickle.load(artifact_file)
+    except IOError:
+        raise CompiledArtifactError(
+            'No compiled artifact found at {0}. Did you run '
+            'pyramid-swagger-compile?'.format(path))
+
+    if data.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        raise CompiledArtifactError(
+            '{0} was compiled with an incompatible pyramid_swagger version '
+            '({1}). Please recompile it.'.format(
+                path, data.get('pyramid_swagger_version')))
+
+    return CompiledArtifact(**data)
+
+
+def load_compiled_artifact(settings):
+    """Load the artifact configured by `pyramid_swagger.compiled_artifact`
+    and make it ready to be used by the application.
+
+    :type settings: dict
+    :rtype: :class:`CompiledArtifact`
+    :raises: CompiledArtifactError when the artifact does not match
+        `settings`, the installed libraries or the spec files.
+    """
+    path = settings['pyramid_swagger.compiled_artifact']
+    artifact = read_artifact(path)
+
+    fingerprint = get_artifact_fingerprint(
+        settings, artifact.fingerprint.get('spec_files', {}))
+    mismatches = sorted(
+        key for key in set(fingerprint) | set(artifact.fingerprint)
+        if fingerprint.get(key) != artifact.fingerprint.get(key)
+    )
+    if mismatches:
+        raise CompiledArtifactError(
+            '{0} was compiled with different {1} than the current ones. '
+            'Please recompile it.'.format(path, ', '.join(mismatches)))
+
+    user_formats = settings.get('pyramid_swagger.user_formats') or []
+    artifact.spec.config['formats'] = user_formats
+    for user_format in user_formats:
+        artifact.spec.register_format(user_format)
+
+    return artifact
+
+
+def main(argv=None):
+    """Entry point of the `pyramid-swagger-compile` console script."""
+    parser = argparse.ArgumentParser(
+        description='Compile a Swagger 2.0 spec into an artifact which can '
+                    'be loaded with the pyramid_swagger.compiled_artifact '
+                    'setting.',
+    )
+    parser.add_argument(
+        'config_uri',
+        help='PasteDeploy config file holding the pyramid_swagger settings, '
+             'eg. production.ini#main',
+    )
+    parser.add_argument(
+        '-o', '--output',
+        help='Where to write the artifact. Defaults to the value of '
+             'pyramid_swagger.compiled_artifact',
+    )
+    args = parser.parse_args(argv)
+
+    from pyramid.paster import get_appsettings
+    settings = dict(get_appsettings(args.config_uri))
+    output = args.output or settings.get('pyramid_swagger.compiled_artifact')
+    if not output:
+        parser.error('no --output given and pyramid_swagger.compiled_artifact '
+                     'is not set')
+
+    # Compiling is the place to catch a broken spec
+    settings['pyramid_swagger.enable_swagger_spec_validation'] = True
+
+    artifact = compile_artifact(settings)
+    write_artifact(artifact, output)
+    print('Wrote {0} ({1} api doc payloads)'.format(
+        output, len(artifact.api_docs)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
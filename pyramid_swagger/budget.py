@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Bound the time spent validating Swagger 2.0 responses.
+
+Validation stops cooperatively: while the current thread has a deadline,
+response bodies are validated by a validator type derived from the one of
+the spec, which checks the deadline before each array item and object
+property it validates. Once the deadline is exceeded
+:class:`ValidationBudgetExceeded` is raised and the validation is abandoned.
+
+The validator type of the spec, shared with request validation and with
+bravado-core, is left as it is.
+"""
+from __future__ import absolute_import
+
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+from bravado_core import response as bravado_response
+from bravado_core import validate as bravado_validate
+from bravado_core.content_type import APP_JSON
+from bravado_core.swagger20_validator import get_validator_type
+from jsonschema.validators import Draft4Validator
+from jsonschema.validators import extend
+
+
+_state = threading.local()
+
+_draft4_items = Draft4Validator.VALIDATORS['items']
+
+# :class:`bravado_core.spec.Spec` -> validator type checking the deadline
+_budgeted_validator_types = weakref.WeakKeyDictionary()
+
+
+class ValidationBudgetExceeded(Exception):
+    """Raised when a validation takes longer than its budget."""
+
+
+def check_budget():
+    """
+    :raises: ValidationBudgetExceeded when the deadline of the current thread
+        is exceeded
+    """
+    deadline = getattr(_state, 'deadline', None)
+    if deadline is not None and time.monotonic() > deadline:
+        raise ValidationBudgetExceeded()
+
+
+@contextmanager
+def validation_budget(seconds):
+    """Set a deadline, `seconds` from now, on the validations of the current
+    thread. A None budget removes the deadline.
+    """
+    previous_deadline = getattr(_state, 'deadline', None)
+    _state.deadline = None if seconds is None else time.monotonic() + seconds
+    try:
+        yield
+    finally:
+        _state.deadline = previous_deadline
+
+
+def budgeted_items(validator, items, instance, schema):
+    """Draft 4 `items`, checking the deadline before each item."""
+    if not validator.is_type(instance, 'array') or \
+            not validator.is_type(items, 'object'):
+        for error in _draft4_items(validator, items, instance, schema):
+            yield error
+        return
+    for index, item in enumerate(instance):
+        check_budget()
+        for error in validator.descend(item, items, path=index):
+            yield error
+
+
+def budgeted_properties(validator, properties, instance, schema):
+    """Draft 4 `properties`, checking the deadline before each property."""
+    if not validator.is_type(instance, 'object'):
+        return
+    for name, subschema in properties.items():
+        if name in instance:
+            check_budget()
+            for error in validator.descend(
+                instance[name], subschema, path=name, schema_path=name,
+            ):
+                yield error
+
+
+def get_budgeted_validator_type(swagger_spec):
+    """
+    :type swagger_spec: :class:`bravado_core.spec.Spec`
+    :returns: the validator type of `swagger_spec`, extended to check the
+        deadline of the current thread
+    """
+    validator_type = _budgeted_validator_types.get(swagger_spec)
+    if validator_type is None:
+        validator_type = _budgeted_validator_types[swagger_spec] = extend(
+            get_validator_type(swagger_spec),
+            {'items': budgeted_items, 'properties': budgeted_properties},
+        )
+    return validator_type
+
+
+def _has_deadline():
+    return getattr(_state, 'deadline', None) is not None
+
+
+def validate_object(swagger_spec, object_spec, value):
+    """Same as :func:`bravado_core.validate.validate_object`, checking the
+    deadline of the current thread if it has one.
+    """
+    if not _has_deadline():
+        return bravado_validate.validate_object(
+            swagger_spec, object_spec, value)
+    _validate_within_budget(swagger_spec, object_spec, value)
+
+
+@bravado_validate.scrub_sensitive_value
+def _validate_within_budget(swagger_spec, object_spec, value):
+    get_budgeted_validator_type(swagger_spec)(
+        object_spec,
+        format_checker=swagger_spec.format_checker,
+        resolver=swagger_spec.resolver,
+    ).validate(value)
+
+
+def validate_schema_object(swagger_spec, schema_object_spec, value):
+    """Same as :func:`bravado_core.validate.validate_schema_object`, checking
+    the deadline of the current thread if it has one.
+    """
+    if not _has_deadline():
+        return bravado_validate.validate_schema_object(
+            swagger_spec, schema_object_spec, value)
+    deref = swagger_spec.deref
+    schema_object_spec = deref(schema_object_spec)
+    default_type = (
+        'object' if swagger_spec.config['default_type_to_object'] else None)
+    obj_type = deref(schema_object_spec.get('type', default_type))
+    if (
+        obj_type in bravado_validate.SWAGGER_PRIMITIVES
+        or obj_type == 'array'
+        or (obj_type and bravado_validate.is_object(
+            swagger_spec, schema_object_spec))
+    ):
+        # bravado-core validates all of them the same way
+        validate_object(swagger_spec, schema_object_spec, value)
+    else:
+        # Not validated, or a SwaggerMappingError
+        bravado_validate.validate_schema_object(
+            swagger_spec, schema_object_spec, value)
+
+
+def validate_response_body(op, response_spec, response):
+    """Same as :func:`bravado_core.response.validate_response_body`, checking
+    the deadline of the current thread, if it has one, in JSON bodies.
+    """
+    if _has_deadline() and response.content_type == APP_JSON:
+        schema = op.swagger_spec.deref(response_spec.get('schema'))
+        if schema is not None and APP_JSON in op.produces:
+            validate_schema_object(op.swagger_spec, schema, response.json())
+            return
+    bravado_response.validate_response_body(op, response_spec, response)
+
+
+def get_response_validation_budget(settings):
+    """
+    :type settings: dict
+    :returns: the response validation budget in seconds, or None when
+        `pyramid_swagger.response_validation_budget_ms` is not set
+    """
+    budget_ms = settings.get('pyramid_swagger.response_validation_budget_ms')
+    if budget_ms is None or budget_ms == '':
+        return None
+    return float(budget_ms) / 1000
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+"""
+Validate recorded requests, eg. replayed from access logs, against a Swagger
+2.0 spec without a running Pyramid application.
+
+A request is matched to its operation the way Pyramid matches it to a route
+registered with the path of the operation, then goes through the same
+validation as in :mod:`pyramid_swagger.tween`. Large batches are spread
+across a pool of processes.
+
+Request records are dicts with a `method`, a `path` which may hold a query
+string, and optionally `headers` (a dict) and a text `body`.
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import sys
+from collections import Counter
+from collections import namedtuple
+
+import six
+from pyramid.httpexceptions import HTTPError
+from pyramid.request import Request
+from pyramid.urldispatch import Route
+from six import iteritems
+
+from pyramid_swagger.model import PathNotMatchedError
+from pyramid_swagger.tween import build_swagger20_handler
+from pyramid_swagger.tween import PyramidSwaggerRequest
+
+
+# Number of records sent to a worker process at once
+DEFAULT_CHUNK_SIZE = 100
+
+# Chunks queued per worker process: more records are only read from the
+# input once these are validated
+_CHUNKS_PER_PROCESS = 4
+
+
+class ValidationResult(namedtuple(
+    'ValidationResult',
+    [
+        'index',
+        'method',
+        'path',
+        'operation_id',
+        'error',
+    ]
+)):
+    """Outcome of the validation of a request record.
+
+    :param index: position of the record in the validated records
+    :param operation_id: the operation the record was matched to, or None
+        when it did not match any
+    :param error: the validation error message, or None for a valid record
+    """
+    __slots__ = ()
+
+    @property
+    def is_valid(self):
+        return self.error is None
+
+
+class SpecRoutes(object):
+    """Matches request paths to the paths of a Swagger 2.0 spec.
+
+    Paths without parameters are matched first, as they would be registered
+    before the paths they overlap with in a Pyramid application.
+
+    :type swagger_spec: :class:`bravado_core.spec.Spec`
+    """
+
+    def __init__(self, swagger_spec):
+        paths = sorted(
+            swagger_spec.spec_dict.get('paths', {}),
+            key=lambda path: (path.count('{'), path),
+        )
+        self.routes = [Route(path, path) for path in paths]
+
+    def match(self, path_info):
+        """
+        :returns: the route info of the route matching `path_info`, or None
+        :rtype: dict
+        """
+        for route in self.routes:
+            match = route.match(path_info)
+            if match is not None:
+                return {'match': match, 'route': route}
+        return None
+
+
+def build_request(record):
+    """
+    :param record: a request record
+    :type record: dict
+    :rtype: :class:`pyramid.request.Request`
+    """
+    request = Request.blank(
+        record['path'],
+        method=record.get('method', 'GET').upper(),
+        headers=record.get('headers') or {},
+    )
+    body = record.get('body')
+    if body:
+        if isinstance(body, six.text_type):
+            body = body.encode('utf-8')
+        request.body = body
+    return request
+
+
+class RecordValidator(object):
+    """Validates request records against `swagger_spec`.
+
+    :type swagger_spec: :class:`bravado_core.spec.Spec`
+    :param swagger_handler: handler validating the matched requests
+    :type swagger_handler: :class:`pyramid_swagger.tween.SwaggerHandler`
+    """
+
+    def __init__(self, swagger_spec, swagger_handler=None):
+        self.swagger_spec = swagger_spec
+        self.swagger_handler = swagger_handler or build_swagger20_handler()
+        self.routes = SpecRoutes(swagger_spec)
+
+    def validate(self, index, record):
+        """
+        :type record: dict
+        :rtype: :class:`ValidationResult`
+        """
+        request = build_request(record)
+        result = ValidationResult(
+            index=index,
+            method=request.method,
+            path=record['path'],
+            operation_id=None,
+            error=None,
+        )
+        route_info = self.routes.match(request.path_info)
+        if route_info is None:
+            return result._replace(
+                error='Could not find a matching Swagger path for {0}'.format(
+                    request.path_info))
+        try:
+            op = self.swagger_handler.op_for_request(
+                request, route_info=route_info, spec=self.swagger_spec)
+        except PathNotMatchedError as exc:
+            return result._replace(error=str(exc))
+
+        result = result._replace(operation_id=op.operation_id)
+        try:
+            self.swagger_handler.handle_request(
+                PyramidSwaggerRequest(request, route_info), op)
+        except HTTPError as exc:
+            return result._replace(error=str(exc))
+        return result
+
+
+# The validator of a worker process, see :func:`_init_worker`
+_worker_validator = None
+
+
+def _init_worker(swagger_spec):
+    global _worker_validator
+    _worker_validator = RecordValidator(swagger_spec)
+
+
+def _validate_in_worker(indexed_record):
+    return _worker_validator.validate(*indexed_record)
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def validate_many(swagger_spec, records, processes=None,
+                  chunk_size=DEFAULT_CHUNK_SIZE):
+    """Validate request records against `swagger_spec`.
+
+    Results are yielded in the order of `records` as soon as they are
+    available, and `records` is only read ahead of the validation by a few
+    chunks per process, so arbitrarily long streams of records can be
+    validated.
+
+    :type swagger_spec: :class:`bravado_core.spec.Spec`
+    :param records: iterable of request records
+    :param processes: number of worker processes, defaults to the number of
+        CPUs. With 1 the records are validated in the current process.
+    :param chunk_size: number of records sent to a worker process at once
+    :returns: iterator of :class:`ValidationResult`
+    """
+    indexed_records = enumerate(records)
+    if processes == 1:
+        validator = RecordValidator(swagger_spec)
+        for index, record in indexed_records:
+            yield validator.validate(index, record)
+        return
+
+    processes = processes or multiprocessing.cpu_count()
+    pool = multiprocessing.Pool(
+        processes, initializer=_init_worker, initargs=(swagger_spec,))
+    try:
+        batch_size = chunk_size * _CHUNKS_PER_PROCESS * processes
+        for batch in _batches(indexed_records, batch_size):
+            for result in pool.imap(_validate_in_worker, batch, chunk_size):
+                yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+class ValidationReport(object):
+    """Counts the validated and invalid requests of each operation."""
+
+    def __init__(self):
+        self.requests = Counter()
+        self.violations = Counter()
+        self.unmatched = 0
+
+    def add(self, result):
+        """
+        :type result: :class:`ValidationResult`
+        """
+        if result.operation_id is None:
+            self.unmatched += 1
+            return
+        self.requests[result.operation_id] += 1
+        if not result.is_valid:
+            self.violations[result.operation_id] += 1
+
+    @property
+    def total_violations(self):
+        return sum(self.violations.values())
+
+    def format(self):
+        """
+        :returns: one line per operation, the operations with the most
+            violations first
+        :rtype: str
+        """
+        lines = ['{0:>10} {1:>10}  operation'.format('violations', 'requests')]
+        for operation_id, requests in sorted(
+            iteritems(self.requests),
+            key=lambda item: (-self.violations[item[0]], item[0]),
+        ):
+            lines.append('{0:>10} {1:>10}  {2}'.format(
+                self.violations[operation_id], requests, operation_id))
+        lines.append('{0} requests did not match any operation'.format(
+            self.unmatched))
+        return '\n'.join(lines)
+
+
+def read_records(record_file):
+    """
+    :param record_file: file holding one JSON request record per line
+    :returns: iterator of request records
+    """
+    for line in record_file:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def main(argv=None):
+    """Entry point of the `pyramid-swagger-validate` console script."""
+    parser = argparse.ArgumentParser(
+        description='Validate recorded requests against a Swagger 2.0 spec. '
+                    'Violations are written to stdout as JSON lines, and the '
+                    'number of violations of each operation to stderr.',
+    )
+    parser.add_argument(
+        'config_uri',
+        help='PasteDeploy config file holding the pyramid_swagger settings, '
+             'eg. production.ini#main',
+    )
+    parser.add_argument(
+        'records',
+        help='File with one JSON request record per line, or - for stdin',
+    )
+    parser.add_argument(
+        '-j', '--processes', type=int, default=None,
+        help='Number of worker processes. Defaults to the number of CPUs',
+    )
+    args = parser.parse_args(argv)
+
+    from pyramid.paster import get_appsettings
+    from pyramid_swagger.artifact import load_compiled_artifact
+    from pyramid_swagger.ingest import get_swagger_spec
+    settings = dict(get_appsettings(args.config_uri))
+    if settings.get('pyramid_swagger.compiled_artifact'):
+        swagger_spec = load_compiled_artifact(settings).spec
+    else:
+        swagger_spec = get_swagger_spec(settings)
+
+    record_file = sys.stdin if args.records == '-' else open(args.records)
+    report = ValidationReport()
+    with record_file:
+        for result in validate_many(
+            swagger_spec, read_records(record_file), processes=args.processes,
+        ):
+            report.add(result)
+            if not result.is_valid:
+                print(json.dumps(dict(result._asdict())))
+    print(report.format(), file=sys.stderr)
+    return 1 if report.total_violations or report.unmatched else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Cache the request data of Swagger 2.0 operations which are often requested
+with the same parameters.
+
+Only requests whose parameters are all read from the path, the query string
+and the headers are cached: the cache key holds the raw query string, the
+path parameters and the value of every header declared by the operation.
+"""
+from __future__ import absolute_import
+
+import copy
+import functools
+import threading
+from collections import OrderedDict
+
+from six import itervalues
+
+
+# Parameter locations which are part of the cache key. Operations with other
+# parameters (body, formData) are never cached.
+CACHEABLE_LOCATIONS = frozenset(['path', 'query', 'header'])
+
+
+class RequestDataCache(object):
+    """A thread safe LRU cache of validated and unmarshalled request data.
+
+    Values are deep copied on the way in and out, so that views can modify
+    their `swagger_data` without altering the cached value.
+
+    :param maxsize: maximum number of cached requests
+    :type maxsize: int
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        """
+        :returns: a copy of the request data cached for `key`, or None
+        """
+        with self._lock:
+            request_data = self._data.get(key)
+            if request_data is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(request_data)
+
+    def put(self, key, request_data):
+        request_data = copy.deepcopy(request_data)
+        with self._lock:
+            self._data[key] = request_data
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def get_request_cache_key(request, op):
+    """
+    :type request: :class:`pyramid_swagger.tween.PyramidSwaggerRequest`
+    :type op: :class:`bravado_core.operation.Operation`
+    :returns: the cache key of the request data, or None when the request
+        data of `op` can not be cached
+    :rtype: tuple or None
+    """
+    header_values = []
+    # `op.params` includes the apiKey parameters of its security requirements
+    for param in itervalues(op.params):
+        if param.location not in CACHEABLE_LOCATIONS:
+            return None
+        if param.location == 'header':
+            header_values.append(request.headers.get(param.name))
+
+    return (
+        op,
+        request.request.query_string,
+        tuple(sorted(request.path.items())),
+        tuple(header_values),
+    )
+
+
+def cache_request_data(handle_request, cache):
+    """Decorate the `handle_request` of a Swagger 2.0
+    :class:`pyramid_swagger.tween.SwaggerHandler` to use `cache`.
+
+    :type cache: :class:`RequestDataCache`
+    """
+    @functools.wraps(handle_request)
+    def _handle_request(request, op, **kwargs):
+        key = get_request_cache_key(request, op)
+        if key is None:
+            return handle_request(request, op, **kwargs)
+
+        request_data = cache.get(key)
+        if request_data is None:
+            # Invalid requests raise and are not cached
+            request_data = handle_request(request, op, **kwargs)
+            cache.put(key, request_data)
+        return request_data
+
+    return _handle_request
+
+
+def build_request_cache(settings):
+    """
+    :type settings: dict
+    :rtype: :class:`RequestDataCache` or None when
+        `pyramid_swagger.request_cache_size` is not set
+    """
+    maxsize = int(settings.get('pyramid_swagger.request_cache_size') or 0)
+    if maxsize <= 0:
+        return None
+    return RequestDataCache(maxsize)
@@ -0,0 +1,686 @@
+# -*- coding: utf-8 -*-
+"""
+Compile jsonschema schemas to specialised Python functions.
+
+A compiled schema is a function returning whether a value is valid. It is
+only trusted to accept values: when it returns False (or raises), the value is
+validated again by the interpreted jsonschema validator, which raises the
+usual error. Error messages and exception types are then the same with or
+without compiled schemas, and the compiled code only needs to be exact for
+valid values.
+
+Schemas are compiled against a jsonschema validator instance, whose keyword
+functions, type checker, resolver and format checker define their semantics.
+A schema using a keyword the compiler does not know the semantics of raises
+:class:`CompilationError`, and is validated by the interpreted validator
+only.
+"""
+from __future__ import absolute_import
+
+import functools
+import logging
+import numbers
+import re
+import weakref
+
+import six
+from bravado_core import swagger20_validator
+from bravado_core.content_type import APP_JSON
+from bravado_core.model import is_object
+from bravado_core.param import unmarshal_param
+from bravado_core.schema import SWAGGER_PRIMITIVES
+from bravado_core.swagger20_validator import get_validator_type
+from bravado_core.unmarshal import unmarshal_schema_object
+from bravado_core.validate import validate_security_object
+from jsonschema import _types
+from jsonschema.validators import Draft3Validator
+from jsonschema.validators import Draft4Validator
+from six import itervalues
+from swagger_spec_validator.ref_validators import in_scope
+
+
+log = logging.getLogger(__name__)
+
+
+VALIDATION_BACKEND_INTERPRETED = 'interpreted'
+VALIDATION_BACKEND_COMPILED = 'compiled'
+VALIDATION_BACKENDS = [VALIDATION_BACKEND_INTERPRETED, VALIDATION_BACKEND_COMPILED]
+
+
+class CompilationError(Exception):
+    """The schema uses a feature the compiler does not support."""
+
+
+# Type checking functions of jsonschema, and the equivalent expression
+_INLINE_TYPE_CHECKS = {
+    _types.is_array: 'isinstance({0}, list)',
+    _types.is_bool: 'isinstance({0}, bool)',
+    _types.is_integer: '(isinstance({0}, int) and not isinstance({0}, bool))',
+    _types.is_null: '({0} is None)',
+    _types.is_number: '(isinstance({0}, _Number) and not isinstance({0}, bool))',
+    _types.is_object: 'isinstance({0}, dict)',
+    _types.is_string: 'isinstance({0}, str)',
+    _types.is_any: 'True',
+}
+
+_NUMBER_TYPES = six.integer_types + (float,)
+
+
+def _in_enum(value, enums):
+    # jsonschema compares 1 and 1.0 equal but not 1 and True, and compares
+    # containers recursively: only decide for scalars
+    if isinstance(value, _NUMBER_TYPES) and not isinstance(value, bool):
+        return any(
+            isinstance(each, _NUMBER_TYPES) and not isinstance(each, bool)
+            and each == value
+            for each in enums
+        )
+    if value is None or isinstance(value, (bool,) + six.string_types):
+        value_type = type(value)
+        return any(type(each) is value_type and each == value for each in enums)
+    return False
+
+
+def _unique(values):
+    # Same as `_in_enum`, jsonschema compares values with its own equality:
+    # only decide for strings and numbers, which it compares like python
+    for value in values:
+        if not isinstance(value, six.string_types + _NUMBER_TYPES) or \
+                isinstance(value, bool):
+            return False
+    return len(set(values)) == len(values)
+
+
+def _bravado_function(keyword_function):
+    """:returns: the bravado-core keyword function behind the
+    :func:`functools.partial` bravado-core registers in its validators
+    """
+    if isinstance(keyword_function, functools.partial):
+        return keyword_function.func
+    return None
+
+
+def get_validation_backend(settings):
+    """
+    :type settings: dict
+    :returns: the `pyramid_swagger.validation_backend` setting
+    :raises: ValueError when the backend is not supported
+    """
+    backend = settings.get(
+        'pyramid_swagger.validation_backend', VALIDATION_BACKEND_INTERPRETED)
+    if backend not in VALIDATION_BACKENDS:
+        raise ValueError('Validation backend {0} is not supported.'.format(
+            backend))
+    return backend
+
+
+class SchemaCompiler(object):
+    """Compiles the schemas validated by one jsonschema validator.
+
+    :param validator: a jsonschema validator instance
+    :param resolver: the :class:`jsonschema.RefResolver` of `validator`
+    """
+
+    def __init__(self, validator, resolver):
+        # Circular import: load_schema compiles its validators
+        from pyramid_swagger import load_schema
+
+        self.validator = validator
+        self.keywords = validator.VALIDATORS
+        self.resolver = resolver
+        self.namespace = {
+            '_Number': numbers.Number,
+            '_in_enum': _in_enum,
+            '_unique': _unique,
+            '_is_type': validator.is_type,
+            '_format_checker': validator.format_checker,
+        }
+        # (id(schema), resolution scope) -> function name
+        self._functions = {}
+        self._sources = []
+        # Schemas must stay alive while their id is used as a key
+        self._schemas = []
+
+        draft3 = Draft3Validator.VALIDATORS
+        draft4 = Draft4Validator.VALIDATORS
+        self._handlers = {
+            draft4['$ref']: self._ref,
+            draft4['additionalItems']: self._additional_items,
+            draft4['additionalProperties']: self._additional_properties,
+            draft4['allOf']: self._all_of,
+            draft4['anyOf']: self._any_of,
+            draft4['enum']: self._enum,
+            draft4['format']: self._format,
+            draft4['items']: self._items,
+            draft4['maxItems']: self._max_items,
+            draft4['maxLength']: self._max_length,
+            draft4['maxProperties']: self._max_properties,
+            draft4['maximum']: self._maximum,
+            draft4['minItems']: self._min_items,
+            draft4['minLength']: self._min_length,
+            draft4['minProperties']: self._min_properties,
+            draft4['minimum']: self._minimum,
+            draft4['pattern']: self._pattern,
+            draft4['patternProperties']: self._pattern_properties,
+            draft4['properties']: self._properties,
+            draft4['required']: self._required,
+            draft4['type']: self._type,
+            draft4['uniqueItems']: self._unique_items,
+            draft3['properties']: self._properties_draft3,
+            swagger20_validator.ref_validator: self._ref_swagger20,
+            load_schema.ignore: self._ignore,
+            load_schema.type_validator: self._type_swagger12,
+            load_schema.required_validator: self._required_swagger12,
+        }
+        self._bravado_handlers = {
+            swagger20_validator.enum_validator: self._enum_swagger20,
+            swagger20_validator.format_validator: self._format_swagger20,
+            swagger20_validator.required_validator: self._required_swagger20,
+            swagger20_validator.type_validator: self._type_swagger20,
+        }
+
+    def compile(self, schema):
+        """
+        :returns: a function returning True when its argument is valid for
+            `schema`. It may return False, or raise, for valid values.
+        :raises: :class:`CompilationError`
+        """
+        name = self._function_for(schema)
+        source = '\n\n'.join(self._sources)
+        self._sources = []
+        code = compile(source, '<pyramid_swagger compiled schema>', 'exec')
+        exec(code, self.namespace)
+        return self.namespace[name]
+
+    def _constant(self, value):
+        name = '_c{0}'.format(len(self.namespace))
+        self.namespace[name] = value
+        return name
+
+    def _function_for(self, schema):
+        if schema is True or schema == {}:
+            return self._constant(lambda value: True)
+        if not isinstance(schema, dict):
+            raise CompilationError('Unsupported schema {0!r}'.format(schema))
+
+        key = (id(schema), self.resolver.resolution_scope)
+        if key in self._functions:
+            return self._functions[key]
+
+        name = '_v{0}'.format(len(self._functions))
+        self._functions[key] = name
+        self._schemas.append(schema)
+
+        lines = []
+        keywords = schema.items()
+        if schema.get('$ref') is not None:
+            # jsonschema ignores the siblings of $ref for draft 3 and 4
+            keywords = [('$ref', schema['$ref'])]
+        for keyword, value in keywords:
+            keyword_function = self.keywords.get(keyword)
+            if keyword_function is None:
+                # Not a validation keyword
+                continue
+            handler = (
+                self._handlers.get(keyword_function)
+                or self._bravado_handlers.get(_bravado_function(keyword_function))
+                or self._type_handler_with_models(keyword_function)
+            )
+            if handler is None:
+                raise CompilationError(
+                    'Unsupported keyword {0!r}'.format(keyword))
+            handler(value, schema, lines)
+
+        body = '\n'.join('    ' + line for line in lines)
+        self._sources.append('def {0}(x):\n{1}\n    return True'.format(
+            name, body))
+        return name
+
+    def _type_handler_with_models(self, keyword_function):
+        if getattr(keyword_function, 'models', None) is not None:
+            return functools.partial(
+                self._type_swagger12_body, keyword_function.models)
+        return None
+
+    def _type_check(self, type_name, var='x'):
+        checkers = getattr(self.validator.TYPE_CHECKER, '_type_checkers', None)
+        if checkers is None or type_name not in checkers:
+            raise CompilationError('Unknown type {0!r}'.format(type_name))
+
+        template = _INLINE_TYPE_CHECKS.get(checkers[type_name])
+        if template:
+            return template.format(var)
+        return '_is_type({0}, {1!r})'.format(var, type_name)
+
+    def _types_check(self, types):
+        if isinstance(types, six.string_types):
+            types = [types]
+        if not isinstance(types, list) or \
+                not all(isinstance(t, six.string_types) for t in types):
+            raise CompilationError('Unsupported type {0!r}'.format(types))
+        return '({0})'.format(
+            ' or '.join(self._type_check(t) for t in types) or 'False')
+
+    @staticmethod
+    def _nullable(schema):
+        return bool(schema.get('x-nullable', False))
+
+    @staticmethod
+    def _reject_param_spec(schema):
+        # bravado-core validates parameter objects differently
+        if 'in' in schema:
+            raise CompilationError('Parameter objects are not supported')
+
+    @staticmethod
+    def _number(value):
+        if isinstance(value, bool) or \
+                not isinstance(value, six.integer_types + (float,)):
+            raise CompilationError('Unsupported number {0!r}'.format(value))
+        return repr(value)
+
+    @staticmethod
+    def _count(value):
+        if isinstance(value, bool) or not isinstance(value, six.integer_types):
+            raise CompilationError('Unsupported count {0!r}'.format(value))
+        return repr(value)
+
+    def _search(self, pattern):
+        try:
+            return self._constant(re.compile(pattern).search)
+        except (re.error, TypeError):
+            raise CompilationError('Unsupported pattern {0!r}'.format(pattern))
+
+    def _enums(self, enums):
+        if not isinstance(enums, list):
+            raise CompilationError('Unsupported enum {0!r}'.format(enums))
+        return self._constant(enums)
+
+    def _ignore(self, value, schema, lines):
+        pass
+
+    def _ref(self, ref, schema, lines):
+        self._descend_ref(ref, lines)
+
+    def _ref_swagger20(self, ref, schema, lines):
+        self._descend_ref(ref, lines, ref_dict=schema)
+
+    def _descend_ref(self, ref, lines, ref_dict=None):
+        if ref_dict is not None:
+            # Resolve from the `x-scope` bravado-core annotates refs with
+            with in_scope(self.resolver, ref_dict):
+                scope, resolved = self.resolver.resolve(ref)
+        else:
+            scope, resolved = self.resolver.resolve(ref)
+        self.resolver.push_scope(scope)
+        try:
+            name = self._function_for(resolved)
+        finally:
+            self.resolver.pop_scope()
+        lines.append('if not {0}(x): return False'.format(name))
+
+    def _type(self, types, schema, lines):
+        lines.append('if not {0}: return False'.format(self._types_check(types)))
+
+    def _type_swagger20(self, types, schema, lines):
+        self._reject_param_spec(schema)
+        check = self._types_check(types)
+        if self._nullable(schema):
+            check = '(x is None or {0})'.format(check)
+        lines.append('if not {0}: return False'.format(check))
+
+    def _type_swagger12(self, types, schema, lines):
+        if schema.get('type') == 'File':
+            return
+        self._type(types, schema, lines)
+
+    def _type_swagger12_body(self, models, types, schema, lines):
+        if not isinstance(types, six.string_types):
+            raise CompilationError('Unsupported type {0!r}'.format(types))
+        if types in models:
+            self._descend_ref(types, lines)
+        else:
+            self._type(types, schema, lines)
+
+    def _required(self, required, schema, lines):
+        if not isinstance(required, list) or \
+                not all(isinstance(r, six.string_types) for r in required):
+            raise CompilationError('Unsupported required {0!r}'.format(required))
+        if required:
+            lines.append('if {0} and not ({1}): return False'.format(
+                self._type_check('object'),
+                ' and '.join('{0!r} in x'.format(r) for r in required)))
+
+    def _required_swagger20(self, required, schema, lines):
+        self._reject_param_spec(schema)
+        self._required(required, schema, lines)
+
+    def _required_swagger12(self, required, schema, lines):
+        if schema.get('paramType'):
+            if required is True:
+                lines.append('if not x: return False')
+        else:
+            self._required(required, schema, lines)
+
+    def _properties(self, properties, schema, lines, draft3=False):
+        if not isinstance(properties, dict):
+            raise CompilationError('Unsupported properties')
+        checks = []
+        for name, subschema in properties.items():
+            if not isinstance(name, six.string_types):
+                raise CompilationError('Unsupported property {0!r}'.format(name))
+            checks.append('    if {0!r} in x:'.format(name))
+            checks.append('        if not {0}(x[{1!r}]): return False'.format(
+                self._function_for(subschema), name))
+            if draft3 and isinstance(subschema, dict) and \
+                    subschema.get('required', False):
+                checks.append('    else: return False')
+        if checks:
+            lines.append('if {0}:'.format(self._type_check('object')))
+            lines.extend(checks)
+
+    def _properties_draft3(self, properties, schema, lines):
+        self._properties(properties, schema, lines, draft3=True)
+
+    def _pattern_properties(self, pattern_properties, schema, lines):
+        if not pattern_properties:
+            return
+        lines.append('if {0}:'.format(self._type_check('object')))
+        lines.append('    for k, v in x.items():')
+        for pattern, subschema in pattern_properties.items():
+            search = self._search(pattern)
+            lines.append('        if {0}(k) and not {1}(v): return False'.format(
+                search, self._function_for(subschema)))
+
+    def _additional_properties(self, additional, schema, lines):
+        if additional is True or additional == {}:
+            return
+        if additional is not False and not isinstance(additional, dict):
+            raise CompilationError('Unsupported additionalProperties')
+
+        known = self._constant(frozenset(schema.get('properties', {})))
+        condition = 'k not in {0}'.format(known)
+        patterns = '|'.join(schema.get('patternProperties', {}))
+        if patterns:
+            condition += ' and not {0}(k)'.format(self._search(patterns))
+
+        lines.append('if {0}:'.format(self._type_check('object')))
+        lines.append('    for k in x:')
+        lines.append('        if {0}:'.format(condition))
+        if additional is False:
+            lines.append('            return False')
+        else:
+            lines.append('            if not {0}(x[k]): return False'.format(
+                self._function_for(additional)))
+
+    def _items(self, items, schema, lines):
+        lines.append('if {0}:'.format(self._type_check('array')))
+        if isinstance(items, dict):
+            lines.append('    for v in x:')
+            lines.append('        if not {0}(v): return False'.format(
+                self._function_for(items)))
+        elif isinstance(items, list):
+            for index, subschema in enumerate(items):
+                lines.append(
+                    '    if len(x) > {0} and not {1}(x[{0}]): return False'.format(
+                        index, self._function_for(subschema)))
+            lines.append('    pass')
+        else:
+            raise CompilationError('Unsupported items')
+
+    def _additional_items(self, additional, schema, lines):
+        items = schema.get('items', {})
+        if isinstance(items, dict) or additional is True or additional == {}:
+            return
+        if not isinstance(items, list):
+            raise CompilationError('Unsupported items')
+        lines.append('if {0}:'.format(self._type_check('array')))
+        if additional is False:
+            lines.append('    if len(x) > {0}: return False'.format(len(items)))
+        elif isinstance(additional, dict):
+            lines.append('    for v in x[{0}:]:'.format(len(items)))
+            lines.append('        if not {0}(v): return False'.format(
+                self._function_for(additional)))
+        else:
+            raise CompilationError('Unsupported additionalItems')
+
+    def _all_of(self, schemas, schema, lines):
+        for subschema in schemas:
+            lines.append('if not {0}(x): return False'.format(
+                self._function_for(subschema)))
+
+    def _any_of(self, schemas, schema, lines):
+        # A compiled schema rejecting a value does not make it invalid, but
+        # one accepting it is enough for anyOf
+        lines.append('if not ({0}): return False'.format(
+            ' or '.join('{0}(x)'.format(self._function_for(s)) for s in schemas)
+            or 'False'))
+
+    def _enum(self, enums, schema, lines):
+        lines.append('if not _in_enum(x, {0}): return False'.format(
+            self._enums(enums)))
+
+    def _enum_swagger20(self, enums, schema, lines):
+        self._reject_param_spec(schema)
+        enums = self._enums(enums)
+        guard = 'x is not None and ' if self._nullable(schema) else ''
+        if schema.get('type') == 'array':
+            lines.append('if {0}not all(_in_enum(v, {1}) for v in x): '
+                         'return False'.format(guard, enums))
+        else:
+            lines.append('if {0}not _in_enum(x, {1}): return False'.format(
+                guard, enums))
+
+    def _format(self, format_name, schema, lines, guard=''):
+        if self.validator.format_checker is None:
+            return
+        lines.append(
+            'if {0}not _format_checker.conforms(x, {1}): return False'.format(
+                guard, self._constant(format_name)))
+
+    def _format_swagger20(self, format_name, schema, lines):
+        self._reject_param_spec(schema)
+        guard = 'x is not None and ' if self._nullable(schema) else ''
+        self._format(format_name, schema, lines, guard=guard)
+
+    def _bound(self, type_name, expression, lines):
+        lines.append('if {0} and {1}: return False'.format(
+            self._type_check(type_name), expression))
+
+    def _minimum(self, minimum, schema, lines):
+        operator = '<=' if schema.get('exclusiveMinimum', False) else '<'
+        self._bound('number', 'x {0} {1}'.format(
+            operator, self._number(minimum)), lines)
+
+    def _maximum(self, maximum, schema, lines):
+        operator = '>=' if schema.get('exclusiveMaximum', False) else '>'
+        self._bound('number', 'x {0} {1}'.format(
+            operator, self._number(maximum)), lines)
+
+    def _min_length(self, value, schema, lines):
+        self._bound('string', 'len(x) < {0}'.format(self._count(value)), lines)
+
+    def _max_length(self, value, schema, lines):
+        self._bound('string', 'len(x) > {0}'.format(self._count(value)), lines)
+
+    def _min_items(self, value, schema, lines):
+        self._bound('array', 'len(x) < {0}'.format(self._count(value)), lines)
+
+    def _max_items(self, value, schema, lines):
+        self._bound('array', 'len(x) > {0}'.format(self._count(value)), lines)
+
+    def _min_properties(self, value, schema, lines):
+        self._bound('object', 'len(x) < {0}'.format(self._count(value)), lines)
+
+    def _max_properties(self, value, schema, lines):
+        self._bound('object', 'len(x) > {0}'.format(self._count(value)), lines)
+
+    def _pattern(self, pattern, schema, lines):
+        self._bound('string', 'not {0}(x)'.format(self._search(pattern)), lines)
+
+    def _unique_items(self, unique, schema, lines):
+        if unique:
+            self._bound('array', 'not _unique(x)', lines)
+
+
+def compile_schema(schema, validator, resolver):
+    """
+    :param schema: the schema to compile
+    :param validator: the jsonschema validator instance validating `schema`
+    :param resolver: the :class:`jsonschema.RefResolver` of `validator`
+    :returns: see :meth:`SchemaCompiler.compile`, or None if the schema can
+        not be compiled
+    """
+    try:
+        return SchemaCompiler(validator, resolver).compile(schema)
+    except CompilationError as e:
+        log.debug('Using interpreted validation for %r: %s', schema, e)
+        return None
+
+
+def is_valid(check, value):
+    """
+    :param check: a compiled schema
+    :returns: whether `check` accepts `value`
+    """
+    try:
+        return check(value)
+    except Exception:
+        # The interpreted validator will raise its own error
+        return False
+
+
+# :class:`bravado_core.spec.Spec` -> {id(schema): (schema, compiled schema)}
+# The schemas are kept alive by their entry, and the entries of a spec are
+# dropped with it, so the id of a cached schema can not be reused by another
+# schema of the same spec.
+_swagger_20_compiled_schemas = weakref.WeakKeyDictionary()
+
+
+def get_swagger_20_compiled_schema(swagger_spec, schema):
+    """
+    :type swagger_spec: :class:`bravado_core.spec.Spec`
+    :param schema: a schema object of `swagger_spec`
+    :returns: the compiled schema, or None if it can not be compiled
+    """
+    compiled_schemas = _swagger_20_compiled_schemas.setdefault(swagger_spec, {})
+    cached = compiled_schemas.get(id(schema))
+    if cached is None or cached[0] is not schema:
+        validator = get_validator_type(swagger_spec)(
+            {},
+            format_checker=swagger_spec.format_checker,
+            resolver=swagger_spec.resolver,
+        )
+        cached = (schema, compile_schema(schema, validator, swagger_spec.resolver))
+        compiled_schemas[id(schema)] = cached
+    return cached[1]
+
+
+def _body_schema(swagger_spec, body_spec):
+    body_spec = swagger_spec.deref(body_spec)
+    if body_spec is None:
+        return None
+    body_spec = swagger_spec.deref(body_spec)
+
+    # Only the schemas :func:`bravado_core.validate.validate_schema_object`
+    # validates with jsonschema
+    default_type = 'object' if swagger_spec.config['default_type_to_object'] else None
+    body_type = swagger_spec.deref(body_spec.get('type', default_type))
+    if body_type in SWAGGER_PRIMITIVES or body_type == 'array' or \
+            is_object(swagger_spec, body_spec):
+        return body_spec
+    return None
+
+
+def _response_body_schema(op, response_spec):
+    return _body_schema(op.swagger_spec, response_spec.get('schema'))
+
+
+def _request_body_schema(param):
+    if param.location != 'body':
+        return None
+    return _body_schema(param.swagger_spec, param.param_spec.get('schema'))
+
+
+def compile_swagger_20_spec(swagger_spec):
+    """Compile the body parameter and response body schemas of every
+    operation.
+
+    :type swagger_spec: :class:`bravado_core.spec.Spec`
+    """
+    for resource in itervalues(swagger_spec.resources):
+        for op in itervalues(resource.operations):
+            for param in itervalues(op.params):
+                body_spec = _request_body_schema(param)
+                if body_spec is not None:
+                    get_swagger_20_compiled_schema(swagger_spec, body_spec)
+            for response_spec in itervalues(op.op_spec.get('responses', {})):
+                body_spec = _response_body_schema(
+                    op, swagger_spec.deref(response_spec))
+                if body_spec is not None:
+                    get_swagger_20_compiled_schema(swagger_spec, body_spec)
+
+
+def is_valid_response_body(op, response_spec, response):
+    """Whether the compiled schemas accept the body of a JSON response. The
+    response must be validated by bravado-core when they do not.
+
+    :type op: :class:`bravado_core.operation.Operation`
+    :type response_spec: dict
+    :type response: :class:`bravado_core.response.OutgoingResponse`
+    :rtype: bool
+    """
+    if response.content_type != APP_JSON or APP_JSON not in op.produces:
+        return False
+    body_spec = _response_body_schema(op, response_spec)
+    if body_spec is None:
+        return False
+    check = get_swagger_20_compiled_schema(op.swagger_spec, body_spec)
+    if check is None:
+        return False
+    try:
+        body = response.json()
+    except Exception:
+        return False
+    return is_valid(check, body)
+
+
+def unmarshal_request_compiled(request, op):
+    """Same as :func:`bravado_core.request.unmarshal_request`, except that
+    JSON bodies accepted by the compiled schemas are not validated again by
+    bravado-core.
+
+    :type request: :class:`pyramid_swagger.tween.PyramidSwaggerRequest`
+    :type op: :class:`bravado_core.operation.Operation`
+    :returns: dict where (key, value) = (param_name, param_value)
+    """
+    swagger_spec = op.swagger_spec
+    validate = swagger_spec.config['validate_requests']
+    request_data = {}
+    for param in itervalues(op.params):
+        body_spec = _request_body_schema(param)
+        check = None
+        if validate and body_spec is not None and _is_json_request(request):
+            check = get_swagger_20_compiled_schema(swagger_spec, body_spec)
+        body = None
+        if check is not None:
+            try:
+                body = request.json()
+            except Exception:
+                check = None
+        # Bodies missing or rejected by the compiled schema are unmarshalled
+        # and validated by bravado-core, which raises the usual errors
+        if check is not None and body is not None and is_valid(check, body):
+            request_data[param.name] = unmarshal_schema_object(
+                swagger_spec, body_spec, body)
+        else:
+            request_data[param.name] = unmarshal_param(param, request)
+
+    if validate:
+        validate_security_object(op, request_data)
+
+    return request_data
+
+
+def _is_json_request(request):
+    content_type = request.headers.get('Content-Type', '')
+    return content_type.lower().split(';')[0].strip() == APP_JSON
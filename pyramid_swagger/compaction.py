@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""
+Reduce the memory used by the loaded swagger specs.
+
+Large specs repeat the same keys, strings and sub-schemas (error responses,
+`x-scope` lists, common parameters...) many times. Compaction makes all the
+equal strings one object and all the structurally identical dicts and lists
+one shared object.
+
+Shared sub-schemas stay plain mutable dicts and lists: jsonschema and
+bravado-core check for `dict` and `list` instances. Nothing mutates a spec
+once it is built, but code which does would now see its changes in every
+place using the shared sub-schema.
+
+A built :class:`bravado_core.spec.Spec` also refers to sub-schemas from its
+operations, params and models. These references are replaced too, otherwise
+they would keep the replaced sub-schemas alive next to the shared ones.
+"""
+from __future__ import absolute_import
+
+import gc
+import logging
+import tracemalloc
+from collections import namedtuple
+from contextlib import contextmanager
+
+import six
+from six import iteritems
+from six import itervalues
+
+from pyramid_swagger.load_schema import LazyValidatorMap
+
+
+log = logging.getLogger(__name__)
+
+
+class CompactionStats(namedtuple(
+    'CompactionStats',
+    [
+        'bytes_before',
+        'bytes_after',
+        'strings_interned',
+        'containers_shared',
+    ]
+)):
+    """Outcome of a compaction.
+
+    Byte counts are the memory traced by :mod:`tracemalloc` before and after
+    the compaction, once the garbage is collected, see :func:`trace_memory`.
+    They are None when memory allocations were not traced.
+    """
+    __slots__ = ()
+
+    @property
+    def bytes_saved(self):
+        if self.bytes_before is None:
+            return None
+        return self.bytes_before - self.bytes_after
+
+
+@contextmanager
+def trace_memory(enabled=True):
+    """Trace memory allocations in this block, unless they are traced
+    already. The memory freed by a compaction can only be measured when the
+    objects it frees were allocated while tracing, so the spec has to be
+    built in this block too.
+
+    :param enabled: whether to trace, eg. only when the spec is compacted
+    """
+    if not enabled or tracemalloc.is_tracing():
+        yield
+        return
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        tracemalloc.stop()
+
+
+def get_traced_memory():
+    """
+    :returns: the bytes allocated and still in use once the garbage is
+        collected, or None when memory allocations are not traced
+    """
+    if not tracemalloc.is_tracing():
+        return None
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+class Compactor(object):
+    """Compacts dicts and lists in place. Every call on the same compactor
+    shares strings and sub-schemas with the objects compacted before.
+
+    Only exact `dict` and `list` instances are compacted and shared, other
+    objects are kept as they are.
+    """
+
+    def __init__(self):
+        self._strings = {}
+        # structural key -> canonical container
+        self._containers = {}
+        # id of a compacted container -> (structural key, canonical container)
+        self._compacted = {}
+        self._in_progress = set()
+        # Structural keys hold ids: the objects behind them must stay alive,
+        # or their ids could be reused, until the compaction is done
+        self._keep_alive = []
+        self.strings_interned = 0
+        self.containers_shared = 0
+
+    def compact(self, obj):
+        """Compact the containers reachable from `obj`. `obj` itself is
+        compacted in place and keeps its identity, so references to it
+        elsewhere see the compacted version.
+
+        :returns: `obj`
+        """
+        self._compact(obj)
+        return obj
+
+    def shared(self, obj):
+        """
+        :returns: the container replacing `obj` if it was compacted,
+            otherwise `obj`
+        """
+        if type(obj) is dict or type(obj) is list:
+            return self._compacted.get(id(obj), (None, obj))[1]
+        return obj
+
+    def replace_references(self, holders):
+        """Replace the references to compacted containers by the containers
+        replacing them, in the objects of bravado-core and pyramid_swagger
+        reachable from `holders`, and in the containers holding them.
+
+        :param holders: iterable of objects, eg. a built
+            :class:`bravado_core.spec.Spec`
+        """
+        seen = set()
+        stack = list(holders)
+        while stack:
+            obj = stack.pop()
+            if id(obj) in seen or id(obj) in self._compacted:
+                # Compacted containers only hold shared containers
+                continue
+            seen.add(id(obj))
+            if isinstance(obj, dict):
+                for key, value in list(iteritems(obj)):
+                    obj[key] = self.shared(value)
+                    stack.append(value)
+            elif isinstance(obj, list):
+                for index, value in enumerate(obj):
+                    obj[index] = self.shared(value)
+                    stack.append(value)
+            elif isinstance(obj, tuple):
+                stack.extend(obj)
+            elif _holds_spec(obj):
+                for name, value in list(iteritems(vars(obj))):
+                    if type(value) is dict or type(value) is list:
+                        shared = self.shared(value)
+                        if shared is not value:
+                            setattr(obj, name, shared)
+                    stack.append(value)
+
+    def intern(self, value):
+        interned = self._strings.setdefault(value, value)
+        if interned is not value:
+            self.strings_interned += 1
+        return interned
+
+    def _compact(self, obj):
+        """
+        :returns: (structural key, object to use in place of `obj`)
+        """
+        obj_type = type(obj)
+        if obj_type in (six.text_type, six.binary_type):
+            obj = self.intern(obj)
+            return (obj_type, obj), obj
+        if obj_type is not dict and obj_type is not list:
+            if obj is None or obj_type in (bool, float) or \
+                    obj_type in six.integer_types:
+                return (obj_type, obj), obj
+            self._keep_alive.append(obj)
+            return ('id', id(obj)), obj
+
+        obj_id = id(obj)
+        if obj_id in self._compacted:
+            return self._compacted[obj_id]
+        if obj_id in self._in_progress:
+            # A cycle: it can not be compared structurally
+            return ('id', obj_id), obj
+
+        self._in_progress.add(obj_id)
+        try:
+            if obj_type is dict:
+                items = []
+                keys = []
+                for key, value in list(iteritems(obj)):
+                    if type(key) in (six.text_type, six.binary_type):
+                        key = self.intern(key)
+                    value_key, value = self._compact(value)
+                    items.append((key, value))
+                    keys.append((type(key), key, value_key))
+                obj.clear()
+                obj.update(items)
+                structural_key = ('dict', tuple(keys))
+            else:
+                keys = []
+                for index, value in enumerate(obj):
+                    value_key, obj[index] = self._compact(value)
+                    keys.append(value_key)
+                structural_key = ('list', tuple(keys))
+        finally:
+            self._in_progress.discard(obj_id)
+
+        canonical = self._containers.setdefault(structural_key, obj)
+        if canonical is not obj:
+            self.containers_shared += 1
+            self._keep_alive.append(obj)
+        # Containers holding this one only need its identity: equal
+        # containers were all replaced by `canonical`
+        result = (('id', id(canonical)), canonical)
+        self._compacted[obj_id] = result
+        return result
+
+
+def _holds_spec(obj):
+    # Instances and classes, eg. models, which may refer to sub-schemas
+    if isinstance(obj, type):
+        module = obj.__module__
+    elif hasattr(obj, '__dict__'):
+        module = type(obj).__module__
+    else:
+        return False
+    return module.split('.')[0] in ('bravado_core', 'pyramid_swagger')
+
+
+def compact(roots, holders=()):
+    """Compact `roots` in place, sharing strings and sub-schemas across all
+    of them.
+
+    :param roots: list of dicts and lists
+    :param holders: objects referring to containers of `roots`, see
+        :meth:`Compactor.replace_references`
+    :rtype: :class:`CompactionStats`
+    """
+    bytes_before = get_traced_memory()
+    compactor = Compactor()
+    for root in roots:
+        compactor.compact(root)
+    compactor.replace_references(holders)
+    strings_interned = compactor.strings_interned
+    containers_shared = compactor.containers_shared
+    # Frees the replaced containers
+    del compactor
+    return CompactionStats(
+        bytes_before=bytes_before,
+        bytes_after=get_traced_memory(),
+        strings_interned=strings_interned,
+        containers_shared=containers_shared,
+    )
+
+
+# Cached properties of :class:`bravado_core.spec.Spec` holding a copy of the
+# spec. They are compacted when they were computed already.
+_SPEC_CACHED_DICTS = ('client_spec_dict', 'flattened_spec', '_deref_flattened_spec')
+
+
+def get_swagger_20_spec_roots(spec):
+    """
+    :type spec: :class:`bravado_core.spec.Spec`
+    :returns: the dicts holding the spec
+    :rtype: list
+    """
+    roots = [spec.spec_dict]
+    for uri, document in iteritems(spec.resolver.store):
+        # The store also holds the jsonschema meta schemas, which are shared
+        # by the whole process
+        if uri.startswith('file:') and document is not spec.spec_dict:
+            roots.append(document)
+    for name in _SPEC_CACHED_DICTS:
+        if name in spec.__dict__:
+            roots.append(spec.__dict__[name])
+    return roots
+
+
+def get_swagger_12_schema_roots(schema):
+    """
+    :type schema: :class:`pyramid_swagger.model.SwaggerSchema`
+    :returns: the schemas of the validators built so far
+    :rtype: list
+    """
+    roots = []
+    for resource_validator in schema.resource_validators:
+        for validator_map in itervalues(resource_validator):
+            if isinstance(validator_map, LazyValidatorMap):
+                if not validator_map.is_built:
+                    continue
+                validator_map = validator_map.build()
+            for schema_validator in validator_map:
+                if isinstance(schema_validator.schema, dict):
+                    roots.append(schema_validator.schema)
+    return roots
+
+
+def log_compaction(name, stats):
+    if stats.bytes_saved is None:
+        log.info(
+            'Compacted the %s: %d strings interned, %d containers shared',
+            name, stats.strings_interned, stats.containers_shared,
+        )
+        return
+    log.info(
+        'Compacted the %s: %d bytes saved (%d -> %d), %d strings interned, '
+        '%d containers shared',
+        name, stats.bytes_saved, stats.bytes_before, stats.bytes_after,
+        stats.strings_interned, stats.containers_shared,
+    )
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+Marshal and JSON encode a response object in a single walk of its schema.
+
+:func:`bravado_core.marshal.marshal_schema_object` builds a marshaled copy of
+the response object, which the JSON renderer then walks again to encode it.
+The encoders built here apply the same marshaling as they encode, and produce
+the same text as :func:`json.dumps` of the marshaled copy.
+
+Schemas and values the encoders cannot reproduce exactly, eg. polymorphic
+models or dicts with keys which are not strings, raise :class:`Unsupported`:
+callers then marshal and encode in two steps.
+"""
+from __future__ import absolute_import
+
+import json
+import weakref
+from json.encoder import encode_basestring_ascii
+
+from bravado_core.exception import SwaggerMappingError
+from bravado_core.model import Model
+from bravado_core.model import MODEL_MARKER
+from bravado_core.schema import collapsed_properties
+from bravado_core.schema import collapsed_required
+from bravado_core.schema import get_type_from_schema
+from bravado_core.schema import is_dict_like
+from bravado_core.schema import is_list_like
+from bravado_core.schema import SWAGGER_PRIMITIVES
+
+
+_NOT_FOUND = object()
+
+_INFINITY = float('inf')
+
+# Spec -> id of a schema -> encoder
+_encoders = weakref.WeakKeyDictionary()
+
+
+class Unsupported(Exception):
+    """Raised for the schemas and values which must be marshaled and encoded
+    in two steps.
+    """
+
+
+def encode_value(value, default):
+    """JSON encode `value` exactly as :func:`json.dumps` does.
+
+    :param default: the `default` of :func:`json.dumps`
+    :rtype: str
+    """
+    value_type = type(value)
+    if value_type is str:
+        return encode_basestring_ascii(value)
+    if value is None:
+        return 'null'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if value_type is int:
+        return int.__repr__(value)
+    if value_type is float and value == value and \
+            value != _INFINITY and value != -_INFINITY:
+        return float.__repr__(value)
+    return json.dumps(value, default=default)
+
+
+def _encode_raw(value, default):
+    return encode_value(value, default)
+
+
+def get_schema_encoder(swagger_spec, schema):
+    """
+    :type swagger_spec: :class:`bravado_core.spec.Spec`
+    :param schema: schema of the response objects
+    :returns: a function of a response object and of the `default` of
+        :func:`json.dumps`, returning the JSON text of the marshaled object
+    :raises: Unsupported when the schema must be marshaled and encoded in two
+        steps
+    """
+    encoders = _encoders.setdefault(swagger_spec, {})
+    encoder = encoders.get(id(schema))
+    if encoder is None:
+        try:
+            encoder = _EncoderBuilder(swagger_spec).build(schema)
+        except Unsupported:
+            encoder = _unsupported
+        encoders[id(schema)] = encoder
+    if encoder is _unsupported:
+        raise Unsupported()
+    return encoder
+
+
+def _unsupported(value, default):
+    raise Unsupported()
+
+
+class _EncoderBuilder(object):
+    """Builds the encoder of a schema, and of the schemas it refers to, the
+    way :mod:`bravado_core.marshal` builds marshaling methods.
+    """
+
+    def __init__(self, swagger_spec):
+        self.swagger_spec = swagger_spec
+        # (id of a schema, required) -> encoder. Encoders being built are
+        # placeholders calling the encoder once built, for recursive schemas.
+        self.built = {}
+
+    def build(self, schema, required=False):
+        key = (id(schema), required)
+        if key not in self.built:
+            cell = []
+            self.built[key] = lambda value, default: cell[0](value, default)
+            encoder = self._build(schema, required)
+            cell.append(encoder)
+            self.built[key] = encoder
+        return self.built[key]
+
+    def _build(self, schema, required):
+        deref = self.swagger_spec.deref
+        schema = deref(schema)
+        schema_type = get_type_from_schema(self.swagger_spec, schema)
+
+        if schema_type == 'array':
+            encoder = self._build_array(schema)
+        elif schema_type == 'file':
+            encoder = _encode_raw
+        elif schema_type == 'object':
+            encoder = self._build_object(schema)
+        elif schema_type in SWAGGER_PRIMITIVES:
+            encoder = self._build_primitive(schema, schema_type)
+        elif schema_type is None:
+            return _encode_raw
+        else:
+            def encoder(value, default):
+                raise SwaggerMappingError(
+                    'Unknown type {0} for value {1}'.format(schema_type, value))
+            return encoder
+
+        return self._handle_null_value(schema, required, encoder)
+
+    def _handle_null_value(self, schema, required, encoder):
+        # See bravado_core._decorators.handle_null_value
+        default_value = schema.get('default')
+        is_nullable = not required or schema.get('x-nullable', False)
+
+        def null_handling_encoder(value, default):
+            if value is None:
+                if default_value is not None:
+                    # Defaults are not marshaled
+                    return encode_value(default_value, default)
+                if is_nullable:
+                    return 'null'
+                raise SwaggerMappingError(
+                    'Spec {0} is a required value'.format(schema))
+            return encoder(value, default)
+
+        return null_handling_encoder
+
+    def _build_array(self, schema):
+        deref = self.swagger_spec.deref
+        item_schema = deref(schema.get('items', _NOT_FOUND))
+        if item_schema is _NOT_FOUND:
+            return _encode_raw
+        item_encoder = self.build(item_schema)
+
+        def array_encoder(value, default):
+            if not is_list_like(value):
+                raise SwaggerMappingError(
+                    'Expected list like type for {0}:{1}'.format(
+                        type(value), value))
+            return '[' + ', '.join([
+                item_encoder(item, default) for item in value
+            ]) + ']'
+
+        return array_encoder
+
+    def _build_object(self, schema):
+        if schema.get('discriminator'):
+            raise Unsupported('polymorphic schema')
+        if MODEL_MARKER in schema and \
+                schema[MODEL_MARKER] not in self.swagger_spec.definitions:
+            model_name = schema[MODEL_MARKER]
+
+            def unknown_model_encoder(value, default):
+                raise SwaggerMappingError(
+                    'Unknown model {0} when trying to marshal {1}'.format(
+                        model_name, value))
+            return unknown_model_encoder
+
+        properties = collapsed_properties(schema, self.swagger_spec)
+        required_properties = collapsed_required(schema, self.swagger_spec)
+        property_encoders = dict(
+            (name, self.build(
+                property_schema, required=name in required_properties))
+            for name, property_schema in properties.items()
+        )
+        skipped_if_none = set(
+            name for name, property_schema in properties.items()
+            if name not in required_properties
+            and not self.swagger_spec.deref(property_schema).get(
+                'x-nullable', False)
+        )
+        additional_encoder = _encode_raw
+        additional_schema = schema.get('additionalProperties', {})
+        if additional_schema is not False and \
+                additional_schema not in ({}, True):
+            additional_encoder = self.build(additional_schema)
+
+        def object_encoder(value, default):
+            if not is_dict_like(value) and not isinstance(value, Model):
+                raise SwaggerMappingError(
+                    "Expected type to be dict or Model to marshal value '{0}' "
+                    "to a dict. Was {1} instead.".format(value, type(value)))
+            items = []
+            for name in value:
+                if type(name) is not str:
+                    raise Unsupported('key which is not a string')
+                property_value = value[name]
+                if property_value is None and name in skipped_if_none:
+                    continue
+                items.append(
+                    encode_basestring_ascii(name) + ': '
+                    + property_encoders.get(name, additional_encoder)(
+                        property_value, default)
+                )
+            return '{' + ', '.join(items) + '}'
+
+        return object_encoder
+
+    def _build_primitive(self, schema, schema_type):
+        format_name = schema.get('format')
+        swagger_format = None
+        if format_name is not None:
+            swagger_format = self.swagger_spec.get_format(format_name)
+        if swagger_format is None:
+            return _encode_raw
+
+        def primitive_encoder(value, default):
+            try:
+                value = swagger_format.to_wire(value)
+            except Exception as e:
+                raise SwaggerMappingError(
+                    'Error while marshalling value={} to type={}/{}.'.format(
+                        value, schema_type, swagger_format.format),
+                    e,
+                )
+            return encode_value(value, default)
+
+        return primitive_encoder
@@ -7,15 +7,42 @@ import six
 from pyramid.httpexceptions import HTTPBadRequest
 from pyramid.httpexceptions import HTTPInternalServerError
 from pyramid.httpexceptions import HTTPNotFound
+from pyramid.httpexceptions import HTTPRequestEntityTooLarge
 from pyramid.httpexceptions import HTTPUnauthorized
 
 
-class RequestValidationError(HTTPBadRequest):
+class LazyDetailMixin(object):
+    """Without an explicit detail, the detail of the error is the message of
+    its `child`, formatted only when it is first read, eg. when the error is
+    rendered or logged.
+    """
+    _detail = None
+
+    @property
+    def detail(self):
+        if self._detail is None and self.child is not None:
+            self._detail = str(self.child)
+        return self._detail
+
+    @detail.setter
+    def detail(self, value):
+        self._detail = value
+
+    message = detail
+
+
+class RequestValidationError(LazyDetailMixin, HTTPBadRequest):
     def __init__(self, *args, **kwargs):
         self.child = kwargs.pop('child', None)
         super(RequestValidationError, self).__init__(*args, **kwargs)
 
 
+class RequestEntityTooLargeError(HTTPRequestEntityTooLarge):
+    def __init__(self, *args, **kwargs):
+        self.child = kwargs.pop('child', None)
+        super(RequestEntityTooLargeError, self).__init__(*args, **kwargs)
+
+
 class RequestAuthenticationError(HTTPUnauthorized):
     def __init__(self, *args, **kwargs):
         self.child = kwargs.pop('child', None)
@@ -28,7 +55,7 @@ class PathNotFoundError(HTTPNotFound):
         super(PathNotFoundError, self).__init__(*args, **kwargs)
 
 
-class ResponseValidationError(HTTPInternalServerError):
+class ResponseValidationError(LazyDetailMixin, HTTPInternalServerError):
     def __init__(self, *args, **kwargs):
         self.child = kwargs.pop('child', None)
         super(ResponseValidationError, self).__init__(*args, **kwargs)
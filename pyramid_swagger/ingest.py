@@ -3,21 +3,44 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 
 import glob
+import hashlib
+import logging
 import os.path
+import tempfile
+from contextlib import contextmanager
 
 import simplejson
-from bravado_core.spec import build_http_handlers
+import yaml
+from bravado_core.resource import build_resources
+from bravado_core.spec import is_yaml
 from bravado_core.spec import Spec
+from pyramid.settings import asbool
 from six import iteritems
 from six.moves.urllib import parse as urlparse
 from six.moves.urllib.request import pathname2url
+from six.moves.urllib.request import url2pathname
 
 from pyramid_swagger.api import build_swagger_12_endpoints
+from pyramid_swagger.codegen import get_validation_backend
+from pyramid_swagger.codegen import VALIDATION_BACKEND_COMPILED
+from pyramid_swagger.compaction import compact
+from pyramid_swagger.compaction import get_swagger_12_schema_roots
+from pyramid_swagger.compaction import get_swagger_20_spec_roots
+from pyramid_swagger.compaction import log_compaction
+from pyramid_swagger.compaction import trace_memory
 from pyramid_swagger.load_schema import load_schema
 from pyramid_swagger.model import SwaggerSchema
+from pyramid_swagger.profiling import startup_phase
 from pyramid_swagger.spec import API_DOCS_FILENAME
 from pyramid_swagger.spec import validate_swagger_schema
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # pragma: no cover
+    from yaml import SafeLoader
+
+
+log = logging.getLogger(__name__)
 
 # Prefix of configs that will be passed to the underlying bravado-core instance
 BRAVADO_CORE_CONFIG_PREFIX = 'bravado_core.'
@@ -31,10 +54,204 @@ class ApiDeclarationNotFoundError(Exception):
     pass
 
 
+class SpecFileLoader(object):
+    """Reads the JSON and YAML files of a Swagger 2.0 spec. This is used by
+    :class:`bravado_core.spec.Spec` for `file:` urls.
+
+    YAML is parsed with libyaml when it is available. Parsing YAML is still
+    much slower than parsing JSON, so when `cache_dir` is set every parsed
+    YAML file is also stored there as JSON, and later loads use that copy as
+    long as the YAML file is unchanged.
+
+    :param cache_dir: directory for the JSON copies of YAML files, or None
+        to disable caching.
+    :param memory_cache: also keep the JSON copies in memory, so that
+        loading the spec again only parses the YAML files which changed.
+    """
+
+    def __init__(self, cache_dir=None, memory_cache=False):
+        self.cache_dir = cache_dir
+        self.memory_cache = memory_cache
+        # path -> (mtime, size) of every file of the spec
+        self.files = {}
+        # The same for the files read by the build in progress, see `build`
+        self._build_files = None
+        self._memory = {}
+
+    def __call__(self, uri):
+        path = url2pathname(urlparse.urlparse(uri).path)
+        stat = os.stat(path)
+        files = self.files if self._build_files is None else self._build_files
+        files[path] = (stat.st_mtime, stat.st_size)
+        if is_yaml(path):
+            return self.load_yaml(path, stat)
+        with open(path, 'rb') as spec_file:
+            return simplejson.loads(spec_file.read().decode('utf-8'))
+
+    @contextmanager
+    def build(self):
+        """Context manager around a new build of the spec. The files read in
+        it replace `files` when it succeeds, so the files which were removed
+        or are no longer referenced stop being checked. When it raises,
+        `files` is left as it was.
+        """
+        self._build_files = {}
+        try:
+            yield
+            self.files = self._build_files
+            for path in set(self._memory) - set(self.files):
+                del self._memory[path]
+        finally:
+            self._build_files = None
+
+    def changed_files(self):
+        """
+        :returns: the files of the spec which were modified or removed since
+            they were read
+        :rtype: list
+        """
+        changed = []
+        for path, (mtime, size) in iteritems(self.files):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                changed.append(path)
+                continue
+            if (stat.st_mtime, stat.st_size) != (mtime, size):
+                changed.append(path)
+        return changed
+
+    def get_cache_path(self, path):
+        key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, '{0}.json'.format(key))
+
+    def load_yaml(self, path, stat=None):
+        stat = stat or os.stat(path)
+        file_key = (stat.st_mtime, stat.st_size)
+
+        if self.memory_cache and path in self._memory:
+            cached_key, cached_json = self._memory[path]
+            if cached_key == file_key:
+                return simplejson.loads(cached_json)
+
+        if self.cache_dir:
+            spec_dict = self._load_yaml_with_cache(path, stat)
+        else:
+            with open(path, 'rb') as spec_file:
+                spec_dict = yaml.load(spec_file, Loader=SafeLoader)
+
+        if self.memory_cache:
+            spec_json = self._to_json(path, spec_dict)
+            if spec_json is not None:
+                self._memory[path] = (file_key, spec_json)
+        return spec_dict
+
+    def _load_yaml_with_cache(self, path, stat):
+        cache_path = self.get_cache_path(path)
+        cached = self._read_cache(cache_path)
+        if (
+            cached
+            and cached['mtime'] == stat.st_mtime
+            and cached['size'] == stat.st_size
+        ):
+            return cached['spec']
+
+        with open(path, 'rb') as spec_file:
+            content = spec_file.read()
+        digest = hashlib.sha256(content).hexdigest()
+
+        if cached and cached['sha256'] == digest:
+            spec_dict = cached['spec']
+        else:
+            spec_dict = yaml.load(content, Loader=SafeLoader)
+
+        self._write_cache(cache_path, {
+            'path': path,
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'sha256': digest,
+            'spec': spec_dict,
+        })
+        return spec_dict
+
+    @staticmethod
+    def _to_json(path, value):
+        """
+        :returns: `value` as JSON, or None if it does not convert to JSON
+            as is.
+        """
+        try:
+            content = simplejson.dumps(value)
+        except TypeError:
+            content = None
+        # YAML has types JSON does not (dates, non-string keys...). Files
+        # using them are not cached rather than cached differently.
+        if content is None or simplejson.loads(content) != value:
+            log.debug('Not caching %s: it does not convert to JSON', path)
+            return None
+        return content
+
+    @staticmethod
+    def _read_cache(cache_path):
+        try:
+            with open(cache_path, 'rb') as cache_file:
+                return simplejson.loads(cache_file.read().decode('utf-8'))
+        except (IOError, ValueError):
+            return None
+
+    def _write_cache(self, cache_path, cached):
+        content = self._to_json(cached['path'], cached)
+        if content is None:
+            return
+
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(fd, 'wb') as tmp_file:
+                tmp_file.write(content.encode('utf-8'))
+            os.rename(tmp_path, cache_path)
+        except (IOError, OSError) as e:
+            log.warning('Could not write the spec cache %s: %s', cache_path, e)
+
+
+class PyramidSwaggerSpec(Spec):
+    """A :class:`bravado_core.spec.Spec` reading its files, including the
+    ones it resolves `$ref`s to, through a :class:`SpecFileLoader`.
+    """
+
+    file_loader = None
+
+    def get_ref_handlers(self):
+        handlers = super(PyramidSwaggerSpec, self).get_ref_handlers()
+        if self.file_loader is not None:
+            handlers['file'] = self.file_loader
+        return handlers
+
+    def __getstate__(self):
+        state = super(PyramidSwaggerSpec, self).__getstate__()
+        state.pop('file_loader', None)
+        return state
+
+
 class ResourceListingGenerationError(Exception):
     pass
 
 
+class UnsupportedBravadoCoreError(Exception):
+    pass
+
+
+# Attributes of :class:`bravado_core.spec.Spec` used by `dereference_spec`,
+# private ones included
+BRAVADO_CORE_SPEC_INTERNALS = (
+    '_internal_spec_dict',
+    '_request_to_op_map',
+    'deref_flattened_spec',
+    'resources',
+)
+
+
 def find_resource_names(api_docs_json):
     return [api['path'].lstrip('/') for api in api_docs_json['apis']]
 
@@ -129,15 +346,28 @@ def get_resource_listing(schema_dir, should_generate_resource_listing):
     return generate_resource_listing(schema_dir, resource_listing)
 
 
-def compile_swagger_schema(schema_dir, resource_listing):
+def compile_swagger_schema(schema_dir, resource_listing, lazy_validators=False,
+                           compiled_validators=False, dereference_models=False):
     """Build a SwaggerSchema from various files.
 
     :param schema_dir: the directory schema files live inside
     :type schema_dir: string
+    :param lazy_validators: build the validators of each operation on first
+        use instead of upfront
+    :type lazy_validators: boolean
+    :param compiled_validators: compile the schemas of the validators to
+        python functions
+    :type compiled_validators: boolean
+    :param dereference_models: validate against schemas where the references
+        to models are replaced by the models
+    :type dereference_models: boolean
     :returns: a SwaggerSchema object
     """
     mapping = build_schema_mapping(schema_dir, resource_listing)
-    resource_validators = ingest_resources(mapping, schema_dir)
+    resource_validators = ingest_resources(
+        mapping, schema_dir, lazy_validators=lazy_validators,
+        compiled_validators=compiled_validators,
+        dereference_models=dereference_models)
     endpoints = list(build_swagger_12_endpoints(resource_listing, mapping))
     return SwaggerSchema(endpoints, resource_validators)
 
@@ -154,18 +384,40 @@ def get_swagger_schema(settings):
     :returns: a :class:`pyramid_swagger.model.SwaggerSchema`
     """
     schema_dir = settings.get('pyramid_swagger.schema_directory', 'api_docs')
-    resource_listing = get_resource_listing(
-        schema_dir,
-        settings.get('pyramid_swagger.generate_resource_listing', False)
-    )
+    with startup_phase(settings, 'read resource listing'):
+        resource_listing = get_resource_listing(
+            schema_dir,
+            settings.get('pyramid_swagger.generate_resource_listing', False)
+        )
 
     if settings.get('pyramid_swagger.enable_swagger_spec_validation', True):
-        validate_swagger_schema(schema_dir, resource_listing)
+        with startup_phase(settings, 'validate_swagger_schema'):
+            validate_swagger_schema(schema_dir, resource_listing)
+
+    compact_spec = asbool(settings.get('pyramid_swagger.compact_spec', False))
+    # To measure the memory freed by the compaction
+    with trace_memory(compact_spec):
+        with startup_phase(settings, 'compile_swagger_schema'):
+            schema = compile_swagger_schema(
+                schema_dir,
+                resource_listing,
+                lazy_validators=asbool(settings.get(
+                    'pyramid_swagger.lazy_validators', False)),
+                compiled_validators=(
+                    get_validation_backend(settings) == VALIDATION_BACKEND_COMPILED),
+                dereference_models=asbool(settings.get(
+                    'pyramid_swagger.dereference_schemas', False)),
+            )
 
-    return compile_swagger_schema(schema_dir, resource_listing)
+        if compact_spec:
+            with startup_phase(settings, 'compact schema'):
+                stats = compact(get_swagger_12_schema_roots(schema))
+            log_compaction('swagger 1.2 schema', stats)
+            settings['pyramid_swagger.schema12_compaction'] = stats
+    return schema
 
 
-def get_swagger_spec(settings):
+def get_swagger_spec(settings, file_loader=None):
     """Return a :class:`bravado_core.spec.Spec` constructed from
     the swagger specs in `pyramid_swagger.schema_directory`. If
     `pyramid_swagger.enable_swagger_spec_validation` is enabled the schema
@@ -174,6 +426,8 @@ def get_swagger_spec(settings):
     :param settings: a pyramid registry settings with configuration for
         building a swagger schema
     :type settings: dict
+    :param file_loader: the :class:`SpecFileLoader` reading the spec files.
+        A new one is created from `settings` when None.
     :rtype: :class:`bravado_core.spec.Spec`
     """
     schema_dir = settings.get('pyramid_swagger.schema_directory', 'api_docs/')
@@ -182,14 +436,75 @@ def get_swagger_spec(settings):
     schema_path = os.path.join(schema_dir, schema_filename)
     schema_url = urlparse.urljoin('file:', pathname2url(os.path.abspath(schema_path)))
 
-    handlers = build_http_handlers(None)  # don't need http_client for file:
-    file_handler = handlers['file']
-    spec_dict = file_handler(schema_url)
-
-    return Spec.from_dict(
-        spec_dict,
-        config=create_bravado_core_config(settings),
-        origin_url=schema_url)
+    if file_loader is None:
+        file_loader = SpecFileLoader(
+            cache_dir=settings.get('pyramid_swagger.yaml_cache_directory'))
+
+    compact_spec = asbool(settings.get('pyramid_swagger.compact_spec', False))
+    # To measure the memory freed by the compaction
+    with trace_memory(compact_spec):
+        spec = _build_swagger_spec(settings, schema_url, file_loader)
+        if compact_spec:
+            with startup_phase(settings, 'compact spec'):
+                stats = compact(
+                    get_swagger_20_spec_roots(spec), holders=[spec])
+            log_compaction('swagger 2.0 spec', stats)
+            settings['pyramid_swagger.schema20_compaction'] = stats
+    return spec
+
+
+def _build_swagger_spec(settings, schema_url, file_loader):
+    with startup_phase(settings, 'read spec file'):
+        spec_dict = file_loader(schema_url)
+
+    with startup_phase(settings, 'Spec.from_dict'):
+        spec = PyramidSwaggerSpec(
+            spec_dict,
+            config=create_bravado_core_config(settings),
+            origin_url=schema_url)
+        spec.file_loader = file_loader
+        spec.build()
+
+    if asbool(settings.get('pyramid_swagger.dereference_schemas', False)):
+        with startup_phase(settings, 'dereference spec'):
+            dereference_spec(spec)
+
+    return spec
+
+
+def dereference_spec(spec):
+    """Make the operations of `spec` use its dereferenced spec dict, where
+    every `$ref` is replaced by what it refers to, so unmarshalling and
+    validating requests and responses does not go through `spec.resolver`.
+    Recursive models become cyclic schemas.
+
+    bravado-core's `internally_dereference_refs` does the same while
+    building the spec, but its model discovery does not terminate on
+    recursive specs. `spec.spec_dict`, which is served to clients, keeps its
+    `$ref`s.
+
+    It relies on internals of bravado-core, listed in
+    `BRAVADO_CORE_SPEC_INTERNALS`, and on the range of bravado-core versions
+    pinned in setup.py.
+
+    :type spec: :class:`bravado_core.spec.Spec`
+    :raises: UnsupportedBravadoCoreError when the installed bravado-core lacks
+        one of these internals.
+    """
+    missing = [
+        name for name in BRAVADO_CORE_SPEC_INTERNALS
+        if not hasattr(spec, name)
+    ]
+    if missing:
+        raise UnsupportedBravadoCoreError(
+            "pyramid_swagger.dereference_schemas is not supported by this "
+            "bravado-core version, its Spec has no {0}".format(
+                ', '.join(missing)),
+        )
+    spec._internal_spec_dict = spec.deref_flattened_spec
+    spec.resources = build_resources(spec)
+    # Rebuilt from the new resources on the next lookup
+    spec._request_to_op_map = None
 
 
 def create_bravado_core_config(settings):
@@ -230,20 +545,33 @@ def create_bravado_core_config(settings):
     return configs
 
 
-def ingest_resources(mapping, schema_dir):
+def ingest_resources(mapping, schema_dir, lazy_validators=False,
+                     compiled_validators=False, dereference_models=False):
     """Consume the Swagger schemas and produce a queryable datastructure.
 
     :param mapping: Map from resource name to filepath of its api declaration
     :type mapping: dict
     :param schema_dir: the directory schema files live inside
     :type schema_dir: string
+    :param lazy_validators: build the validators of each operation on first
+        use instead of upfront
+    :type lazy_validators: boolean
+    :param compiled_validators: compile the schemas of the validators to
+        python functions
+    :type compiled_validators: boolean
+    :param dereference_models: validate against schemas where the references
+        to models are replaced by the models
+    :type dereference_models: boolean
     :returns: A list of mapping from :class:`RequestMatcher` to
         :class:`ValidatorMap`
     """
     ingested_resources = []
     for name, filepath in iteritems(mapping):
         try:
-            ingested_resources.append(load_schema(filepath))
+            ingested_resources.append(
+                load_schema(filepath, lazy=lazy_validators,
+                            compiled=compiled_validators,
+                            dereference=dereference_models))
         # If we have trouble reading any files, raise a more user-friendly
         # error.
         except IOError:
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Reject Swagger 2.0 request bodies which are too large or too deeply nested
+for their operation, before they are parsed.
+
+The limits of an operation are derived from the schema of its body parameter
+(`maxLength`, `maxItems`, `enum`, `additionalProperties`...) and from the
+optional `x-max-body-bytes` vendor extension of the operation. The byte
+limit derived from a schema is conservative: it is the size of the largest
+valid body with every character escaped, plus `WHITESPACE_PER_VALUE` bytes
+of whitespace around every value. Bodies with duplicated object keys are not
+accounted for.
+"""
+from __future__ import absolute_import
+
+import math
+import re
+import weakref
+from collections import namedtuple
+
+import six
+from bravado_core.content_type import APP_MSGPACK
+from six import iteritems
+from six import itervalues
+
+from pyramid_swagger.exceptions import RequestEntityTooLargeError
+from pyramid_swagger.exceptions import RequestValidationError
+
+
+# Whitespace allowed around each value of a body, for pretty printed JSON
+WHITESPACE_PER_VALUE = 128
+
+# A character escaped as an UTF-16 surrogate pair, e.g. "😀"
+MAX_BYTES_PER_CHAR = 12
+
+_JSON_STRING = re.compile(br'"(?:[^"\\]|\\.)*"')
+_NOT_BRACKETS = re.compile(br'[^\[\]{}]+')
+_OPENING_BRACKETS = frozenset(bytearray(b'[{'))
+
+
+class BodyLimits(namedtuple('BodyLimits', ['max_bytes', 'max_depth'])):
+    """Limits of the request bodies of an operation.
+
+    :param max_bytes: maximum size of the body, or None
+    :param max_depth: maximum nesting of arrays and objects in a JSON body,
+        or None
+    """
+    __slots__ = ()
+
+
+def _min(*values):
+    values = [value for value in values if value is not None]
+    return min(values) if values else None
+
+
+def _max(values):
+    values = list(values)
+    if not values or None in values:
+        return None
+    return max(values)
+
+
+def _string_bytes(length):
+    return 2 + MAX_BYTES_PER_CHAR * length
+
+
+def _enum_limits(enum):
+    """Numbers are unbounded: 1, 1.0 and 1.000 are all the same enum value."""
+    max_bytes = 0
+    for value in enum:
+        if value is None:
+            max_bytes = max(max_bytes, 4)
+        elif isinstance(value, bool):
+            max_bytes = max(max_bytes, 5)
+        elif isinstance(value, six.string_types):
+            max_bytes = max(max_bytes, _string_bytes(len(value)))
+        else:
+            return None, None
+    return max_bytes, 0
+
+
+def _integer_bytes(schema):
+    if 'minimum' not in schema or 'maximum' not in schema:
+        return None
+    # JSON integers have neither leading zeros nor exponent
+    return max(
+        len(str(int(math.floor(schema['minimum'])))),
+        len(str(int(math.ceil(schema['maximum'])))),
+    )
+
+
+def _type_limits(swagger_spec, schema, schema_type, stack):
+    if schema_type == 'string':
+        max_length = schema.get('maxLength')
+        return (None if max_length is None else _string_bytes(max_length)), 0
+    if schema_type == 'integer':
+        return _integer_bytes(schema), 0
+    if schema_type == 'number':
+        return None, 0
+    if schema_type == 'boolean':
+        return 5, 0
+    if schema_type == 'null':
+        return 4, 0
+
+    if schema_type == 'array':
+        items = schema.get('items')
+        if not isinstance(items, dict):
+            return None, None
+        item_bytes, item_depth = _schema_limits(swagger_spec, items, stack)
+        max_items = schema.get('maxItems')
+        max_bytes = None
+        if item_bytes is not None and max_items is not None:
+            max_bytes = 2 + max_items * (item_bytes + 1)
+        return max_bytes, (None if item_depth is None else item_depth + 1)
+
+    if schema_type == 'object':
+        if schema.get('additionalProperties', True) is not False or \
+                schema.get('patternProperties'):
+            return None, None
+        max_bytes = 2
+        max_depth = 0
+        for name, property_schema in iteritems(
+            swagger_spec.deref(schema.get('properties', {})),
+        ):
+            value_bytes, value_depth = _schema_limits(
+                swagger_spec, property_schema, stack)
+            max_bytes = None if max_bytes is None or value_bytes is None \
+                else max_bytes + _string_bytes(len(name)) + value_bytes + 2
+            max_depth = None if max_depth is None or value_depth is None \
+                else max(max_depth, value_depth)
+        return max_bytes, (None if max_depth is None else max_depth + 1)
+
+    return None, None
+
+
+def _schema_limits(swagger_spec, schema, stack=()):
+    """
+    :returns: (maximum size in bytes, maximum depth) of the JSON values valid
+        for `schema`, each one None when unbounded
+    """
+    schema = swagger_spec.deref(schema)
+    if not isinstance(schema, dict) or id(schema) in stack:
+        # Recursive schemas are unbounded
+        return None, None
+    stack = stack + (id(schema),)
+
+    schema_types = swagger_spec.deref(schema.get('type'))
+    if schema_types is None:
+        max_bytes, max_depth = None, None
+    else:
+        if not isinstance(schema_types, list):
+            schema_types = [schema_types]
+        if schema.get('x-nullable'):
+            schema_types = schema_types + ['null']
+        limits = [
+            _type_limits(swagger_spec, schema, schema_type, stack)
+            for schema_type in schema_types
+        ]
+        max_bytes = _max(limit[0] for limit in limits)
+        max_depth = _max(limit[1] for limit in limits)
+
+    if 'enum' in schema:
+        enum_bytes, enum_depth = _enum_limits(schema['enum'])
+        max_bytes = _min(max_bytes, enum_bytes)
+        max_depth = _min(max_depth, enum_depth)
+
+    for sub_schema in schema.get('allOf', []):
+        sub_bytes, sub_depth = _schema_limits(swagger_spec, sub_schema, stack)
+        max_bytes = _min(max_bytes, sub_bytes)
+        max_depth = _min(max_depth, sub_depth)
+
+    for keyword in ('anyOf', 'oneOf'):
+        if keyword in schema:
+            limits = [
+                _schema_limits(swagger_spec, sub_schema, stack)
+                for sub_schema in schema[keyword]
+            ]
+            max_bytes = _min(max_bytes, _max(limit[0] for limit in limits))
+            max_depth = _min(max_depth, _max(limit[1] for limit in limits))
+
+    if max_bytes is not None:
+        max_bytes += WHITESPACE_PER_VALUE
+    return max_bytes, max_depth
+
+
+def get_schema_limits(swagger_spec, schema):
+    """
+    :type swagger_spec: :class:`bravado_core.spec.Spec`
+    :param schema: a schema object of `swagger_spec`
+    :rtype: :class:`BodyLimits`
+    """
+    return BodyLimits(*_schema_limits(swagger_spec, schema))
+
+
+# :class:`bravado_core.operation.Operation` -> :class:`BodyLimits`
+_body_limits = weakref.WeakKeyDictionary()
+
+
+def get_body_limits(op):
+    """
+    :type op: :class:`bravado_core.operation.Operation`
+    :rtype: :class:`BodyLimits`
+    """
+    limits = _body_limits.get(op)
+    if limits is None:
+        max_body_bytes = op.op_spec.get('x-max-body-bytes')
+        limits = BodyLimits(
+            None if max_body_bytes is None else int(max_body_bytes), None)
+        for param in itervalues(op.params):
+            if param.location == 'body':
+                schema_limits = get_schema_limits(
+                    op.swagger_spec, param.param_spec.get('schema', {}))
+                limits = BodyLimits(
+                    _min(limits.max_bytes, schema_limits.max_bytes),
+                    schema_limits.max_depth,
+                )
+        _body_limits[op] = limits
+    return limits
+
+
+def get_json_depth(body, max_depth=None):
+    """
+    :param body: a JSON document
+    :type body: bytes
+    :param max_depth: stop once the nesting goes deeper than `max_depth`
+    :returns: the maximum nesting of arrays and objects in `body`
+    :rtype: int
+    """
+    brackets = _NOT_BRACKETS.sub(b'', _JSON_STRING.sub(b'', body))
+    depth = deepest = 0
+    for bracket in bytearray(brackets):
+        if bracket in _OPENING_BRACKETS:
+            depth += 1
+            if depth > deepest:
+                deepest = depth
+                if max_depth is not None and deepest > max_depth:
+                    break
+        else:
+            depth -= 1
+    return deepest
+
+
+def _read_body(pyramid_request, max_bytes):
+    content_length = pyramid_request.content_length
+    if max_bytes is None:
+        return pyramid_request.body
+    if content_length is not None:
+        if content_length > max_bytes:
+            raise RequestEntityTooLargeError(
+                'Request body is {0} bytes, which is more than the {1} bytes '
+                'allowed'.format(content_length, max_bytes))
+        return pyramid_request.body
+
+    # Unknown length: never read more than allowed
+    body = pyramid_request.body_file.read(max_bytes + 1)
+    if len(body) > max_bytes:
+        raise RequestEntityTooLargeError(
+            'Request body is more than the {0} bytes allowed'.format(max_bytes))
+    pyramid_request.body = body
+    return body
+
+
+def enforce_body_limits(request, op):
+    """Check the body of `request` against the limits of `op`. The body is
+    not parsed, and not read at all when it has a too large Content-Length.
+
+    :type request: :class:`pyramid_swagger.tween.PyramidSwaggerRequest`
+    :type op: :class:`bravado_core.operation.Operation`
+    :raises: RequestEntityTooLargeError, RequestValidationError
+    """
+    limits = get_body_limits(op)
+    pyramid_request = request.request
+    if limits == (None, None) or not pyramid_request.is_body_readable:
+        return
+
+    check_depth = limits.max_depth is not None and \
+        pyramid_request.content_type != APP_MSGPACK
+    if limits.max_bytes is None and not check_depth:
+        return
+
+    body = _read_body(pyramid_request, limits.max_bytes)
+    if check_depth and get_json_depth(body, limits.max_depth) > limits.max_depth:
+        raise RequestValidationError(
+            'Request body is nested deeper than the {0} levels '
+            'allowed'.format(limits.max_depth))
@@ -6,11 +6,13 @@ them during request validation.
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import threading
 from collections import namedtuple
 from copy import deepcopy
 
 import jsonschema
 import simplejson
+import six
 from jsonschema import RefResolver
 from jsonschema import validators
 from jsonschema.exceptions import ValidationError
@@ -18,6 +20,8 @@ from jsonschema.validators import Draft3Validator
 from jsonschema.validators import Draft4Validator
 from six import iteritems
 
+from pyramid_swagger.codegen import compile_schema
+from pyramid_swagger.codegen import is_valid
 from pyramid_swagger.model import partial_path_match
 
 
@@ -99,6 +103,8 @@ def build_swagger_type_validator(models):
         else:
             return _draft4_type_validator(validator, ref, instance, schema)
 
+    # Lets pyramid_swagger.codegen compile the schemas using it
+    swagger_type_validator.models = models
     return swagger_type_validator
 
 
@@ -162,7 +168,8 @@ class ValidatorMap(
     __slots__ = ()
 
     @classmethod
-    def from_operation(cls, operation, models, resolver):
+    def from_operation(cls, operation, models, resolver, compiled=False,
+                       dereferenced=False):
         args = []
         for schema, validator in [
             (build_param_schema(operation, 'query'), Swagger12ParamValidator),
@@ -170,17 +177,48 @@ class ValidatorMap(
             (build_param_schema(operation, 'form'), Swagger12ParamValidator),
             (build_param_schema(operation, 'header'), Swagger12ParamValidator),
             (extract_body_schema(operation), get_body_validator(models)),
-            (extract_response_body_schema(operation, models),
+            (extract_response_body_schema(operation, models, dereferenced),
                 Draft4Validator),
         ]:
             args.append(SchemaValidator.from_schema(
                 schema,
                 resolver,
-                validator))
+                validator,
+                compiled=compiled))
 
         return cls(*args)
 
 
+class LazyValidatorMap(object):
+    """Stands in for a :class:`ValidatorMap`, which is only built the first
+    time one of its validators is used.
+    """
+
+    def __init__(self, operation, models, resolver, compiled=False,
+                 dereferenced=False):
+        self._args = (operation, models, resolver, compiled, dereferenced)
+        self._validator_map = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_built(self):
+        return self._validator_map is not None
+
+    def build(self):
+        """
+        :rtype: :class:`ValidatorMap`
+        """
+        if self._validator_map is None:
+            with self._lock:
+                if self._validator_map is None:
+                    self._validator_map = ValidatorMap.from_operation(
+                        *self._args)
+        return self._validator_map
+
+    def __getattr__(self, name):
+        return getattr(self.build(), name)
+
+
 class SchemaValidator(object):
     """A Validator used by :mod:`pyramid_swagger.tween` to validate a
     field from the request or response.
@@ -190,14 +228,18 @@ class SchemaValidator(object):
     :param validator: a Validator which a func:`validate` method
         for validating a field from a request or response. This
         will often be a :class:`jsonschema.validator.Validator`.
+    :param check: an optional function compiled from `schema` by
+        :mod:`pyramid_swagger.codegen`. Values it accepts are not validated by
+        `validator`.
     """
 
-    def __init__(self, schema, validator):
+    def __init__(self, schema, validator, check=None):
         self.schema = schema
         self.validator = validator
+        self.check = check
 
     @classmethod
-    def from_schema(cls, schema, resolver, validator_class):
+    def from_schema(cls, schema, resolver, validator_class, compiled=False):
         type_checker = deepcopy(validator_class.TYPE_CHECKER)
         type_checker.redefine_many({
             type_name: lambda checker, value: all(check(value) for check in checks)
@@ -207,9 +249,11 @@ class SchemaValidator(object):
             validator_class,
             type_checker=type_checker,
         )
-        return cls(
-            schema,
-            extended_validator_class(schema, resolver=resolver))
+        validator = extended_validator_class(schema, resolver=resolver)
+        check = None
+        if compiled and schema:
+            check = compile_schema(schema, validator, resolver)
+        return cls(schema, validator, check)
 
     def validate(self, values):
         """Validate a :class:`dict` of values. If `self.schema` is falsy this
@@ -217,19 +261,31 @@ class SchemaValidator(object):
         """
         if not self.schema or (values is None and not self.schema.get('required', False)):
             return
+        if self.check is not None and is_valid(self.check, values):
+            return
         self.validator.validate(values)
 
 
-def build_request_to_validator_map(schema, resolver):
+def build_request_to_validator_map(schema, resolver, lazy=False,
+                                   compiled=False, dereferenced=False):
     """Build a mapping from :class:`RequestMatcher` to :class:`ValidatorMap`
     for each operation in the API spec. This mapping may be used to retrieve
     the appropriate validators for a request.
+
+    :param lazy: when True, map to :class:`LazyValidatorMap` instead so the
+        validators of an operation are only built when first used.
+    :param compiled: compile the schemas of the validators, see
+        :mod:`pyramid_swagger.codegen`
+    :param dereferenced: whether `schema` went through
+        :func:`dereference_models`
     """
     schema_models = schema.get('models', {})
+    validator_map_class = LazyValidatorMap if lazy else ValidatorMap.from_operation
     return dict(
         (
             RequestMatcher(api['path'], operation['method']),
-            ValidatorMap.from_operation(operation, schema_models, resolver)
+            validator_map_class(operation, schema_models, resolver,
+                                compiled=compiled, dereferenced=dereferenced)
         )
         for api in schema['apis']
         for operation in api['operations']
@@ -251,8 +307,10 @@ class RequestMatcher(object):
         return partial_path_match(request.path_info, self.path) and request.method == self.method
 
 
-def extract_response_body_schema(operation, schema_models):
+def extract_response_body_schema(operation, schema_models, dereferenced=False):
     if operation['type'] in schema_models:
+        if dereferenced:
+            return schema_models[operation['type']]
         return extract_validatable_type(operation['type'], schema_models)
 
     acceptable_fields = (
@@ -267,6 +325,61 @@ def extract_response_body_schema(operation, schema_models):
     )
 
 
+def dereference_models(schema):
+    """Replace, in place, the references to models in the parameters, response
+    items and models of a Swagger 1.2 api declaration with the models
+    themselves, so validating against them does not resolve anything.
+    Recursive models become cyclic schemas.
+
+    A `$ref` is replaced by its model. A `type` naming a model is replaced by
+    an `allOf` holding the model, keeping the other fields of the schema.
+
+    :param schema: an api declaration
+    :type schema: dict
+    :returns: `schema`
+    """
+    models = schema.get('models', {})
+
+    def resolve(value):
+        if not isinstance(value, dict):
+            return value
+        ref = value.get('$ref')
+        if ref in models:
+            return models[ref]
+        type_name = value.get('type')
+        if isinstance(type_name, six.string_types) and type_name in models:
+            value = dict(
+                (key, field) for key, field in iteritems(value)
+                if key != 'type'
+            )
+            value['allOf'] = [models[type_name]]
+        return value
+
+    stack = list(models.values())
+    for api in schema.get('apis', []):
+        for operation in api.get('operations', []):
+            stack.append(operation.get('parameters', []))
+            if 'items' in operation:
+                operation['items'] = resolve(operation['items'])
+                stack.append(operation['items'])
+
+    seen = set()
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, dict):
+            for key, value in list(iteritems(obj)):
+                obj[key] = resolve(value)
+                stack.append(obj[key])
+        elif isinstance(obj, list):
+            for index, value in enumerate(obj):
+                obj[index] = resolve(value)
+                stack.append(obj[index])
+    return schema
+
+
 def extract_validatable_type(type_name, models):
     """Returns a jsonschema-compatible typename from the Swagger type.
 
@@ -283,14 +396,21 @@ def extract_validatable_type(type_name, models):
         return {'type': type_name}
 
 
-def load_schema(schema_path):
+def load_schema(schema_path, lazy=False, compiled=False, dereference=False):
     """Prepare the api specification for request and response validation.
 
+    :param lazy: build the validators of each operation on first use
+    :param compiled: compile the schemas of the validators
+    :param dereference: validate against schemas where the references to
+        models are replaced by the models, see :func:`dereference_models`
     :returns: a mapping from :class:`RequestMatcher` to :class:`ValidatorMap`
         for every operation in the api specification.
     :rtype: dict
     """
     with open(schema_path, 'r') as schema_file:
         schema = simplejson.load(schema_file)
+    if dereference:
+        dereference_models(schema)
     resolver = RefResolver('', '', schema.get('models', {}))
-    return build_request_to_validator_map(schema, resolver)
+    return build_request_to_validator_map(
+        schema, resolver, lazy=lazy, compiled=compiled, dereferenced=dereference)
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+Measure the memory held by pyramid_swagger after `includeme`, per component,
+and the memory allocated by the requests it validates.
+
+Components are measured by walking the objects they refer to, each object
+being attributed to the first component reaching it. Classes and functions
+importable from a module, modules, and the Pyramid registry are shared with
+the rest of the process, and are not attributed to any component.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+import types
+from collections import OrderedDict
+
+from pyramid.config import Configurator
+from six import iteritems
+
+from pyramid_swagger.load_schema import SchemaValidator
+
+
+# Allocations of the top files are reported
+TOP_FILES = 10
+
+
+def _is_importable(obj):
+    module = sys.modules.get(getattr(obj, '__module__', None) or '')
+    if module is None:
+        return False
+    value = module
+    for name in getattr(obj, '__qualname__', '').split('.'):
+        value = getattr(value, name, None)
+    return value is obj
+
+
+def _is_shared(obj):
+    if isinstance(obj, (types.ModuleType, types.CodeType)):
+        return True
+    if isinstance(obj, (type, types.FunctionType, types.BuiltinFunctionType)):
+        return _is_importable(obj)
+    return False
+
+
+def deep_sizeof(obj, seen):
+    """Size in bytes of `obj` and of the objects it refers to, except the
+    shared ones and the ones in `seen`.
+
+    :param seen: set of the ids of the objects already measured, updated
+        with the ids of the objects measured
+    """
+    size = 0
+    pending = [obj]
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen or _is_shared(obj):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        pending.extend(gc.get_referents(obj))
+    return size
+
+
+def get_rss():
+    """
+    :returns: resident set size of the process in bytes, or None when it is
+        not available
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def _iter_objects(root, object_type):
+    """Objects of `object_type` reachable from `root`, except through shared
+    objects.
+    """
+    seen = set()
+    pending = [root]
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen or _is_shared(obj):
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, object_type):
+            yield obj
+        pending.extend(gc.get_referents(obj))
+
+
+def iter_components(registry):
+    """The components making up pyramid_swagger in `registry`, in the order
+    they are measured.
+
+    :returns: iterator of (name, object) pairs
+    """
+    settings = registry.settings
+    spec = settings.get('pyramid_swagger.schema20')
+    if spec is not None:
+        yield 'spec_dict', spec.spec_dict
+        # Cached properties are only measured once computed
+        yield 'client_spec_dict', spec.__dict__.get('client_spec_dict')
+        yield 'flattened_spec', [
+            spec.__dict__.get('flattened_spec'),
+            settings.get('pyramid_swagger.schema20_resolved'),
+        ]
+        yield 'spec', spec
+    yield 'schema20_artifact', settings.get('pyramid_swagger.schema20_artifact')
+
+    schema12 = settings.get('pyramid_swagger.schema12')
+    if schema12 is not None:
+        yield 'schema12.validator_classes', [
+            type(schema_validator.validator)
+            for schema_validator in _iter_objects(schema12, SchemaValidator)
+        ]
+        yield 'schema12.validator_maps', schema12.resource_validators
+        yield 'schema12', schema12
+
+    for name in ('request_cache', 'stats', 'spec_reloader'):
+        yield name, settings.get('pyramid_swagger.' + name)
+
+    views = [
+        view['introspectable']
+        for view in registry.introspector.get_category('views') or []
+    ]
+    yield 'api_doc_views', [
+        view['callable'] for view in views
+        if (view['route_name'] or '').startswith('pyramid_swagger')
+    ]
+
+
+def measure_components(registry):
+    """
+    :type registry: :class:`pyramid.registry.Registry`
+    :returns: dict of component name -> bytes
+    :rtype: :class:`collections.OrderedDict`
+    """
+    seen = set([id(registry), id(registry.settings)])
+    sizes = OrderedDict()
+    # Kept alive so that the ids in `seen` are not reused
+    components = []
+    for name, component in iter_components(registry):
+        if component is not None:
+            components.append(component)
+            sizes[name] = deep_sizeof(component, seen)
+    return sizes
+
+
+def measure_includeme(settings):
+    """Include pyramid_swagger in an application configured with `settings`,
+    and measure the memory it takes.
+
+    :type settings: dict
+    :returns: JSON serializable report, with the bytes of each of the
+        `components`, the bytes `allocated` while including pyramid_swagger and
+        still allocated after, the `top_files` allocating them, and the
+        `rss_delta` of the process when it is available
+    :rtype: dict
+    """
+    gc.collect()
+    rss_before = get_rss()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        config = Configurator(settings=dict(settings))
+        config.include('pyramid_swagger')
+        config.commit()
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    rss_after = get_rss()
+
+    stats = after.compare_to(before, 'filename')
+    return {
+        'components': measure_components(config.registry),
+        'allocated': sum(stat.size_diff for stat in stats),
+        'top_files': [
+            {'file': stat.traceback[0].filename, 'bytes': stat.size_diff}
+            for stat in stats[:TOP_FILES]
+        ],
+        'rss_delta': None if rss_before is None or rss_after is None
+        else rss_after - rss_before,
+    }
+
+
+def format_report(report):
+    """
+    :param report: a report of :func:`measure_includeme`
+    :rtype: str
+    """
+    lines = ['{0:>12}  component'.format('bytes')]
+    for name, size in iteritems(report['components']):
+        lines.append('{0:>12}  {1}'.format(size, name))
+    lines.append('{0:>12}  allocated by includeme'.format(report['allocated']))
+    if report['rss_delta'] is not None:
+        lines.append('{0:>12}  rss delta'.format(report['rss_delta']))
+    for top_file in report['top_files']:
+        lines.append('{0:>12}  {1}'.format(top_file['bytes'], top_file['file']))
+    if report.get('requests'):
+        lines.append('{0:>12}  operation'.format('peak bytes'))
+        for operation, operation_report in sorted(iteritems(report['requests'])):
+            lines.append('{0:>12}  {1}'.format(
+                operation_report['mean_peak_allocated_bytes'], operation))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    """Entry point of the `pyramid-swagger-memory` console script."""
+    parser = argparse.ArgumentParser(
+        description='Report the memory taken by pyramid_swagger, per '
+                    'component, once included in an application.',
+    )
+    parser.add_argument(
+        'config_uri',
+        help='PasteDeploy config file holding the pyramid_swagger settings, '
+             'eg. production.ini#main',
+    )
+    parser.add_argument(
+        '--schema-directory', action='append', default=[],
+        help='Measure this schema directory instead of the configured one. '
+             'Can be repeated',
+    )
+    parser.add_argument(
+        '--traffic',
+        help='Also measure the memory allocated by the requests of this file '
+             'of recorded traffic',
+    )
+    parser.add_argument(
+        '--json', action='store_true',
+        help='Write the report as JSON, eg. to compare versions',
+    )
+    args = parser.parse_args(argv)
+
+    from pyramid.paster import get_appsettings
+    from pyramid_swagger.recorder import read_traffic
+    from pyramid_swagger.replay import replay
+    settings = dict(get_appsettings(args.config_uri))
+    schema_directories = args.schema_directory or [
+        settings.get('pyramid_swagger.schema_directory')]
+
+    reports = OrderedDict()
+    for schema_directory in schema_directories:
+        directory_settings = dict(settings)
+        if schema_directory:
+            directory_settings['pyramid_swagger.schema_directory'] = \
+                schema_directory
+        report = measure_includeme(directory_settings)
+        if args.traffic:
+            report['requests'] = replay(
+                directory_settings, read_traffic(args.traffic),
+                iterations=0, measure_allocations=True,
+            ).summary()['operations']
+        reports[schema_directory] = report
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        for schema_directory, report in iteritems(reports):
+            print('{0}:\n{1}\n'.format(schema_directory, format_report(report)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
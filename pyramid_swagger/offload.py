@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Validate large Swagger 2.0 request and response bodies in a pool of
+processes.
+
+Validating a large body holds the GIL for as long as it takes, stalling the
+other threads of a threaded server. Above a configured size, the tween hands
+the raw body to a worker process instead, which validates it against its own
+copy of the spec, and waits for the verdict without holding the GIL.
+"""
+from __future__ import absolute_import
+
+import logging
+import multiprocessing
+import multiprocessing.pool
+import pickle
+import threading
+
+from bravado_core.operation import Operation
+from pyramid.httpexceptions import HTTPException
+from pyramid.request import Request
+from pyramid.response import Response
+from pyramid.settings import asbool
+
+from pyramid_swagger.codegen import get_validation_backend
+from pyramid_swagger.limits import enforce_body_limits as check_body_limits
+from pyramid_swagger.streaming import get_stream_body_min_size
+from pyramid_swagger.tween import build_swagger20_handler
+from pyramid_swagger.tween import PyramidSwaggerRequest
+
+
+log = logging.getLogger(__name__)
+
+
+DEFAULT_OFFLOAD_PROCESSES = 2
+
+# Worker processes are not forked from the server, whose threads may hold
+# locks which would never be released in the workers
+START_METHOD = 'spawn'
+
+
+# The spec and handler of a worker process, see :func:`_init_worker`
+_worker_spec = None
+_worker_handler = None
+
+
+def _init_worker(swagger_spec, handler_args):
+    global _worker_spec, _worker_handler
+    _worker_spec = swagger_spec
+    _worker_handler = build_swagger20_handler(*handler_args)
+
+
+def _call_in_worker(handle, op_key, *args):
+    """
+    :returns: ('ok', result) or ('error', HTTP error). The error keeps its
+        `child` validation error.
+    """
+    op = _worker_spec.get_op_for_request(*op_key)
+    try:
+        return 'ok', handle(op, *args)
+    except HTTPException as exc:
+        # Tracebacks cannot be sent between processes
+        exc.__dict__.pop('_traceback', None)
+        return 'error', exc
+
+
+def _handle_request(op, method, path_qs, headers, body, match):
+    request = Request.blank(path_qs, method=method, headers=headers)
+    request.body = body
+    return _worker_handler.handle_request(
+        PyramidSwaggerRequest(request, {'match': match}), op)
+
+
+def _handle_response(op, status, headerlist, body, kwargs):
+    response = Response(body=body, status=status, headerlist=headerlist)
+    return _worker_handler.handle_response(response, op, **kwargs)
+
+
+def _worker_handle_request(op_key, *args):
+    return _call_in_worker(_handle_request, op_key, *args)
+
+
+def _worker_handle_response(op_key, *args):
+    return _call_in_worker(_handle_response, op_key, *args)
+
+
+class OffloadPool(object):
+    """Pool of processes validating the bodies of at least `min_size` bytes
+    against `swagger_spec`.
+
+    The processes are started on the first offloaded validation, so that a
+    server forking its workers after loading the application gets a pool
+    per worker.
+
+    :type swagger_spec: :class:`bravado_core.spec.Spec`
+    :param handler_args: arguments of
+        :func:`pyramid_swagger.tween.build_swagger20_handler` building the
+        handler of the worker processes
+    :param enforce_body_limits: check the limits of the offloaded request
+        bodies in this process, before sending them to a worker process
+    """
+
+    def __init__(self, swagger_spec, min_size,
+                 processes=DEFAULT_OFFLOAD_PROCESSES, handler_args=(),
+                 enforce_body_limits=False):
+        self.swagger_spec = swagger_spec
+        self.min_size = min_size
+        self.processes = processes
+        self.handler_args = handler_args
+        self.enforce_body_limits = enforce_body_limits
+        self._pool = None
+        self._started = False
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        """The pool of processes, or None when they could not be started, eg.
+        because the spec cannot be sent to them.
+        """
+        if not self._started:
+            with self._lock:
+                if not self._started:
+                    self._pool = self._start_pool()
+                    self._started = True
+        return self._pool
+
+    def _start_pool(self):
+        try:
+            return multiprocessing.get_context(START_METHOD).Pool(
+                self.processes,
+                initializer=_init_worker,
+                initargs=(self.swagger_spec, self.handler_args),
+            )
+        except Exception:
+            log.exception('Could not start the offload processes, bodies are '
+                          'validated in the serving threads')
+            return None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        self._started = False
+
+    def should_offload(self, op, size):
+        # Reloaded specs are not the spec of the workers, and models are
+        # classes of the spec which cannot be sent back
+        return (
+            size is not None and size >= self.min_size
+            and isinstance(op, Operation)
+            and op.swagger_spec is self.swagger_spec
+            and not op.swagger_spec.config['use_models']
+        )
+
+    def _apply(self, func, op, args, fallback):
+        """
+        :returns: the result of `func` in a worker process, or of `fallback`
+            in this process when the arguments or the result of `func` cannot
+            be sent between processes
+        :raises: the HTTP error raised in the worker process
+        """
+        pool = self.pool
+        if pool is None:
+            return fallback()
+        try:
+            outcome = pool.apply(
+                func, ((op.http_method, op.path_name),) + args)
+        except (pickle.PicklingError, multiprocessing.pool.MaybeEncodingError):
+            log.exception('Could not offload the validation of %s %s',
+                          op.http_method.upper(), op.path_name)
+            return fallback()
+        if outcome[0] == 'ok':
+            return outcome[1]
+        raise outcome[1]
+
+    def offload_request(self, handle_request):
+        """
+        :param handle_request: the `handle_request` of a
+            :class:`pyramid_swagger.tween.SwaggerHandler`
+        :returns: a `handle_request` validating the large bodies in the pool
+        """
+        def offloaded_handle_request(request, op, **kwargs):
+            pyramid_request = request.request
+            if not self.should_offload(op, pyramid_request.content_length):
+                return handle_request(request, op, **kwargs)
+            if self.enforce_body_limits:
+                # Before the body is read to be sent
+                check_body_limits(request, op)
+            return self._apply(_worker_handle_request, op, (
+                pyramid_request.method,
+                pyramid_request.path_qs,
+                dict(pyramid_request.headers),
+                pyramid_request.body,
+                dict(request.path),
+            ), lambda: handle_request(request, op, **kwargs))
+
+        return offloaded_handle_request
+
+    def offload_response(self, handle_response):
+        """
+        :param handle_response: the `handle_response` of a
+            :class:`pyramid_swagger.tween.SwaggerHandler`
+        :returns: a `handle_response` validating the large bodies in the pool
+        """
+        def offloaded_handle_response(response, op, **kwargs):
+            if not self.should_offload(op, response.content_length):
+                return handle_response(response, op, **kwargs)
+            return self._apply(_worker_handle_response, op, (
+                response.status,
+                list(response.headerlist),
+                response.body,
+                kwargs,
+            ), lambda: handle_response(response, op, **kwargs))
+
+        return offloaded_handle_response
+
+
+def build_offload_pool(settings, swagger_spec):
+    """
+    :type settings: dict
+    :type swagger_spec: :class:`bravado_core.spec.Spec`
+    :returns: the :class:`OffloadPool` configured by
+        `pyramid_swagger.offload_min_size`, or None
+    """
+    min_size = settings.get('pyramid_swagger.offload_min_size')
+    if min_size is None:
+        return None
+    return OffloadPool(
+        swagger_spec,
+        int(min_size),
+        processes=int(settings.get(
+            'pyramid_swagger.offload_processes', DEFAULT_OFFLOAD_PROCESSES)),
+        # The limits are checked by the pool, not by the worker processes
+        handler_args=(
+            get_validation_backend(settings),
+            None,
+            get_stream_body_min_size(settings),
+        ),
+        enforce_body_limits=asbool(settings.get(
+            'pyramid_swagger.enforce_body_limits', False)),
+    )
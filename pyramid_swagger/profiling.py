@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+Helpers to find out where pyramid_swagger spends its time.
+"""
+from __future__ import absolute_import
+
+import cProfile
+import logging
+import os.path
+import pstats
+import random
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from pyramid.settings import asbool
+from pyramid.settings import aslist
+from six import iteritems
+
+
+log = logging.getLogger(__name__)
+
+
+DEFAULT_PROFILE_DUMP_INTERVAL = 60.0
+
+
+# Third party functions worth reporting on their own when a cProfile dump of
+# the startup is available: (label, filename suffix, function name)
+STARTUP_FUNCTIONS = [
+    ('swagger_spec_validator', 'swagger_spec_validator/validator20.py', 'validate_spec'),
+    ('swagger_spec_validator', 'swagger_spec_validator/validator12.py', 'validate_spec'),
+    ('yaml parsing', 'yaml/__init__.py', 'load'),
+    ('ref resolution', 'jsonschema/validators.py', 'resolve_from_url'),
+    ('model discovery', 'bravado_core/model.py', 'model_discovery'),
+    ('build resources', 'bravado_core/resource.py', 'build_resources'),
+    ('ref file discovery', 'pyramid_swagger/api.py', 'iter_swagger_20_schema_files'),
+]
+
+
+class StartupProfiler(object):
+    """Times the named phases of the pyramid_swagger startup.
+
+    Phases nest: a phase started while another one is running is reported as
+    its child.
+
+    :param cprofile_path: when set, the whole startup also runs under
+        :mod:`cProfile` and the stats are dumped to this path.
+    """
+
+    def __init__(self, cprofile_path=None):
+        self.cprofile_path = cprofile_path
+        self.phases = []
+        self._stack = []
+        self._profile = cProfile.Profile() if cprofile_path else None
+
+    @contextmanager
+    def phase(self, name):
+        record = {
+            'phase': name,
+            'parent': self._stack[-1]['phase'] if self._stack else None,
+            'depth': len(self._stack),
+            'seconds': None,
+        }
+        self.phases.append(record)
+        self._stack.append(record)
+        if self._profile and len(self._stack) == 1:
+            self._profile.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            self._stack.pop()
+            if self._profile and not self._stack:
+                self._profile.disable()
+
+    def function_times(self):
+        """Cumulative time spent in :data:`STARTUP_FUNCTIONS`, from the
+        cProfile stats.
+
+        :rtype: dict of label to seconds, empty if cProfile is not enabled
+        """
+        if not self._profile:
+            return {}
+
+        stats = pstats.Stats(self._profile).stats
+        times = {}
+        for label, filename, function_name in STARTUP_FUNCTIONS:
+            for (key_filename, _, key_function_name), stat in stats.items():
+                if (
+                    key_function_name == function_name
+                    and key_filename.endswith(filename)
+                ):
+                    times[label] = times.get(label, 0.0) + stat[3]
+        return times
+
+    def report(self):
+        """
+        :returns: the structured breakdown of the startup
+        :rtype: dict
+        """
+        return {
+            'phases': [dict(record) for record in self.phases],
+            'functions': self.function_times(),
+        }
+
+    def finish(self):
+        """Dump the cProfile stats, if enabled, and log the breakdown.
+
+        :returns: see :meth:`report`
+        """
+        if self._profile:
+            self._profile.dump_stats(self.cprofile_path)
+
+        report = self.report()
+        lines = ['pyramid_swagger startup profile:']
+        for record in report['phases']:
+            lines.append('{0}{1}: {2:.3f}s'.format(
+                '  ' * (record['depth'] + 1), record['phase'],
+                record['seconds'] or 0.0))
+        for label, seconds in sorted(report['functions'].items()):
+            lines.append('  [{0}]: {1:.3f}s'.format(label, seconds))
+        log.info('\n'.join(lines))
+        return report
+
+
+def build_startup_profiler(settings):
+    """
+    :type settings: dict
+    :rtype: :class:`StartupProfiler` or None if startup profiling is disabled
+    """
+    if not asbool(settings.get('pyramid_swagger.profile_startup', False)):
+        return None
+    return StartupProfiler(
+        cprofile_path=settings.get('pyramid_swagger.profile_startup_output'),
+    )
+
+
+@contextmanager
+def startup_phase(settings, name):
+    """Time the `name` phase with the startup profiler stored in `settings`.
+    This is a noop unless `pyramid_swagger.profile_startup` is enabled.
+    """
+    profiler = settings.get('pyramid_swagger.startup_profiler')
+    if profiler is None:
+        yield
+    else:
+        with profiler.phase(name):
+            yield
+
+
+class RequestProfiler(object):
+    """Runs the validation tween under :mod:`cProfile` for a random sample of
+    the requests, and aggregates the profiles per operation.
+
+    The view is not profiled: the profile is paused while the tween calls it.
+    The aggregated stats are dumped to `output_dir`, one pstats file per
+    operation, at most every `dump_interval` seconds.
+
+    :param rate: fraction of the requests profiled
+    :param route_names: when not empty, only the requests matching one of
+        these routes are profiled
+    """
+
+    def __init__(self, rate, output_dir, route_names=(),
+                 dump_interval=DEFAULT_PROFILE_DUMP_INTERVAL, rng=random):
+        self.rate = rate
+        self.output_dir = output_dir
+        self.route_names = set(route_names)
+        self.dump_interval = dump_interval
+        self.rng = rng
+        # operation id -> pstats.Stats
+        self.stats = {}
+        self._next_dump = time.monotonic() + dump_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def should_profile(self, request, route_mapper):
+        if self.rng.random() >= self.rate:
+            return False
+        if not self.route_names:
+            return True
+        route = route_mapper(request).get('route')
+        return route is not None and route.name in self.route_names
+
+    def wrap(self, tween, route_mapper):
+        """
+        :param tween: the validation tween
+        :returns: a tween profiling a sample of the requests of `tween`
+        """
+        def profiling_tween(request):
+            if not self.should_profile(request, route_mapper):
+                return tween(request)
+
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is running in this thread
+                return tween(request)
+            self._local.profile = profile
+            try:
+                return tween(request)
+            finally:
+                profile.disable()
+                self._local.profile = None
+                operation = getattr(request, 'operation', None)
+                self.add(
+                    operation.operation_id if operation is not None else None,
+                    profile,
+                )
+
+        return profiling_tween
+
+    def pause_around(self, handler):
+        """
+        :param handler: the handler called by the validation tween
+        :returns: `handler`, not profiled when called from a profiled request
+        """
+        def unprofiled_handler(request):
+            profile = getattr(self._local, 'profile', None)
+            if profile is None:
+                return handler(request)
+            profile.disable()
+            try:
+                return handler(request)
+            finally:
+                profile.enable()
+
+        return unprofiled_handler
+
+    def add(self, operation_id, profile):
+        """Aggregate a request `profile` into the stats of its operation, and
+        dump the stats when `dump_interval` elapsed since the last dump.
+
+        :param operation_id: None for requests not matching an operation
+        :type profile: :class:`cProfile.Profile`
+        """
+        key = operation_id or 'unmatched'
+        with self._lock:
+            if key in self.stats:
+                self.stats[key].add(profile)
+            else:
+                self.stats[key] = pstats.Stats(profile)
+            if time.monotonic() >= self._next_dump:
+                self._dump()
+
+    def dump(self):
+        """Write the stats of every operation to `output_dir`.
+
+        :returns: the paths of the written files
+        :rtype: list
+        """
+        with self._lock:
+            return self._dump()
+
+    def _dump(self):
+        self._next_dump = time.monotonic() + self.dump_interval
+        paths = []
+        try:
+            if not os.path.isdir(self.output_dir):
+                os.makedirs(self.output_dir)
+            for key, stats in iteritems(self.stats):
+                path = os.path.join(
+                    self.output_dir,
+                    re.sub(r'[^\w.-]', '_', key) + '.pstats',
+                )
+                stats.dump_stats(path)
+                paths.append(path)
+        except (IOError, OSError):
+            log.exception('Could not dump the request profiles to %s',
+                          self.output_dir)
+        return paths
+
+
+def build_request_profiler(settings):
+    """
+    :type settings: dict
+    :returns: the :class:`RequestProfiler` configured by
+        `pyramid_swagger.profile_sample_rate`, or None when requests are not
+        profiled
+    """
+    rate = float(settings.get('pyramid_swagger.profile_sample_rate') or 0)
+    if rate <= 0:
+        return None
+    return RequestProfiler(
+        rate,
+        output_dir=(
+            settings.get('pyramid_swagger.profile_output_dir')
+            or os.path.join(tempfile.gettempdir(), 'pyramid_swagger_profiles')
+        ),
+        route_names=aslist(settings.get('pyramid_swagger.profile_routes') or []),
+        dump_interval=float(settings.get(
+            'pyramid_swagger.profile_dump_interval',
+            DEFAULT_PROFILE_DUMP_INTERVAL,
+        )),
+    )
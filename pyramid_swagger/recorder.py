@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+Record a sample of the requests and responses going through the validation
+tween, to replay them later with :mod:`pyramid_swagger.replay`.
+
+Traffic records are dicts written one per line as JSON, to a gzip file when
+the path ends with `.gz`. They hold the `method`, the `path` with its query
+string, the `route` pattern, the `operation` id, a subset of the `headers`,
+the text `body`, and the `status`, `response_headers` and `response_body` of
+the response (`status` is None when the tween raised). Request bodies larger
+than `max_body_bytes`, or of unknown length, are not read: `body` is None and
+`body_truncated` is true. The body of streamed responses, eg. of the
+`pyramid_swagger_stream` renderer, is not recorded either: it is None and
+`response_streamed` is true. Records are also request records for
+:func:`pyramid_swagger.bulk.validate_many`.
+"""
+from __future__ import absolute_import
+
+import gzip
+import io
+import json
+import logging
+import os
+import random
+import threading
+
+from pyramid.settings import aslist
+
+
+log = logging.getLogger(__name__)
+
+
+DEFAULT_RECORD_RATE = 0.01
+
+DEFAULT_RECORDED_HEADERS = ['Content-Type', 'Accept']
+
+DEFAULT_MAX_BODY_BYTES = 1048576
+
+
+def _to_text(body):
+    # Bodies which are not utf-8 survive the round trip through JSON
+    return body.decode('utf-8', 'surrogateescape') if body else None
+
+
+def open_traffic_file(path, mode='r'):
+    """
+    :param mode: 'r' to read the traffic records, 'a' to append to them
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return io.open(path, mode, encoding='utf-8')
+
+
+def read_traffic(path):
+    """
+    :param path: file written by a :class:`TrafficRecorder`
+    :returns: iterator of traffic records
+    """
+    with open_traffic_file(path) as traffic_file:
+        try:
+            for line in traffic_file:
+                if line.strip():
+                    yield json.loads(line)
+        except EOFError:
+            # A gzip file still being recorded has no end marker yet
+            pass
+
+
+class TrafficRecorder(object):
+    """Appends a random sample of the requests going through a tween, and of
+    their responses, to `path`.
+
+    The file is opened on the first record and kept open, so a gzip file is
+    a single gzip stream. It is flushed after each record. Processes must not
+    share a file: `{pid}` in `path` is replaced by the id of the process.
+
+    :param rate: fraction of the requests recorded
+    :param headers: names of the request headers recorded. Other headers,
+        eg. cookies and credentials, are left out.
+    :param max_body_bytes: request bodies larger than this are not recorded
+    """
+
+    def __init__(self, path, rate=DEFAULT_RECORD_RATE,
+                 headers=DEFAULT_RECORDED_HEADERS, rng=random,
+                 max_body_bytes=DEFAULT_MAX_BODY_BYTES):
+        self.path = path
+        self.rate = rate
+        self.headers = headers
+        self.rng = rng
+        self.max_body_bytes = max_body_bytes
+        self._lock = threading.Lock()
+        self._file = None
+
+    def wrap(self, tween, route_mapper):
+        """
+        :param tween: the validation tween
+        :param route_mapper: the :class:`pyramid.interfaces.IRoutesMapper` of
+            the application
+        :returns: a tween recording a sample of the traffic of `tween`
+        """
+        def recording_tween(request):
+            if self.rng.random() >= self.rate:
+                return tween(request)
+
+            record = self.record_request(request, route_mapper(request))
+            try:
+                response = tween(request)
+            except Exception:
+                self.write(record)
+                raise
+            operation = getattr(request, 'operation', None)
+            if operation is not None:
+                record['operation'] = operation.operation_id
+            record.update(self.record_response(response))
+            self.write(record)
+            return response
+
+        return recording_tween
+
+    def record_request(self, request, route_info):
+        """
+        :type request: :class:`pyramid.request.Request`
+        :rtype: dict
+        """
+        route = route_info.get('route')
+        record = {
+            'method': request.method,
+            'path': request.path_qs,
+            'route': route.pattern if route is not None else None,
+            'operation': None,
+            'headers': dict(
+                (name, request.headers[name])
+                for name in self.headers
+                if name in request.headers
+            ),
+            'body': None,
+            'status': None,
+        }
+        if not request.is_body_readable:
+            return record
+        content_length = request.content_length
+        if content_length is None or content_length > self.max_body_bytes:
+            # Reading it would hold all of it in memory, before the
+            # validation tween can stream it or reject it for its size
+            record['body_truncated'] = True
+        else:
+            record['body'] = _to_text(request.body)
+        return record
+
+    @staticmethod
+    def record_response(response):
+        """
+        :type response: :class:`pyramid.response.Response`
+        :rtype: dict
+        """
+        record = {
+            'status': response.status_code,
+            'response_headers': {'Content-Type': response.content_type},
+        }
+        if isinstance(response.app_iter, (list, tuple)):
+            record['response_body'] = _to_text(response.body)
+        else:
+            # Reading the body would consume the stream, and hold all of it
+            record['response_body'] = None
+            record['response_streamed'] = True
+        return record
+
+    def write(self, record):
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self._lock:
+            try:
+                if self._file is None:
+                    self._file = open_traffic_file(
+                        self.path.replace('{pid}', str(os.getpid())), 'a')
+                self._file.write(line)
+                self._file.flush()
+            except (IOError, OSError):
+                log.exception('Could not record traffic to %s', self.path)
+                self._close()
+
+    def close(self):
+        """Close the file, ending the gzip stream. A later record opens it
+        again.
+        """
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._file is not None:
+            traffic_file, self._file = self._file, None
+            try:
+                traffic_file.close()
+            except (IOError, OSError):
+                log.exception('Could not close %s', self.path)
+
+
+def build_traffic_recorder(settings):
+    """
+    :type settings: dict
+    :returns: the :class:`TrafficRecorder` configured by
+        `pyramid_swagger.record_traffic_path`, or None
+    """
+    path = settings.get('pyramid_swagger.record_traffic_path')
+    if not path:
+        return None
+    return TrafficRecorder(
+        path,
+        rate=float(settings.get(
+            'pyramid_swagger.record_traffic_rate', DEFAULT_RECORD_RATE)),
+        headers=aslist(settings.get(
+            'pyramid_swagger.record_traffic_headers',
+            DEFAULT_RECORDED_HEADERS,
+        )),
+        max_body_bytes=int(settings.get(
+            'pyramid_swagger.record_traffic_max_body_bytes',
+            DEFAULT_MAX_BODY_BYTES,
+        )),
+    )
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Reload the Swagger 2.0 spec when its files change, for development.
+"""
+from __future__ import absolute_import
+
+import logging
+import threading
+import time
+
+from pyramid.settings import asbool
+
+from pyramid_swagger.ingest import get_swagger_spec
+from pyramid_swagger.ingest import SpecFileLoader
+
+
+log = logging.getLogger(__name__)
+
+
+DEFAULT_RELOAD_INTERVAL = 1.0
+
+
+class SpecReloader(object):
+    """Rebuilds `pyramid_swagger.schema20` when one of the files it was read
+    from is modified.
+
+    bravado-core can only build a whole :class:`bravado_core.spec.Spec`, so
+    every change rebuilds it. Only the files which changed are parsed again
+    though: `file_loader` keeps the others in memory.
+
+    :param settings: the pyramid registry settings holding the spec
+    :type settings: dict
+    :type file_loader: :class:`pyramid_swagger.ingest.SpecFileLoader`
+    :param interval: minimum number of seconds between two checks of the
+        spec files
+    """
+
+    def __init__(self, settings, file_loader, interval=DEFAULT_RELOAD_INTERVAL):
+        self.settings = settings
+        self.file_loader = file_loader
+        self.interval = interval
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def check(self):
+        """Reload the spec if its files changed since the last check. This is
+        cheap to call on every request: files are checked at most once per
+        `interval`, and never by two threads at once.
+
+        :returns: whether the spec was reloaded
+        :rtype: bool
+        """
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        if not self._lock.acquire(False):
+            # Another request is already checking
+            return False
+        try:
+            self._next_check = now + self.interval
+            changed_files = self.file_loader.changed_files()
+            if not changed_files:
+                return False
+            return self.reload(changed_files)
+        finally:
+            self._lock.release()
+
+    def reload(self, changed_files=()):
+        """Rebuild the spec and swap it in. If the new spec can not be built
+        the error is logged and the current spec is kept.
+
+        :returns: whether the spec was replaced
+        :rtype: bool
+        """
+        log.info(
+            'Reloading the swagger spec, changed files: %s',
+            ', '.join(sorted(changed_files)),
+        )
+        try:
+            with self.file_loader.build():
+                spec = get_swagger_spec(
+                    self.settings, file_loader=self.file_loader)
+        except Exception:
+            log.exception(
+                'Could not reload the swagger spec, keeping the previous one')
+            return False
+
+        self.settings['pyramid_swagger.schema20'] = spec
+        # Computed from the previous spec by the dereferenced api doc view
+        self.settings.pop('pyramid_swagger.schema20_resolved', None)
+        request_cache = self.settings.get('pyramid_swagger.request_cache')
+        if request_cache is not None:
+            # Its keys hold the operations of the previous spec
+            request_cache.clear()
+        return True
+
+
+def build_spec_reloader(settings):
+    """
+    :type settings: dict
+    :rtype: :class:`SpecReloader` or None if `pyramid_swagger.reload_spec` is
+        disabled
+    """
+    if not asbool(settings.get('pyramid_swagger.reload_spec', False)):
+        return None
+
+    file_loader = SpecFileLoader(
+        cache_dir=settings.get('pyramid_swagger.yaml_cache_directory'),
+        memory_cache=True,
+    )
+    return SpecReloader(
+        settings,
+        file_loader,
+        interval=float(settings.get(
+            'pyramid_swagger.reload_spec_interval', DEFAULT_RELOAD_INTERVAL)),
+    )
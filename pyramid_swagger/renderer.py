@@ -4,18 +4,55 @@ This model contains the main factory of renderers to use while dealing with Swag
 """
 from __future__ import absolute_import
 
+import itertools
+import json
+import logging
 from functools import partial
 
+from bravado_core.content_type import APP_JSON
 from bravado_core.exception import MatchingResponseNotFound
 from bravado_core.exception import SwaggerMappingError
 from bravado_core.marshal import marshal_schema_object
-from bravado_core.response import get_response_spec
+from bravado_core.response import validate_response_headers
+from bravado_core.schema import get_type_from_schema
+from bravado_core.schema import is_list_like
+from bravado_core.validate import validate_object
+from jsonschema.exceptions import ValidationError
 from pyramid.renderers import JSON
 
+from pyramid_swagger.encoding import get_schema_encoder
+from pyramid_swagger.encoding import Unsupported
+from pyramid_swagger.exceptions import ResponseValidationError
+from pyramid_swagger.response_specs import get_response_spec
+from pyramid_swagger.tween import PyramidSwaggerResponse
+from pyramid_swagger.tween import validation_error
+
+
+log = logging.getLogger(__name__)
+
+
+DEFAULT_STREAM_CHUNK_ITEMS = 100
+
+STREAM_ABORT = 'abort'
+STREAM_LOG = 'log'
+
+
+def _is_json_dumps_renderer(renderer_factory):
+    return isinstance(renderer_factory, JSON) and \
+        renderer_factory.serializer is json.dumps and not renderer_factory.kw
+
 
 class PyramidSwaggerRendererFactory(object):
-    def __init__(self, renderer_factory=JSON()):
+    """
+    :param fused: marshal and JSON encode the response objects in a single
+        walk, see :mod:`pyramid_swagger.encoding`. Only applies when
+        `renderer_factory` is a :class:`pyramid.renderers.JSON` renderer
+        serializing with :func:`json.dumps` and its default arguments.
+    """
+
+    def __init__(self, renderer_factory=JSON(), fused=False):
         self.renderer_factory = renderer_factory
+        self.fused = fused and _is_json_dumps_renderer(renderer_factory)
 
     def _marshal_object(self, request, response_object):
         # operation attribute is injected by validator_tween in case the endpoint is served by Swagger 2.0 specs
@@ -40,8 +77,201 @@ class PyramidSwaggerRendererFactory(object):
             return response_object
 
     def _render(self, external_renderer, value, system):
+        if self.fused:
+            try:
+                return self._render_fused(external_renderer, value, system)
+            except Unsupported:
+                pass
         value = self._marshal_object(system['request'], value)
         return external_renderer(value, system)
 
+    def _render_fused(self, external_renderer, value, system):
+        """Render as `external_renderer` would render the marshaled `value`.
+
+        :raises: Unsupported when `value` must be marshaled and encoded in two
+            steps
+        """
+        request = system['request']
+        operation = getattr(request, 'operation', None)
+        if not operation:
+            return external_renderer(value, system)
+
+        try:
+            response_spec = get_response_spec(
+                status_code=request.response.status_code,
+                op=operation,
+            )
+            encoder = get_schema_encoder(
+                request.registry.settings['pyramid_swagger.schema20'],
+                response_spec['schema'],
+            )
+            # See pyramid.renderers.JSON
+            response = request.response
+            if response.content_type == response.default_content_type:
+                response.content_type = 'application/json'
+            return encoder(
+                value, self.renderer_factory._make_default(request))
+        except (MatchingResponseNotFound, SwaggerMappingError, KeyError):
+            # marshaling process failed
+            return external_renderer(value, system)
+
     def __call__(self, info):
         return partial(self._render, self.renderer_factory(info))
+
+
+class PyramidSwaggerStreamingRendererFactory(PyramidSwaggerRendererFactory):
+    """Renders the array responses of Swagger 2.0 endpoints producing
+    `application/json` through the `app_iter` of the response, `chunk_items`
+    items at a time, validating each item against the item schema as it is
+    rendered. Other responses are rendered as the `pyramid_swagger` renderer
+    does.
+
+    The validation tween does not validate the body of streamed responses:
+    their headers, their items and the `minItems` and `maxItems` of the array
+    are validated here.
+
+    :param on_invalid_item: 'abort' to raise
+        :class:`pyramid_swagger.exceptions.ResponseValidationError` on the
+        first invalid item: before the response is sent when the item is part
+        of the first chunk, else from the `app_iter`, which makes the server
+        close the connection without completing the body. 'log' to keep
+        streaming, and log the number of invalid items once the body is
+        complete.
+
+    The validation errors are raised while the view renders, or from the
+    `app_iter` once the validation tween returned: either way outside of
+    its `validation_context`, so custom validation contexts do not see them.
+    """
+
+    def __init__(self, renderer_factory=JSON(),
+                 chunk_items=DEFAULT_STREAM_CHUNK_ITEMS,
+                 on_invalid_item=STREAM_ABORT):
+        super(PyramidSwaggerStreamingRendererFactory, self).__init__(
+            renderer_factory)
+        if on_invalid_item not in (STREAM_ABORT, STREAM_LOG):
+            raise ValueError(
+                'on_invalid_item must be {0!r} or {1!r}, not {2!r}'.format(
+                    STREAM_ABORT, STREAM_LOG, on_invalid_item))
+        self.chunk_items = chunk_items
+        self.on_invalid_item = on_invalid_item
+
+    def _render(self, external_renderer, value, system):
+        request = system['request']
+        operation = getattr(request, 'operation', None)
+        if operation and is_list_like(value) and \
+                APP_JSON in operation.produces and \
+                _is_json_dumps_renderer(self.renderer_factory):
+            try:
+                response_spec = get_response_spec(
+                    status_code=request.response.status_code,
+                    op=operation,
+                )
+            except MatchingResponseNotFound:
+                response_spec = {}
+            swagger_spec = operation.swagger_spec
+            schema = swagger_spec.deref(response_spec.get('schema'))
+            if schema is not None and 'items' in schema and \
+                    get_type_from_schema(swagger_spec, schema) == 'array':
+                return self._render_stream(
+                    request, operation, response_spec, schema, value)
+        return super(PyramidSwaggerStreamingRendererFactory, self)._render(
+            external_renderer, value, system)
+
+    def _render_stream(self, request, op, response_spec, schema, items):
+        # See pyramid.renderers.JSON
+        response = request.response
+        if response.content_type == response.default_content_type:
+            response.content_type = 'application/json'
+
+        # Set by the validation tween, which leaves streamed bodies alone
+        validate = request.environ.get('pyramid_swagger.validate_response') \
+            and op.swagger_spec.config['validate_responses']
+        if validate:
+            _validate_headers(op, response_spec, response)
+        request.environ['pyramid_swagger.streamed_response'] = True
+
+        chunks = self._iter_chunks(request, op, schema, items, validate)
+        # Errors of the first chunk are raised before the response is sent
+        first_chunk = next(chunks)
+        return itertools.chain([first_chunk], chunks)
+
+    def _iter_chunks(self, request, op, schema, items, validate):
+        """
+        :returns: iterator of the chunks of the JSON array of the marshaled
+            `items`, as :func:`json.dumps` would encode it
+        """
+        swagger_spec = op.swagger_spec
+        item_schema = swagger_spec.deref(schema['items'])
+        default = self.renderer_factory._make_default(request)
+        max_items = schema.get('maxItems')
+        validation_errors = 0
+        count = 0
+        separator = '['
+        encoded_items = []
+
+        for item in items:
+            count += 1
+            try:
+                item = marshal_schema_object(swagger_spec, item_schema, item)
+                if validate:
+                    validate_object(swagger_spec, item_schema, item)
+                    if max_items is not None and count > max_items:
+                        raise ValidationError(
+                            'Response array has more than {0} items'.format(
+                                max_items))
+            except (ValidationError, SwaggerMappingError) as exc:
+                if not validate:
+                    # As the `pyramid_swagger` renderer, render the value
+                    # which could not be marshaled
+                    pass
+                elif self.on_invalid_item == STREAM_ABORT:
+                    raise ResponseValidationError(str(exc), child=exc)
+                else:
+                    validation_errors += 1
+            encoded_items.append(json.dumps(item, default=default))
+            if len(encoded_items) == self.chunk_items:
+                yield (separator + ', '.join(encoded_items)).encode('utf-8')
+                separator = ', '
+                encoded_items = []
+
+        if validate and count < schema.get('minItems', 0):
+            exc = ValidationError(
+                'Response array has less than {0} items'.format(
+                    schema['minItems']))
+            if self.on_invalid_item == STREAM_ABORT:
+                raise ResponseValidationError(str(exc), child=exc)
+            validation_errors += 1
+
+        if validation_errors:
+            log.warning(
+                '%d validation errors in the streamed response of %s',
+                validation_errors, op.operation_id,
+            )
+
+        if encoded_items:
+            yield (separator + ', '.join(encoded_items) + ']').encode('utf-8')
+        elif separator == '[':
+            yield b'[]'
+        else:
+            yield b']'
+
+
+@validation_error(ResponseValidationError)
+def _validate_headers(op, response_spec, response):
+    validate_response_headers(
+        op, response_spec, PyramidSwaggerResponse(response))
+
+
+def build_streaming_renderer_factory(settings):
+    """
+    :type settings: dict
+    :returns: the :class:`PyramidSwaggerStreamingRendererFactory` configured
+        by `pyramid_swagger.stream_chunk_items` and
+        `pyramid_swagger.stream_on_invalid_item`
+    """
+    return PyramidSwaggerStreamingRendererFactory(
+        chunk_items=int(settings.get(
+            'pyramid_swagger.stream_chunk_items', DEFAULT_STREAM_CHUNK_ITEMS)),
+        on_invalid_item=settings.get(
+            'pyramid_swagger.stream_on_invalid_item', STREAM_ABORT),
+    )
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+Replay traffic recorded by :mod:`pyramid_swagger.recorder` through the
+validation tween, to benchmark pyramid_swagger on a real workload.
+
+The tween runs in front of a stub handler returning the recorded responses,
+so only the time spent by pyramid_swagger is measured. Running the same
+recording against two pyramid_swagger versions compares them.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from collections import defaultdict
+
+from pyramid.config import Configurator
+from pyramid.response import Response
+from six import iteritems
+
+from pyramid_swagger.bulk import build_request
+from pyramid_swagger.recorder import read_traffic
+from pyramid_swagger.tween import validation_tween_factory
+
+
+PERCENTILES = (50, 90, 99)
+
+# Settings which would make the replay record or reload the spec
+_REPLAY_DISABLED_SETTINGS = (
+    'pyramid_swagger.record_traffic_path',
+    'pyramid_swagger.reload_spec',
+)
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile.
+
+    :param sorted_values: non empty sorted list
+    """
+    rank = int(round(percent / 100 * (len(sorted_values) - 1)))
+    return sorted_values[rank]
+
+
+def get_operation_key(record):
+    return record.get('operation') or '{0} {1}'.format(
+        record['method'], record.get('route'))
+
+
+def stub_handler(request):
+    """Returns the recorded response of the replayed request."""
+    record = request.environ['pyramid_swagger.replay_record']
+    response = Response(status=record.get('status') or 200)
+    content_type = (record.get('response_headers') or {}).get('Content-Type')
+    if content_type:
+        response.content_type = content_type
+    if record.get('response_body'):
+        response.body = record['response_body'].encode('utf-8', 'surrogateescape')
+    if record.get('response_streamed'):
+        # The body was not recorded, and was validated as it was streamed
+        request.environ['pyramid_swagger.streamed_response'] = True
+    return response
+
+
+def build_replay_tween(settings, routes):
+    """Build the validation tween of an application with `settings` and a
+    route for each of the `routes` patterns, in front of :func:`stub_handler`.
+
+    :type settings: dict
+    :returns: (tween, registry)
+    """
+    settings = dict(
+        (key, value) for key, value in iteritems(settings)
+        if key not in _REPLAY_DISABLED_SETTINGS
+    )
+    config = Configurator(settings=settings)
+    for route in routes:
+        config.add_route(route, route)
+    config.include('pyramid_swagger')
+    config.commit()
+    return validation_tween_factory(stub_handler, config.registry), config.registry
+
+
+class ReplayReport(object):
+    """Latencies, errors and allocations of the replayed requests, per
+    operation.
+    """
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.allocations = defaultdict(list)
+
+    @property
+    def requests(self):
+        return sum(len(latencies) for latencies in self.latencies.values())
+
+    @property
+    def seconds(self):
+        return sum(sum(latencies) for latencies in self.latencies.values())
+
+    def summary(self):
+        """
+        :returns: JSON serializable summary of the replay
+        :rtype: dict
+        """
+        operations = {}
+        # Operations are only in the allocations when no request was timed
+        for key in set(self.latencies) | set(self.allocations):
+            latencies = sorted(self.latencies.get(key, []))
+            operation = {
+                'requests': len(latencies),
+                'errors': self.errors[key],
+            }
+            if latencies:
+                for percent in PERCENTILES:
+                    operation['p{0}_ms'.format(percent)] = \
+                        percentile(latencies, percent) * 1000
+            if self.allocations.get(key):
+                operation['mean_peak_allocated_bytes'] = \
+                    sum(self.allocations[key]) // len(self.allocations[key])
+            operations[key] = operation
+        seconds = self.seconds
+        return {
+            'requests': self.requests,
+            'seconds': seconds,
+            'requests_per_second': self.requests / seconds if seconds else None,
+            'operations': operations,
+        }
+
+    def format(self):
+        """
+        :returns: one line per operation, the slowest first
+        :rtype: str
+        """
+        summary = self.summary()
+        columns = [('requests', 'requests'), ('errors', 'errors')] + [
+            ('p{0}_ms'.format(percent), 'p{0} ms'.format(percent))
+            for percent in PERCENTILES
+        ] + [('mean_peak_allocated_bytes', 'peak bytes')]
+        lines = [
+            ' '.join('{0:>12}'.format(label) for _, label in columns)
+            + '  operation'
+        ]
+        for key, operation in sorted(
+            iteritems(summary['operations']),
+            key=lambda item: -item[1].get('p{0}_ms'.format(PERCENTILES[-1]), 0),
+        ):
+            lines.append(' '.join(
+                '{0:>12.3f}'.format(operation[column])
+                if isinstance(operation.get(column), float)
+                else '{0:>12}'.format(operation.get(column, '-'))
+                for column, _ in columns
+            ) + '  ' + key)
+        lines.append('{0} requests in {1:.3f}s: {2:.1f} requests/s'.format(
+            summary['requests'], summary['seconds'],
+            summary['requests_per_second'] or 0))
+        return '\n'.join(lines)
+
+
+def _replay_record(tween, registry, record):
+    """
+    :returns: (seconds, whether the tween raised)
+    """
+    request = build_request(record)
+    request.registry = registry
+    request.environ['pyramid_swagger.replay_record'] = record
+    start = time.perf_counter()
+    try:
+        tween(request)
+    except Exception:
+        return time.perf_counter() - start, True
+    return time.perf_counter() - start, False
+
+
+def replay(settings, records, iterations=1, warm_up=True,
+           measure_allocations=False, routes=None):
+    """Replay traffic records through the validation tween of an application
+    configured with `settings`.
+
+    :param records: traffic records, see :mod:`pyramid_swagger.recorder`.
+        The records whose request body was not recorded are skipped.
+    :param iterations: number of times each record is replayed
+    :param warm_up: replay every record once, untimed, first
+    :param measure_allocations: replay every record once more, with
+        :mod:`tracemalloc`, to measure the memory it allocates at peak. This
+        pass is not timed.
+    :param routes: route patterns of the application, defaults to the routes
+        of the records in the order they were first recorded
+    :rtype: :class:`ReplayReport`
+    """
+    records = [record for record in records if not record.get('body_truncated')]
+    if routes is None:
+        routes = []
+        for record in records:
+            route = record.get('route')
+            if route and route not in routes:
+                routes.append(route)
+    tween, registry = build_replay_tween(settings, routes)
+
+    if warm_up:
+        for record in records:
+            _replay_record(tween, registry, record)
+
+    report = ReplayReport()
+    for _ in range(iterations):
+        for record in records:
+            key = get_operation_key(record)
+            seconds, raised = _replay_record(tween, registry, record)
+            report.latencies[key].append(seconds)
+            if raised:
+                report.errors[key] += 1
+
+    if measure_allocations:
+        for record in records:
+            # Starting tracemalloc again forgets the previous traces and peak
+            tracemalloc.start()
+            try:
+                _replay_record(tween, registry, record)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            report.allocations[get_operation_key(record)].append(peak)
+
+    return report
+
+
+def main(argv=None):
+    """Entry point of the `pyramid-swagger-replay` console script."""
+    parser = argparse.ArgumentParser(
+        description='Replay traffic recorded with '
+                    'pyramid_swagger.record_traffic_path through the '
+                    'validation tween and report its performance.',
+    )
+    parser.add_argument(
+        'config_uri',
+        help='PasteDeploy config file holding the pyramid_swagger settings, '
+             'eg. production.ini#main',
+    )
+    parser.add_argument('traffic', help='File of recorded traffic')
+    parser.add_argument(
+        '-n', '--iterations', type=int, default=1,
+        help='Number of times each record is replayed',
+    )
+    parser.add_argument(
+        '--allocations', action='store_true',
+        help='Also measure the memory allocated by each request',
+    )
+    parser.add_argument(
+        '--json', action='store_true',
+        help='Write the report as JSON, eg. to compare versions',
+    )
+    args = parser.parse_args(argv)
+
+    from pyramid.paster import get_appsettings
+    settings = dict(get_appsettings(args.config_uri))
+    report = replay(
+        settings,
+        read_traffic(args.traffic),
+        iterations=args.iterations,
+        measure_allocations=args.allocations,
+    )
+    if args.json:
+        print(json.dumps(report.summary(), indent=2, sort_keys=True))
+    else:
+        print(report.format())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Resolve the response specification of a Swagger 2.0 operation for a status
+code once, instead of on every response.
+
+Both the `pyramid_swagger` renderer and the validation tween look up the
+response specification of each response. The resolved specifications are
+kept in a table per operation, status codes without a specification
+included, and operations of a reloaded spec get tables of their own.
+"""
+from __future__ import absolute_import
+
+import weakref
+
+from bravado_core.exception import MatchingResponseNotFound
+
+
+# Status codes without a response specification
+_NOT_FOUND = object()
+
+# :class:`bravado_core.operation.Operation` -> status code -> response spec
+_response_specs = weakref.WeakKeyDictionary()
+
+
+def _resolve_response_spec(status_code, op):
+    # See bravado_core.response.get_response_spec
+    deref = op.swagger_spec.deref
+    op_spec = deref(op.op_spec)
+    response_specs = deref(op_spec.get('responses'))
+    default_response_spec = deref(response_specs.get('default', None))
+    response_spec = deref(
+        response_specs.get(str(status_code), default_response_spec))
+    return _NOT_FOUND if response_spec is None else response_spec
+
+
+def get_response_spec(status_code, op):
+    """Same as :func:`bravado_core.response.get_response_spec`, resolving the
+    response specification of each status code of `op` only once.
+
+    :type status_code: int
+    :type op: :class:`bravado_core.operation.Operation`
+    :rtype: dict
+    :raises: MatchingResponseNotFound when the status_code could not be mapped
+        to a response specification.
+    """
+    table = _response_specs.get(op)
+    if table is None:
+        table = _response_specs.setdefault(op, {})
+    response_spec = table.get(status_code)
+    if response_spec is None:
+        response_spec = table[status_code] = _resolve_response_spec(
+            status_code, op)
+    if response_spec is _NOT_FOUND:
+        raise MatchingResponseNotFound(
+            "Response specification matching http status_code {0} not found "
+            "for operation {1}. Either add a response specification for the "
+            "status_code or use a `default` response.".format(status_code, op),
+        )
+    return response_spec
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Validate a sample of the items of large Swagger 2.0 array responses.
+
+The response body is validated as a whole, except for the items of its
+arrays: only the first items and a random subset of the others are validated
+against the item schema. Arrays are the body itself when it is an array, or
+the array properties of an object body.
+"""
+from __future__ import absolute_import
+
+import logging
+import random
+
+from bravado_core.content_type import APP_JSON
+from six import iteritems
+
+from pyramid_swagger.budget import validate_object
+from pyramid_swagger.budget import validate_response_body
+from pyramid_swagger.budget import validate_schema_object
+from pyramid_swagger.streaming import split_array_items
+
+
+log = logging.getLogger(__name__)
+
+
+DEFAULT_SAMPLE_SIZE = 100
+
+SAMPLE_SIZE_EXTENSION = 'x-validation-sample-size'
+
+
+def sample_items(items, sample_size, rng=random):
+    """
+    :param items: list
+    :param sample_size: number of leading items, and of random other items,
+        to sample
+    :returns: (sampled items, number of skipped items)
+    """
+    if len(items) <= 2 * sample_size:
+        return items, 0
+    others = sorted(rng.sample(range(sample_size, len(items)), sample_size))
+    return (
+        items[:sample_size] + [items[index] for index in others],
+        len(items) - 2 * sample_size,
+    )
+
+
+def get_sample_size(swagger_spec, response_spec, default=None):
+    """
+    :param default: sample size used when the response schema has no
+        `x-validation-sample-size`, or None to validate every item
+    :returns: the sample size for `response_spec`, or None
+    """
+    schema = swagger_spec.deref(response_spec.get('schema'))
+    if isinstance(schema, dict) and SAMPLE_SIZE_EXTENSION in schema:
+        return int(schema[SAMPLE_SIZE_EXTENSION])
+    return default
+
+
+def validate_response_body_sampled(op, response_spec, response, sample_size):
+    """Same as :func:`bravado_core.response.validate_response_body`, except
+    that only a sample of the array items of JSON bodies is validated.
+
+    :type op: :class:`bravado_core.operation.Operation`
+    :type response_spec: dict
+    :type response: :class:`bravado_core.response.OutgoingResponse`
+    :returns: the number of items which were not validated
+    :raises: SwaggerMappingError, ValidationError
+    """
+    swagger_spec = op.swagger_spec
+    schema = swagger_spec.deref(response_spec.get('schema'))
+    split_schemas = None
+    if schema is not None and response.content_type == APP_JSON and \
+            APP_JSON in op.produces:
+        split_schemas = split_array_items(swagger_spec, schema)
+    if split_schemas is None:
+        validate_response_body(op, response_spec, response)
+        return 0
+
+    container_schema, item_schemas = split_schemas
+    value = response.json()
+    validate_schema_object(swagger_spec, container_schema, value)
+
+    skipped = 0
+    for name, item_schema in iteritems(item_schemas):
+        if name is None:
+            items = value
+        else:
+            items = value.get(name) if isinstance(value, dict) else None
+        if not isinstance(items, list):
+            continue
+        sampled_items, skipped_items = sample_items(items, sample_size)
+        skipped += skipped_items
+        for item in sampled_items:
+            validate_object(swagger_spec, item_schema, item)
+
+    if skipped:
+        log.debug(
+            'Skipped the validation of %d response items of %s',
+            skipped, op.operation_id,
+        )
+    return skipped
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+Per-operation Swagger 2.0 validation statistics, served as JSON and in the
+Prometheus text format.
+
+Every thread counts into its own :class:`OperationStats`, so recording does
+not take any lock. The counts of all the threads are only merged when the
+statistics are read.
+"""
+from __future__ import absolute_import
+from __future__ import division
+
+import bisect
+import threading
+import time
+
+import simplejson
+from pyramid.httpexceptions import HTTPError
+from pyramid.response import Response
+from pyramid.settings import asbool
+from six import iteritems
+
+from pyramid_swagger.model import PyramidEndpoint
+
+
+# Upper bounds, in seconds, of the latency histogram buckets. The last bucket
+# has no upper bound.
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5,
+    1.0, 2.5,
+)
+
+PERCENTILES = (50, 90, 99)
+
+COUNTERS = (
+    'requests',
+    'request_failures',
+    'request_bytes',
+    'responses',
+    'response_failures',
+    'response_bytes',
+)
+
+HISTOGRAMS = ('request_seconds', 'response_seconds')
+
+HISTOGRAM_SUMS = tuple(histogram + '_sum' for histogram in HISTOGRAMS)
+
+# Relative to `pyramid_swagger.base_path_api_docs`, like the api docs
+STATS_PATH = '/_stats'
+
+STATS_ROUTE_NAME = 'pyramid_swagger.stats'
+
+
+class OperationStats(object):
+    """Counters and latency histograms of one operation, in one thread or
+    merged across threads.
+    """
+
+    __slots__ = COUNTERS + HISTOGRAMS + HISTOGRAM_SUMS
+
+    def __init__(self):
+        for counter in COUNTERS:
+            setattr(self, counter, 0)
+        for histogram in HISTOGRAMS:
+            setattr(self, histogram, [0] * (len(LATENCY_BUCKETS) + 1))
+        for histogram_sum in HISTOGRAM_SUMS:
+            setattr(self, histogram_sum, 0.0)
+
+    def observe(self, histogram, seconds):
+        getattr(self, histogram)[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        histogram_sum = histogram + '_sum'
+        setattr(self, histogram_sum, getattr(self, histogram_sum) + seconds)
+
+    def merge(self, other):
+        for counter in COUNTERS + HISTOGRAM_SUMS:
+            setattr(self, counter, getattr(self, counter) + getattr(other, counter))
+        for histogram in HISTOGRAMS:
+            setattr(self, histogram, [
+                mine + theirs for mine, theirs
+                in zip(getattr(self, histogram), getattr(other, histogram))
+            ])
+
+
+def histogram_percentile(histogram, percent):
+    """Estimate a percentile from a latency histogram, interpolating within
+    the bucket holding it.
+
+    :returns: seconds, or None for an empty histogram
+    """
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = percent / 100 * total
+    seen = 0
+    for index, count in enumerate(histogram):
+        if count and seen + count >= rank:
+            lower = LATENCY_BUCKETS[index - 1] if index else 0.0
+            if index == len(LATENCY_BUCKETS):
+                # Unbounded bucket
+                return lower
+            upper = LATENCY_BUCKETS[index]
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+    return LATENCY_BUCKETS[-1]
+
+
+class ValidationStats(object):
+    """Collects the :class:`OperationStats` of every operation, per thread."""
+
+    def __init__(self):
+        self._local = threading.local()
+        # Per-thread dicts of operation id -> OperationStats. The lock is
+        # only taken when a thread records for the first time, and on read.
+        self._thread_stats = []
+        self._lock = threading.Lock()
+
+    def get(self, operation_id):
+        """
+        :returns: the :class:`OperationStats` of the current thread for
+            `operation_id`
+        """
+        operations = getattr(self._local, 'operations', None)
+        if operations is None:
+            operations = self._local.operations = {}
+            with self._lock:
+                self._thread_stats.append(operations)
+        stats = operations.get(operation_id)
+        if stats is None:
+            stats = operations[operation_id] = OperationStats()
+        return stats
+
+    def merged(self):
+        """
+        :returns: dict of operation id -> :class:`OperationStats` merged
+            across threads
+        """
+        with self._lock:
+            thread_stats = list(self._thread_stats)
+        merged = {}
+        for operations in thread_stats:
+            # Copied first: the owning thread may add operations meanwhile
+            for operation_id, stats in list(operations.items()):
+                merged.setdefault(operation_id, OperationStats()).merge(stats)
+        return merged
+
+    def wrap_handler(self, swagger_handler):
+        """
+        :type swagger_handler: :class:`pyramid_swagger.tween.SwaggerHandler`
+        :returns: a :class:`pyramid_swagger.tween.SwaggerHandler` recording
+            the statistics of the requests and responses it handles
+        """
+        handle_request = swagger_handler.handle_request
+        handle_response = swagger_handler.handle_response
+
+        def handle_request_with_stats(request, op, **kwargs):
+            stats = self.get(op.operation_id)
+            stats.requests += 1
+            stats.request_bytes += request.request.content_length or 0
+            start = time.perf_counter()
+            try:
+                return handle_request(request, op, **kwargs)
+            except HTTPError:
+                stats.request_failures += 1
+                raise
+            finally:
+                stats.observe('request_seconds', time.perf_counter() - start)
+
+        def handle_response_with_stats(response, op, **kwargs):
+            stats = self.get(op.operation_id)
+            stats.responses += 1
+            stats.response_bytes += response.content_length or 0
+            start = time.perf_counter()
+            try:
+                return handle_response(response, op, **kwargs)
+            except HTTPError:
+                stats.response_failures += 1
+                raise
+            finally:
+                stats.observe('response_seconds', time.perf_counter() - start)
+
+        return swagger_handler._replace(
+            handle_request=handle_request_with_stats,
+            handle_response=handle_response_with_stats,
+        )
+
+    def to_dict(self):
+        """
+        :returns: JSON serializable statistics of every operation
+        :rtype: dict
+        """
+        operations = {}
+        for operation_id, stats in iteritems(self.merged()):
+            operation = dict(
+                (counter, getattr(stats, counter)) for counter in COUNTERS)
+            for histogram in HISTOGRAMS:
+                for percent in PERCENTILES:
+                    seconds = histogram_percentile(
+                        getattr(stats, histogram), percent)
+                    operation['{0}_p{1}_ms'.format(
+                        histogram.replace('_seconds', ''), percent,
+                    )] = None if seconds is None else seconds * 1000
+            operations[operation_id] = operation
+        return {'operations': operations}
+
+    def to_prometheus(self):
+        """
+        :returns: the statistics in the Prometheus text exposition format
+        :rtype: str
+        """
+        merged = sorted(iteritems(self.merged()))
+        lines = []
+        for counter in COUNTERS:
+            name = 'pyramid_swagger_{0}_total'.format(counter)
+            lines.append('# TYPE {0} counter'.format(name))
+            for operation_id, stats in merged:
+                lines.append('{0}{{operation="{1}"}} {2}'.format(
+                    name, _escape_label(operation_id), getattr(stats, counter)))
+        for histogram in HISTOGRAMS:
+            name = 'pyramid_swagger_{0}'.format(histogram)
+            lines.append('# TYPE {0} histogram'.format(name))
+            for operation_id, stats in merged:
+                label = _escape_label(operation_id)
+                cumulative = 0
+                buckets = getattr(stats, histogram)
+                for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), buckets):
+                    cumulative += count
+                    lines.append('{0}_bucket{{operation="{1}",le="{2}"}} {3}'.format(
+                        name, label, bound, cumulative))
+                lines.append('{0}_sum{{operation="{1}"}} {2!r}'.format(
+                    name, label, getattr(stats, histogram + '_sum')))
+                lines.append('{0}_count{{operation="{1}"}} {2}'.format(
+                    name, label, cumulative))
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def build_validation_stats(settings):
+    """
+    :type settings: dict
+    :returns: a :class:`ValidationStats` when `pyramid_swagger.enable_stats`
+        is set, or None
+    """
+    if asbool(settings.get('pyramid_swagger.enable_stats', False)):
+        return ValidationStats()
+    return None
+
+
+def build_stats_endpoint(stats):
+    """
+    :type stats: :class:`ValidationStats`
+    :rtype: :class:`pyramid_swagger.model.PyramidEndpoint`
+    """
+    def view_for_stats(request):
+        if request.params.get('format') == 'prometheus':
+            return Response(
+                stats.to_prometheus(),
+                content_type='text/plain',
+                charset='utf-8',
+            )
+        return Response(
+            simplejson.dumps(stats.to_dict(), sort_keys=True),
+            content_type='application/json',
+            charset='utf-8',
+        )
+
+    return PyramidEndpoint(
+        path=STATS_PATH,
+        route_name=STATS_ROUTE_NAME,
+        view=view_for_stats,
+        renderer=None,
+    )
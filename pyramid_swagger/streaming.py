@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+"""
+Parse and validate large Swagger 2.0 JSON request bodies incrementally.
+
+Body parameters whose schema is an array, or an object with array
+properties, are read from the request body file chunk by chunk. Every item of
+these arrays is validated as soon as it is parsed, so that an invalid item
+rejects the request without parsing the rest of the body, and the raw body is
+never held in memory as a whole.
+
+The request data is the same as the one unmarshalled by bravado-core.
+"""
+from __future__ import absolute_import
+
+import codecs
+import json
+
+from bravado_core.exception import SwaggerMappingError
+from bravado_core.param import get_param_type_spec
+from bravado_core.param import unmarshal_param
+from bravado_core.request import unmarshal_request
+from bravado_core.schema import get_default
+from bravado_core.unmarshal import unmarshal_schema_object
+from bravado_core.validate import validate_object
+from bravado_core.validate import validate_schema_object
+from bravado_core.validate import validate_security_object
+from six import iteritems
+from six import itervalues
+
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+JSON_WHITESPACE = ' \t\n\r'
+
+JSON_NUMBER_CHARS = '0123456789.eE+-'
+
+JSON_LITERALS = ('true', 'false', 'null', 'NaN', 'Infinity', '-Infinity')
+
+# Characters after the backslash of a \uXXXX escape, and of the \uXXXX escape
+# of a low surrogate which may follow it
+UNICODE_ESCAPE_LENGTH = 11
+
+
+class JSONStreamParser(object):
+    """Parse a JSON document read from a file-like object, one value at a
+    time. Only the unparsed part of the current chunk, and the value being
+    parsed, are held in memory.
+
+    Values are decoded by :class:`json.JSONDecoder`, like
+    :attr:`webob.request.BaseRequest.json_body`.
+
+    :param stream: file-like object returning bytes
+    :param encoding: encoding of the document
+    :param chunk_size: number of bytes read at once
+    """
+
+    def __init__(self, stream, encoding='utf-8', chunk_size=DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self._stream = stream
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _read(self, size):
+        """Append `size` more bytes of the document to the buffer, and drop
+        the part which was parsed already.
+
+        :returns: False if the whole document was read already
+        """
+        if self._eof:
+            return False
+        data = self._stream.read(size)
+        self._eof = not data
+        self._buffer = self._buffer[self._pos:] + self._decoder.decode(
+            data, final=self._eof)
+        self._pos = 0
+        return True
+
+    def peek(self):
+        """
+        :returns: the next character which is not whitespace, or '' at the
+            end of the document
+        """
+        while True:
+            while (
+                self._pos < len(self._buffer)
+                and self._buffer[self._pos] in JSON_WHITESPACE
+            ):
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read(self.chunk_size):
+                return ''
+
+    def expect(self, chars):
+        """Consume the next character, which must be one of `chars`.
+
+        :returns: the character
+        :raises: ValueError
+        """
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError('Expecting one of {0!r}, got {1!r}'.format(
+                chars, char or 'end of document'))
+        self._pos += 1
+        return char
+
+    def decode_value(self):
+        """Consume and decode the next JSON value.
+
+        :raises: ValueError
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(
+                    self._buffer, self._pos)
+            except ValueError as error:
+                # The value may be truncated, read more. Big values are read
+                # with growing chunks to not decode them too many times.
+                if not self._may_be_truncated(error) or \
+                        not self._read(max(self.chunk_size, len(self._buffer))):
+                    raise
+                continue
+            if (
+                end == len(self._buffer)
+                or self._buffer[end] in JSON_NUMBER_CHARS
+            ) and self._read(self.chunk_size):
+                # A number may continue in the next chunk
+                continue
+            self._pos = end
+            return value
+
+    def _may_be_truncated(self, error):
+        """Whether decoding may have failed only because the buffer ends
+        before the value does. Other errors are raised without reading the
+        rest of the document.
+
+        :type error: :class:`json.JSONDecodeError`
+        """
+        rest = self._buffer[error.pos:]
+        if error.msg.startswith('Unterminated string'):
+            # No closing quote in the rest of the buffer
+            return True
+        if error.msg.startswith('Invalid \\uXXXX escape'):
+            return len(rest) < UNICODE_ESCAPE_LENGTH
+        return (
+            all(char in JSON_NUMBER_CHARS for char in rest)
+            or any(literal.startswith(rest) for literal in JSON_LITERALS)
+        )
+
+    def parse_array(self, validate_item):
+        """Consume an array, calling `validate_item` on each item as soon as
+        it is decoded.
+
+        :rtype: list
+        """
+        value = []
+        self.expect('[')
+        if self.peek() == ']':
+            self._pos += 1
+            return value
+        while True:
+            item = self.decode_value()
+            validate_item(item)
+            value.append(item)
+            if self.expect(',]') == ']':
+                return value
+
+    def parse_object(self, item_validators):
+        """Consume an object. Its properties named in `item_validators` are
+        consumed with :meth:`parse_array` when they are arrays.
+
+        :param item_validators: dict of property name -> item validator
+        :rtype: dict
+        """
+        value = {}
+        self.expect('{')
+        if self.peek() == '}':
+            self._pos += 1
+            return value
+        while True:
+            if self.peek() != '"':
+                raise ValueError('Expecting a property name')
+            key = self.decode_value()
+            self.expect(':')
+            if key in item_validators and self.peek() == '[':
+                value[key] = self.parse_array(item_validators[key])
+            else:
+                value[key] = self.decode_value()
+            if self.expect(',}') == '}':
+                return value
+
+    def end(self):
+        """
+        :raises: ValueError if the document has more data
+        """
+        if self.peek():
+            raise ValueError('Extra data after the JSON document')
+
+
+def _without_items(swagger_spec, schema):
+    return dict(
+        (key, value)
+        for key, value in iteritems(swagger_spec.deref(schema))
+        if key != 'items'
+    )
+
+
+def split_array_items(swagger_spec, schema):
+    """Split a schema which is an array, or an object with array properties,
+    to validate the items of these arrays separately.
+
+    :type swagger_spec: :class:`bravado_core.spec.Spec`
+    :returns: (container schema, item schemas) or None when `schema` has no
+        array to split. The container schema validates the whole value but
+        not the items of the split arrays. Item schemas are a dict of property
+        name -> schema of the array items, with a None property name for a
+        schema which is an array.
+    """
+    deref = swagger_spec.deref
+    schema = deref(schema)
+    schema_type = deref(schema.get('type'))
+
+    if schema_type == 'array' and 'items' in schema:
+        return _without_items(swagger_spec, schema), {None: schema['items']}
+
+    if schema_type == 'object':
+        properties = deref(schema.get('properties', {}))
+        item_schemas = {}
+        for name, property_schema in iteritems(properties):
+            property_schema = deref(property_schema)
+            if deref(property_schema.get('type')) == 'array' and \
+                    'items' in property_schema:
+                item_schemas[name] = property_schema['items']
+        if item_schemas:
+            container_properties = dict(properties)
+            for name in item_schemas:
+                container_properties[name] = _without_items(
+                    swagger_spec, properties[name])
+            return dict(schema, properties=container_properties), item_schemas
+
+    return None
+
+
+def get_streamed_schemas(param):
+    """Split the schema of a body parameter for streaming.
+
+    :type param: :class:`bravado_core.param.Param`
+    :returns: see :func:`split_array_items`, None when the body can not be
+        streamed
+    """
+    return split_array_items(
+        param.swagger_spec, param.param_spec.get('schema', {}))
+
+
+def should_stream_body(request, param, min_size):
+    """
+    :type request: :class:`pyramid_swagger.tween.PyramidSwaggerRequest`
+    :type param: :class:`bravado_core.param.Param`
+    :param min_size: minimum body size in bytes
+    :rtype: bool
+    """
+    if param.location != 'body':
+        return False
+    pyramid_request = request.request
+    if not pyramid_request.is_body_readable or \
+            pyramid_request.content_type not in ('', 'application/json'):
+        return False
+    content_length = pyramid_request.content_length
+    return content_length is None or content_length >= min_size
+
+
+def unmarshal_streamed_body(
+    request, param, streamed_schemas, chunk_size=DEFAULT_CHUNK_SIZE,
+):
+    """Same as :func:`bravado_core.param.unmarshal_param` for a body
+    parameter, except that the body is parsed and validated incrementally.
+
+    :type request: :class:`pyramid_swagger.tween.PyramidSwaggerRequest`
+    :type param: :class:`bravado_core.param.Param`
+    :param streamed_schemas: the schemas returned by
+        :func:`get_streamed_schemas` for `param`
+    """
+    swagger_spec = param.swagger_spec
+    param_spec = swagger_spec.deref(get_param_type_spec(param))
+    validate = swagger_spec.config['validate_requests']
+
+    def item_validator(item_schema):
+        def validate_item(item):
+            if validate:
+                validate_object(swagger_spec, item_schema, item)
+        return validate_item
+
+    item_validators = dict(
+        (name, item_validator(item_schema))
+        for name, item_schema in iteritems(streamed_schemas[1])
+    )
+
+    pyramid_request = request.request
+    body_file = pyramid_request.body_file_seekable
+    parser = JSONStreamParser(
+        body_file, pyramid_request.charset or 'utf-8', chunk_size)
+    try:
+        if None in item_validators and parser.peek() == '[':
+            raw_value = parser.parse_array(item_validators[None])
+            container_schema = streamed_schemas[0]
+        elif None not in item_validators and parser.peek() == '{':
+            raw_value = parser.parse_object(item_validators)
+            container_schema = streamed_schemas[0]
+        else:
+            raw_value = parser.decode_value()
+            container_schema = param_spec
+        parser.end()
+    except ValueError as json_error:
+        if param.required:
+            raise SwaggerMappingError(
+                "Error reading request body JSON: {0}".format(str(json_error)),
+            )
+        raw_value = get_default(swagger_spec, param_spec)
+        container_schema = param_spec
+    finally:
+        # Let the view read the body again
+        body_file.seek(0)
+
+    if raw_value is None and not param.required:
+        return None
+
+    if validate:
+        validate_schema_object(swagger_spec, container_schema, raw_value)
+
+    return unmarshal_schema_object(swagger_spec, param_spec, raw_value)
+
+
+def unmarshal_request_streaming(request, op, min_size=0):
+    """Same as :func:`bravado_core.request.unmarshal_request`, except that
+    JSON bodies of at least `min_size` bytes whose schema is an array or an
+    object with array properties are parsed and validated incrementally.
+
+    :type request: :class:`pyramid_swagger.tween.PyramidSwaggerRequest`
+    :type op: :class:`bravado_core.operation.Operation`
+    :returns: dict where (key, value) = (param_name, param_value)
+    """
+    streamed_params = {}
+    for param in itervalues(op.params):
+        if should_stream_body(request, param, min_size):
+            streamed_schemas = get_streamed_schemas(param)
+            if streamed_schemas:
+                streamed_params[param.name] = streamed_schemas
+    if not streamed_params:
+        return unmarshal_request(request, op)
+
+    request_data = {}
+    for param in itervalues(op.params):
+        if param.name in streamed_params:
+            request_data[param.name] = unmarshal_streamed_body(
+                request, param, streamed_params[param.name])
+        else:
+            request_data[param.name] = unmarshal_param(param, request)
+
+    if op.swagger_spec.config['validate_requests']:
+        validate_security_object(op, request_data)
+
+    return request_data
+
+
+def get_stream_body_min_size(settings):
+    """
+    :type settings: dict
+    :returns: the minimum size in bytes of the request bodies to stream, or
+        None when `pyramid_swagger.stream_request_body_min_size` is not set
+    :rtype: int or None
+    """
+    min_size = settings.get('pyramid_swagger.stream_request_body_min_size')
+    if min_size is None or min_size == '':
+        return None
+    return int(min_size)
@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+"""
+Generate synthetic Swagger specs of any size, and benchmark how
+pyramid_swagger scales with them.
+
+Generated specs have `paths` paths, each with a GET operation returning one of
+`models` models. The models form a tree where every model refers to
+`fan_out` others, and with `recursive` to itself too. With more than one file the models are spread
+across them: Swagger 2.0 models then refer to each other across files,
+Swagger 1.2 models stay in the API declaration of their resource.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import io
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+import yaml
+from pyramid.config import Configurator
+from six import iteritems
+
+from pyramid_swagger.memory import measure_components
+from pyramid_swagger.replay import replay
+
+
+DEFAULT_SIZES = (100, 1000, 10000)
+
+# Growth exponents above this are reported as superlinear
+SUPERLINEAR_EXPONENT = 1.2
+
+
+def get_path(index):
+    return '/resource{0}/{{id}}'.format(index)
+
+
+def get_operation_id(index):
+    return 'get_resource{0}'.format(index)
+
+
+def _referenced_models(index, models, fan_out, recursive):
+    # The models form a tree: models referred to by several others would make
+    # the number of paths through the models grow exponentially, and the
+    # tools walking every path with them
+    referenced = [
+        other for other in range(index * fan_out + 1, (index + 1) * fan_out + 1)
+        if other < models
+    ]
+    if recursive:
+        referenced.append(index)
+    return referenced
+
+
+def generate_swagger20_spec(paths, models, files=1, fan_out=2,
+                            recursive=False, schema_format='json'):
+    """
+    :param files: number of files the models are spread across, besides the
+        main spec file
+    :param schema_format: 'json' or 'yaml'
+    :returns: dict of file name -> document
+    """
+    def model_file(index):
+        if files <= 1:
+            return None
+        return 'models{0}.{1}'.format(index % files, schema_format)
+
+    def model_ref(index, from_file):
+        target_file = model_file(index)
+        if target_file is None:
+            return '#/definitions/Model{0}'.format(index)
+        if target_file == from_file:
+            return '#/Model{0}'.format(index)
+        return '{0}#/Model{1}'.format(target_file, index)
+
+    spec = OrderedDict([
+        ('swagger', '2.0'),
+        ('info', {'title': 'Synthetic', 'version': '1.0'}),
+        ('produces', ['application/json']),
+        ('paths', OrderedDict()),
+        ('definitions', OrderedDict()),
+    ])
+    documents = OrderedDict([('swagger.' + schema_format, spec)])
+
+    for index in range(models):
+        from_file = model_file(index)
+        properties = OrderedDict([
+            ('id', {'type': 'integer'}),
+            ('name', {'type': 'string'}),
+        ])
+        for other in _referenced_models(index, models, fan_out, recursive):
+            properties['model{0}'.format(other)] = {
+                '$ref': model_ref(other, from_file)}
+        model = {'type': 'object', 'properties': properties}
+        if from_file is None:
+            spec['definitions']['Model{0}'.format(index)] = model
+        else:
+            documents.setdefault(from_file, OrderedDict())[
+                'Model{0}'.format(index)] = model
+
+    for index in range(paths):
+        spec['paths'][get_path(index)] = {
+            'get': {
+                'operationId': get_operation_id(index),
+                'parameters': [
+                    {'in': 'path', 'name': 'id', 'type': 'integer',
+                     'required': True},
+                    {'in': 'query', 'name': 'limit', 'type': 'integer'},
+                ],
+                'responses': {
+                    '200': {
+                        'description': 'A model',
+                        'schema': {'$ref': model_ref(index % models, None)},
+                    },
+                },
+            },
+        }
+    return documents
+
+
+def generate_swagger12_spec(paths, models, files=1, fan_out=2,
+                            recursive=False):
+    """
+    :param files: number of resources, ie. API declarations, the paths and
+        models are spread across
+    :returns: dict of file name -> document
+    """
+    files = max(files, 1)
+    resource_listing = {
+        'swaggerVersion': '1.2',
+        'apis': [{'path': '/resource_group{0}'.format(group)}
+                 for group in range(files)],
+    }
+    documents = OrderedDict([('api_docs.json', resource_listing)])
+    declarations = [
+        OrderedDict([
+            ('swaggerVersion', '1.2'),
+            ('basePath', 'http://localhost/'),
+            ('apis', []),
+            ('models', OrderedDict()),
+        ])
+        for _ in range(files)
+    ]
+    for group, declaration in enumerate(declarations):
+        documents['resource_group{0}.json'.format(group)] = declaration
+
+    for index in range(models):
+        group = index % files
+        properties = OrderedDict([
+            ('id', {'type': 'integer'}),
+            ('name', {'type': 'string'}),
+        ])
+        for other in _referenced_models(index, models, fan_out, recursive):
+            # 1.2 models can only refer to models of their declaration
+            if other % files == group:
+                properties['model{0}'.format(other)] = {
+                    '$ref': 'Model{0}'.format(other)}
+        declarations[group]['models']['Model{0}'.format(index)] = {
+            'id': 'Model{0}'.format(index),
+            'type': 'object',
+            'properties': properties,
+        }
+
+    for index in range(paths):
+        group = index % files
+        group_models = list(range(group, models, files)) or [None]
+        model = group_models[index // files % len(group_models)]
+        declarations[group]['apis'].append({
+            'path': get_path(index),
+            'operations': [{
+                'method': 'GET',
+                'nickname': get_operation_id(index),
+                'type': 'void' if model is None else 'Model{0}'.format(model),
+                'parameters': [
+                    {'paramType': 'path', 'name': 'id', 'type': 'integer',
+                     'required': True},
+                    {'paramType': 'query', 'name': 'limit',
+                     'type': 'integer', 'required': False},
+                ],
+            }],
+        })
+    return documents
+
+
+def write_spec(documents, directory):
+    """Write the documents of a generated spec to `directory`, in JSON or
+    YAML according to the extension of their file name.
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    for file_name, document in iteritems(documents):
+        # Plain dicts: OrderedDicts are not representable in safe YAML
+        document = json.loads(json.dumps(document))
+        with io.open(os.path.join(directory, file_name), 'w',
+                     encoding='utf-8') as spec_file:
+            if file_name.endswith('.yaml'):
+                spec_file.write(yaml.safe_dump(document, default_flow_style=False))
+            else:
+                spec_file.write(json.dumps(document, indent=2))
+
+
+def generate_spec_settings(directory, swagger_version, paths, models,
+                           files=1, fan_out=2, recursive=False,
+                           schema_format='json'):
+    """Generate a spec into `directory`.
+
+    :param swagger_version: '1.2' or '2.0'
+    :returns: the pyramid_swagger settings of an application using it
+    :rtype: dict
+    """
+    settings = {
+        'pyramid_swagger.schema_directory': directory,
+        'pyramid_swagger.swagger_versions': swagger_version,
+    }
+    if swagger_version == '1.2':
+        documents = generate_swagger12_spec(
+            paths, models, files, fan_out, recursive)
+    else:
+        documents = generate_swagger20_spec(
+            paths, models, files, fan_out, recursive, schema_format)
+        settings['pyramid_swagger.schema_file'] = 'swagger.' + schema_format
+    write_spec(documents, directory)
+    return settings
+
+
+def generate_requests(paths, count, rng=random):
+    """
+    :returns: `count` traffic records to random paths of a generated spec
+    """
+    records = []
+    for _ in range(count):
+        index = rng.randrange(paths)
+        records.append({
+            'method': 'GET',
+            'path': get_path(index).format(id=rng.randrange(1000)) + '?limit=10',
+            'route': get_path(index),
+            'operation': get_operation_id(index),
+            'status': 200,
+            'response_headers': {'Content-Type': 'application/json'},
+            'response_body': '{"id": 1, "name": "synthetic"}',
+        })
+    return records
+
+
+def measure_startup(settings, routes):
+    """
+    :returns: (seconds to configure an application with `routes` and
+        pyramid_swagger, its registry)
+    """
+    start = time.perf_counter()
+    config = Configurator(settings=dict(settings))
+    for route in routes:
+        config.add_route(route, route)
+    config.include('pyramid_swagger')
+    config.commit()
+    return time.perf_counter() - start, config.registry
+
+
+def growth_exponent(sizes, values):
+    """Exponent `k` such that `values` grow like `sizes ** k` between the two
+    last sizes.
+
+    :returns: the exponent, or None when it cannot be computed
+    """
+    if len(sizes) < 2 or not values[-2] or not values[-1]:
+        return None
+    return math.log(values[-1] / values[-2]) / math.log(sizes[-1] / sizes[-2])
+
+
+def benchmark_scaling(sizes=DEFAULT_SIZES, swagger_version='2.0',
+                      models=None, files=1, fan_out=2, recursive=False,
+                      schema_format='json', requests=200, settings=None,
+                      rng=random):
+    """Measure the startup time, memory and per-request latency of
+    pyramid_swagger for generated specs of `sizes` paths.
+
+    :param models: number of models of the specs, defaults to a tenth of
+        their paths
+    :param settings: other pyramid_swagger settings of the application
+    :returns: one JSON serializable row per size, with the growth exponents
+        since the previous size
+    :rtype: list of dict
+    """
+    rows = []
+    for paths in sizes:
+        directory = tempfile.mkdtemp(prefix='pyramid_swagger_synthetic')
+        try:
+            app_settings = dict(settings or {})
+            app_settings.update(generate_spec_settings(
+                directory, swagger_version, paths,
+                models or max(paths // 10, 1), files, fan_out, recursive,
+                schema_format,
+            ))
+            routes = [get_path(index) for index in range(paths)]
+            startup_seconds, registry = measure_startup(app_settings, routes)
+            memory_bytes = sum(measure_components(registry).values())
+            summary = replay(
+                app_settings, generate_requests(paths, requests, rng),
+                routes=routes,
+            ).summary()
+        finally:
+            shutil.rmtree(directory)
+
+        rows.append({
+            'paths': paths,
+            'startup_seconds': startup_seconds,
+            'memory_bytes': memory_bytes,
+            'request_seconds': summary['seconds'] / summary['requests'],
+        })
+        for measure in ('startup_seconds', 'memory_bytes', 'request_seconds'):
+            rows[-1][measure + '_exponent'] = growth_exponent(
+                [row['paths'] for row in rows],
+                [row[measure] for row in rows],
+            )
+    return rows
+
+
+def format_scaling(rows):
+    """
+    :returns: one line per size. Growth exponents above
+        :data:`SUPERLINEAR_EXPONENT` are marked with a `!`.
+    :rtype: str
+    """
+    def exponent(row, measure):
+        value = row[measure + '_exponent']
+        if value is None:
+            return '{0:>6}'.format('-')
+        mark = '!' if value > SUPERLINEAR_EXPONENT else ' '
+        return '{0:>5.2f}{1}'.format(value, mark)
+
+    lines = ['{0:>8} {1:>12} {2:>6} {3:>14} {4:>6} {5:>12} {6:>6}'.format(
+        'paths', 'startup s', 'k', 'memory bytes', 'k', 'request ms', 'k')]
+    for row in rows:
+        lines.append('{0:>8} {1:>12.3f} {2} {3:>14} {4} {5:>12.3f} {6}'.format(
+            row['paths'],
+            row['startup_seconds'], exponent(row, 'startup_seconds'),
+            row['memory_bytes'], exponent(row, 'memory_bytes'),
+            row['request_seconds'] * 1000, exponent(row, 'request_seconds'),
+        ))
+    lines.append(
+        'k: growth exponent since the previous size, ! when superlinear')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    """Entry point of the `pyramid-swagger-synthetic` console script."""
+    parser = argparse.ArgumentParser(
+        description='Generate synthetic Swagger specs, or benchmark how '
+                    'pyramid_swagger scales with them.',
+    )
+    parser.add_argument(
+        '--swagger-version', choices=['1.2', '2.0'], default='2.0')
+    parser.add_argument(
+        '--models', type=int, default=None,
+        help='Number of models. Defaults to a tenth of the paths')
+    parser.add_argument(
+        '--files', type=int, default=1,
+        help='Number of files the models are spread across')
+    parser.add_argument(
+        '--fan-out', type=int, default=2,
+        help='Number of other models each model refers to')
+    parser.add_argument(
+        '--recursive', action='store_true',
+        help='Make every model refer to itself')
+    parser.add_argument(
+        '--format', choices=['json', 'yaml'], default='json',
+        help='Format of the Swagger 2.0 files')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    generate_parser = subparsers.add_parser(
+        'generate', help='Write a spec to a schema directory')
+    generate_parser.add_argument('directory')
+    generate_parser.add_argument('--paths', type=int, default=DEFAULT_SIZES[0])
+
+    benchmark_parser = subparsers.add_parser(
+        'benchmark', help='Chart startup time, memory and request latency '
+                          'against the number of paths')
+    benchmark_parser.add_argument(
+        '--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    benchmark_parser.add_argument(
+        '--requests', type=int, default=200,
+        help='Number of requests timed for each size')
+    benchmark_parser.add_argument(
+        '--setting', action='append', default=[], metavar='NAME=VALUE',
+        help='Other setting of the application, eg. '
+             'pyramid_swagger.enable_swagger_spec_validation=false. Can be '
+             'repeated')
+    benchmark_parser.add_argument(
+        '--json', action='store_true',
+        help='Write the results as JSON, eg. to compare versions')
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        generate_spec_settings(
+            args.directory, args.swagger_version, args.paths,
+            args.models or max(args.paths // 10, 1), args.files,
+            args.fan_out, args.recursive, args.format,
+        )
+        return 0
+
+    rows = benchmark_scaling(
+        args.sizes, args.swagger_version, args.models, args.files,
+        args.fan_out, args.recursive, args.format, args.requests,
+        dict(setting.split('=', 1) for setting in args.setting),
+    )
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(format_scaling(rows))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
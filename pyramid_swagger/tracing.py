@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Hooks for request tracers, so that the time spent by the validation tween
+shows up as spans in the trace of a request.
+
+A tracer is any object with the methods of :class:`Tracer`, configured with
+the dotted path in `pyramid_swagger.tracer`. The validation tween opens a
+span for each of its phases:
+
+* `pyramid_swagger.op_for_request`: the lookup of the operation
+* `pyramid_swagger.request`: the validation and unmarshalling of the request
+* `pyramid_swagger.handler`: the call of the view, and the tweens below
+* `pyramid_swagger.response`: the validation of the response
+
+and finishes it with tags holding the `operation_id`, the `body_bytes` of the
+request or response when known, and the `outcome`: `ok`, `invalid` when the
+phase raised an HTTP error, eg. a validation error, or `error`.
+"""
+from __future__ import absolute_import
+
+from contextlib import contextmanager
+
+from pyramid.httpexceptions import HTTPException
+
+
+SPAN_OP_FOR_REQUEST = 'pyramid_swagger.op_for_request'
+SPAN_REQUEST = 'pyramid_swagger.request'
+SPAN_HANDLER = 'pyramid_swagger.handler'
+SPAN_RESPONSE = 'pyramid_swagger.response'
+
+
+class Tracer(object):
+    """Interface of the tracers. This one traces nothing."""
+
+    def start_span(self, name, request):
+        """Called when the validation tween starts a phase.
+
+        :param name: name of the phase, eg. `pyramid_swagger.request`
+        :type request: :class:`pyramid.request.Request`
+        :returns: a span, passed back to :meth:`finish_span`
+        """
+        return None
+
+    def finish_span(self, span, tags):
+        """Called when the phase ends, even when it raised.
+
+        :param span: the span returned by :meth:`start_span`
+        :param tags: dict of the tags of the span
+        """
+
+
+class _NoopSpan(object):
+    """Span context used when tracing is off. A single instance serves every
+    phase, so untraced requests pay neither for a generator nor for a context
+    manager per phase. The tags it yields are discarded.
+    """
+
+    def __enter__(self):
+        return {}
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def noop_span(name, request, **tags):
+    """Span context of the phases when no tracer is configured."""
+    return _NOOP_SPAN
+
+
+def build_span_context(tracer):
+    """
+    :param tracer: a :class:`Tracer`
+    :returns: a context manager taking the name of a phase, the request and
+        initial tags, which traces the phase with `tracer`. It yields the
+        tags, so they can be completed during the phase.
+    """
+    @contextmanager
+    def span_context(name, request, **tags):
+        span = tracer.start_span(name, request)
+        try:
+            yield tags
+        except HTTPException:
+            tags['outcome'] = 'invalid'
+            raise
+        except Exception:
+            tags['outcome'] = 'error'
+            raise
+        else:
+            tags['outcome'] = 'ok'
+        finally:
+            tracer.finish_span(span, tags)
+
+    return span_context
+
+
+class OpenTelemetryTracer(Tracer):
+    """Records the phases as OpenTelemetry spans, children of the current
+    span, ie. usually the span of the request.
+
+    Requires the `opentelemetry-api` package, installed by the
+    `opentelemetry` extra of pyramid_swagger.
+    """
+
+    def __init__(self, tracer=None):
+        from opentelemetry import trace
+        self.tracer = tracer or trace.get_tracer('pyramid_swagger')
+
+    def start_span(self, name, request):
+        return self.tracer.start_span(name)
+
+    def finish_span(self, span, tags):
+        for key, value in tags.items():
+            if value is not None:
+                span.set_attribute(key, value)
+        span.end()
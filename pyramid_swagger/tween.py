@@ -19,17 +19,44 @@ from bravado_core.formatter import SwaggerFormat  # noqa: F401
 from bravado_core.operation import Operation
 from bravado_core.request import IncomingRequest
 from bravado_core.request import unmarshal_request
-from bravado_core.response import get_response_spec
 from bravado_core.response import OutgoingResponse
 from pyramid.interfaces import IRoutesMapper
 from pyramid.settings import asbool
 from pyramid.settings import aslist
 
+from pyramid_swagger.budget import get_response_validation_budget
+from pyramid_swagger.budget import validate_response_body
+from pyramid_swagger.budget import validation_budget
+from pyramid_swagger.budget import ValidationBudgetExceeded
+from pyramid_swagger.cache import cache_request_data
+from pyramid_swagger.codegen import get_validation_backend
+from pyramid_swagger.codegen import is_valid_response_body
+from pyramid_swagger.codegen import unmarshal_request_compiled
+from pyramid_swagger.codegen import VALIDATION_BACKEND_COMPILED
+from pyramid_swagger.codegen import VALIDATION_BACKEND_INTERPRETED
 from pyramid_swagger.exceptions import PathNotFoundError
 from pyramid_swagger.exceptions import RequestAuthenticationError
 from pyramid_swagger.exceptions import RequestValidationError
 from pyramid_swagger.exceptions import ResponseValidationError
+from pyramid_swagger.limits import enforce_body_limits as check_body_limits
 from pyramid_swagger.model import PathNotMatchedError
+from pyramid_swagger.profiling import build_request_profiler
+from pyramid_swagger.recorder import build_traffic_recorder
+from pyramid_swagger.response_specs import get_response_spec
+from pyramid_swagger.sampling import DEFAULT_SAMPLE_SIZE
+from pyramid_swagger.sampling import get_sample_size
+from pyramid_swagger.sampling import validate_response_body_sampled
+from pyramid_swagger.stats import STATS_ROUTE_NAME
+from pyramid_swagger.streaming import get_stream_body_min_size
+from pyramid_swagger.streaming import unmarshal_request_streaming
+from pyramid_swagger.tracing import build_span_context
+from pyramid_swagger.tracing import noop_span
+from pyramid_swagger.tracing import SPAN_HANDLER
+from pyramid_swagger.tracing import SPAN_OP_FOR_REQUEST
+from pyramid_swagger.tracing import SPAN_REQUEST
+from pyramid_swagger.tracing import SPAN_RESPONSE
+from pyramid_swagger.validation_log import build_validation_event_log
+from pyramid_swagger.validation_log import CAST_FAILURE
 
 
 log = logging.getLogger(__name__)
@@ -59,7 +86,10 @@ class Settings(namedtuple(
         'exclude_paths',
         'exclude_routes',
         'prefer_20_routes',
-        'response_validation_exclude_routes'
+        'response_validation_exclude_routes',
+        'response_validation_sample_routes',
+        'response_validation_sample_size',
+        'response_validation_budget',
     ]
 )):
 
@@ -82,6 +112,12 @@ class Settings(namedtuple(
         handled via v1.2 spec. [i.e. Make v2.0 an opt-in feature]
     :param response_validation_exclude_routes: list of route names that should be excluded from
         response validation.
+    :param response_validation_sample_routes: list of route names whose
+        array responses are validated on a sample of their items.
+    :param response_validation_sample_size: number of leading items, and of
+        random other items, validated for these routes.
+    :param response_validation_budget: seconds after which the validation of
+        a v2.0 response is abandoned, or None.
     """
 
 
@@ -90,27 +126,42 @@ def noop_context(request, response=None):
     yield
 
 
+def _import_dotted_name(dotted_name):
+    m = re.match(r'(?P<module_path>.*)\.(?P<name>.*)', dotted_name)
+    module_path = m.group('module_path')
+    name = m.group('name')
+
+    return getattr(__import__(module_path, fromlist=name), name)
+
+
 def _get_validation_context(registry):
     validation_context_path = registry.settings.get(
         'pyramid_swagger.validation_context_path',
     )
 
     if validation_context_path:
-        m = re.match(
-            r'(?P<module_path>.*)\.(?P<contextmanager_name>.*)',
-            validation_context_path,
-        )
-        module_path = m.group('module_path')
-        contextmanager_name = m.group('contextmanager_name')
-
-        return getattr(
-            __import__(module_path, fromlist=contextmanager_name),
-            contextmanager_name,
-        )
+        return _import_dotted_name(validation_context_path)
     else:
         return noop_context
 
 
+def _get_span_context(registry):
+    tracer_path = registry.settings.get('pyramid_swagger.tracer')
+
+    if tracer_path:
+        tracer = _import_dotted_name(tracer_path)
+        if isinstance(tracer, type):
+            tracer = tracer()
+        return build_span_context(tracer)
+    else:
+        return noop_span
+
+
+def _get_operation_id(op_or_validators_map):
+    # Swagger 1.2 has no operation ids
+    return getattr(op_or_validators_map, 'operation_id', None)
+
+
 def get_swagger_objects(settings, route_info, registry):
     """Returns appropriate swagger handler and swagger spec schema.
 
@@ -156,9 +207,26 @@ def validation_tween_factory(handler, registry):
     settings = load_settings(registry)
     route_mapper = registry.queryUtility(IRoutesMapper)
 
+    event_log = build_validation_event_log(registry.settings)
+    if event_log is not None:
+        settings = settings._replace(**dict(
+            (name, event_log.wrap_handler(getattr(settings, name)))
+            for name in ('swagger12_handler', 'swagger20_handler')
+            if getattr(settings, name) is not None
+        ))
+
     validation_context = _get_validation_context(registry)
+    span_context = _get_span_context(registry)
+    spec_reloader = registry.settings.get('pyramid_swagger.spec_reloader')
+
+    profiler = build_request_profiler(registry.settings)
+    if profiler is not None:
+        handler = profiler.pause_around(handler)
 
     def validator_tween(request):
+        if spec_reloader:
+            spec_reloader.check()
+
         # We don't have access to this yet but let's go ahead and build the
         # matchdict so we can validate it and use it to exclude routes from
         # validation.
@@ -170,8 +238,10 @@ def validation_tween_factory(handler, registry):
             return handler(request)
 
         try:
-            op_or_validators_map = swagger_handler.op_for_request(
-                request, route_info=route_info, spec=spec)
+            with span_context(SPAN_OP_FOR_REQUEST, request) as tags:
+                op_or_validators_map = swagger_handler.op_for_request(
+                    request, route_info=route_info, spec=spec)
+                tags['operation_id'] = _get_operation_id(op_or_validators_map)
         except PathNotMatchedError as exc:
             if settings.validate_path:
                 with validation_context(request):
@@ -183,9 +253,14 @@ def validation_tween_factory(handler, registry):
             return op_or_validators_map if isinstance(op_or_validators_map, Operation) else None
 
         request.set_property(operation)
+        operation_id = _get_operation_id(op_or_validators_map)
 
         if settings.validate_request:
-            with validation_context(request, response=None):
+            with span_context(
+                SPAN_REQUEST, request,
+                operation_id=operation_id,
+                body_bytes=request.content_length,
+            ), validation_context(request, response=None):
                 request_data = swagger_handler.handle_request(
                     PyramidSwaggerRequest(request, route_info),
                     op_or_validators_map,
@@ -196,17 +271,71 @@ def validation_tween_factory(handler, registry):
 
             request.set_property(swagger_data)
 
-        response = handler(request)
-
-        if settings.validate_response and not should_exclude_response_validation(settings, route_info):
-            with validation_context(request, response=response):
-                swagger_handler.handle_response(response, op_or_validators_map)
+        validate_response = settings.validate_response and \
+            not should_exclude_response_validation(settings, route_info)
+        # The streaming renderer validates the bodies it streams
+        request.environ['pyramid_swagger.validate_response'] = validate_response
+
+        with span_context(SPAN_HANDLER, request, operation_id=operation_id):
+            response = handler(request)
+
+        if validate_response and \
+                not request.environ.get('pyramid_swagger.streamed_response'):
+            handle_response_kwargs = {}
+            if isinstance(op_or_validators_map, Operation) and \
+                    should_sample_response_validation(settings, route_info):
+                handle_response_kwargs['sample_size'] = \
+                    settings.response_validation_sample_size
+            with span_context(
+                SPAN_RESPONSE, request,
+                operation_id=operation_id,
+                body_bytes=response.content_length,
+            ), validation_context(request, response=response):
+                skipped_items = handle_response_within_budget(
+                    settings, request, swagger_handler, response,
+                    op_or_validators_map, **handle_response_kwargs)
+            if skipped_items:
+                request.environ['pyramid_swagger.skipped_response_items'] = \
+                    skipped_items
 
         return response
 
+    if profiler is not None:
+        validator_tween = profiler.wrap(validator_tween, route_mapper)
+    recorder = build_traffic_recorder(registry.settings)
+    if recorder is not None:
+        return recorder.wrap(validator_tween, route_mapper)
     return validator_tween
 
 
+def handle_response_within_budget(
+    settings, request, swagger_handler, response, op_or_validators_map,
+    **kwargs
+):
+    """Validate the response, giving up once `settings.response_validation_budget`
+    is exceeded: the response is then passed through unvalidated.
+
+    :returns: the result of `swagger_handler.handle_response`
+    """
+    if settings.response_validation_budget is None or \
+            not isinstance(op_or_validators_map, Operation):
+        return swagger_handler.handle_response(
+            response, op_or_validators_map, **kwargs)
+
+    try:
+        with validation_budget(settings.response_validation_budget):
+            return swagger_handler.handle_response(
+                response, op_or_validators_map, **kwargs)
+    except ValidationBudgetExceeded:
+        log.warning(
+            'Response validation of %s %s exceeded its %d ms budget, the '
+            'response was not validated',
+            request.method, request.path_info,
+            settings.response_validation_budget * 1000,
+        )
+        request.environ['pyramid_swagger.response_validation_bypassed'] = True
+
+
 class PyramidSwaggerRequest(IncomingRequest):
     """Adapter for a :class:`pyramid.request.Request` which exposes request
     data for casting and validation.
@@ -331,7 +460,7 @@ class PyramidSwaggerResponse(OutgoingResponse):
         return getattr(self.response, 'json_body', {})
 
 
-def handle_request(request, validator_map, **kwargs):
+def handle_request(request, validator_map, event_log=None, **kwargs):
     """Validate the request against the swagger spec and return a dict with
     all parameter values available in the request, casted to the expected
     python type.
@@ -339,6 +468,8 @@ def handle_request(request, validator_map, **kwargs):
     :param request: a :class:`PyramidSwaggerRequest` to validate
     :param validator_map: a :class:`pyramid_swagger.load_schema.ValidatorMap`
         used to validate the request
+    :param event_log: a :class:`pyramid_swagger.validation_log.ValidationEventLog`
+        counting the params which could not be cast, or None to log them
     :returns: a :class:`dict` of request data for each parameter in the swagger
         spec
     :raises: RequestValidationError when the request is not valid for the
@@ -353,7 +484,7 @@ def handle_request(request, validator_map, **kwargs):
         (validator_map.form, request.form),
         (validator_map.headers, request.headers),
     ]:
-        values = cast_params(validator.schema, values)
+        values = cast_params(validator.schema, values, event_log)
         validation_pairs.append((validator, values))
         request_data.update(values)
 
@@ -373,7 +504,15 @@ def load_settings(registry):
     return Settings(
         swagger12_handler=build_swagger12_handler(
             registry.settings.get('pyramid_swagger.schema12')),
-        swagger20_handler=build_swagger20_handler(),
+        swagger20_handler=build_swagger20_handler(
+            get_validation_backend(registry.settings),
+            registry.settings.get('pyramid_swagger.request_cache'),
+            get_stream_body_min_size(registry.settings),
+            asbool(registry.settings.get(
+                'pyramid_swagger.enforce_body_limits', False)),
+            registry.settings.get('pyramid_swagger.stats'),
+            registry.settings.get('pyramid_swagger.offload_pool'),
+        ),
         validate_request=asbool(registry.settings.get(
             'pyramid_swagger.enable_request_validation',
             True,
@@ -395,6 +534,15 @@ def load_settings(registry):
         response_validation_exclude_routes=set(aslist(registry.settings.get(
             'pyramid_swagger.response_validation_exclude_routes',
         ) or [])),
+        response_validation_sample_routes=set(aslist(registry.settings.get(
+            'pyramid_swagger.response_validation_sample_routes',
+        ) or [])),
+        response_validation_sample_size=int(registry.settings.get(
+            'pyramid_swagger.response_validation_sample_size',
+            DEFAULT_SAMPLE_SIZE,
+        )),
+        response_validation_budget=get_response_validation_budget(
+            registry.settings),
     )
 
 
@@ -402,12 +550,56 @@ SwaggerHandler = namedtuple('SwaggerHandler',
                             'op_for_request handle_request handle_response')
 
 
-def build_swagger20_handler():
-    return SwaggerHandler(
+def build_swagger20_handler(
+    validation_backend=VALIDATION_BACKEND_INTERPRETED,
+    request_cache=None,
+    stream_body_min_size=None,
+    enforce_body_limits=False,
+    stats=None,
+    offload_pool=None,
+):
+    """
+    :type validation_backend: str
+    :param request_cache: cache of the request data, or None
+    :type request_cache: :class:`pyramid_swagger.cache.RequestDataCache`
+    :param stream_body_min_size: minimum size in bytes of the request bodies
+        parsed incrementally, or None to never stream them
+    :param enforce_body_limits: reject the request bodies exceeding the
+        limits of their operation before parsing them
+    :param stats: statistics recording the handled requests and responses,
+        or None
+    :type stats: :class:`pyramid_swagger.stats.ValidationStats`
+    :param offload_pool: pool of processes validating the large bodies, or
+        None
+    :type offload_pool: :class:`pyramid_swagger.offload.OffloadPool`
+    :rtype: :class:`SwaggerHandler`
+    """
+    compiled = validation_backend == VALIDATION_BACKEND_COMPILED
+    if compiled:
+        handle_response = swaggerize_response_compiled
+    else:
+        handle_response = swaggerize_response
+    handle_request = swaggerize_request
+    if stream_body_min_size is not None or enforce_body_limits or compiled:
+        handle_request = functools.partial(
+            swaggerize_request,
+            stream_body_min_size=stream_body_min_size,
+            enforce_body_limits=enforce_body_limits,
+            compiled=compiled,
+        )
+    if offload_pool is not None:
+        handle_request = offload_pool.offload_request(handle_request)
+        handle_response = offload_pool.offload_response(handle_response)
+    if request_cache is not None:
+        handle_request = cache_request_data(handle_request, request_cache)
+    swagger_handler = SwaggerHandler(
         op_for_request=get_op_for_request,
-        handle_request=swaggerize_request,
-        handle_response=swaggerize_response,
+        handle_request=handle_request,
+        handle_response=handle_response,
     )
+    if stats is not None:
+        swagger_handler = stats.wrap_handler(swagger_handler)
+    return swagger_handler
 
 
 def build_swagger12_handler(schema):
@@ -451,7 +643,8 @@ def is_swagger_documentation_route(route_info):
     route = route_info.get('route')
     if not route:
         return False
-    return route.name.startswith('pyramid_swagger.swagger20.api_docs.')
+    return route.name.startswith('pyramid_swagger.swagger20.api_docs.') or \
+        route.name == STATS_ROUTE_NAME
 
 
 def should_exclude_request(settings, request, route_info):
@@ -472,6 +665,10 @@ def should_exclude_response_validation(settings, route_info):
     return should_exclude_route(settings.response_validation_exclude_routes, route_info)
 
 
+def should_sample_response_validation(settings, route_info):
+    return should_exclude_route(settings.response_validation_sample_routes, route_info)
+
+
 def should_exclude_path(exclude_path_regexes, path):
     # Skip validation for the specified endpoints
     return any(r.match(path) for r in exclude_path_regexes)
@@ -493,8 +690,8 @@ def validation_error(exc_class):
             ) as exc:
                 # This will alter our stack trace slightly, but Pyramid knows
                 # how to render it. And the real value is in the message
-                # anyway.
-                e = exc_class(str(exc), child=exc)
+                # anyway, formatted from `child` when it is first read.
+                e = exc_class(child=exc)
                 e._traceback = sys.exc_info()[2]
                 raise e
 
@@ -511,7 +708,7 @@ CAST_TYPE_TO_FUNC = {
 }
 
 
-def cast_request_param(param_type, param_name, param_value):
+def cast_request_param(param_type, param_name, param_value, event_log=None):
     """Try to cast a request param (e.g. query arg, POST data) from a string to
     its specified type in the schema. This allows validating non-string params.
 
@@ -521,12 +718,18 @@ def cast_request_param(param_type, param_name, param_value):
     :type  param_name: string
     :param param_value: param value
     :type  param_value: string
+    :param event_log: when set, the failure to cast is counted in this
+        :class:`pyramid_swagger.validation_log.ValidationEventLog` instead of
+        being logged
     """
     try:
         return CAST_TYPE_TO_FUNC.get(param_type, lambda x: x)(param_value)
     except ValueError:
-        log.warn("Failed to cast %s value of %s to %s",
-                 param_name, param_value, param_type)
+        if event_log is not None:
+            event_log.record(None, CAST_FAILURE)
+        else:
+            log.warn("Failed to cast %s value of %s to %s",
+                     param_name, param_value, param_type)
         # Ignore type error, let jsonschema validation handle incorrect types
         return param_value
 
@@ -537,7 +740,7 @@ def validate_request(validation_pairs):
         validator.validate(values)
 
 
-def cast_params(schema, values):
+def cast_params(schema, values, event_log=None):
     if not schema:
         return {}
 
@@ -545,7 +748,7 @@ def cast_params(schema, values):
         return schema['properties'].get(param_name, {}).get('type')
 
     return dict(
-        (k, cast_request_param(get_type(k), k, v))
+        (k, cast_request_param(get_type(k), k, v, event_log))
         for k, v in values.items()
     )
 
@@ -587,7 +790,10 @@ def prepare_body(response):
 
 
 @validation_error(RequestValidationError)
-def swaggerize_request(request, op, **kwargs):
+def swaggerize_request(
+    request, op, stream_body_min_size=None, enforce_body_limits=False,
+    compiled=False, **kwargs
+):
     """
     Delegate handling the Swagger concerns of the request to bravado-core.
     Post-invocation, the Swagger request parameters are available as a dict
@@ -595,26 +801,84 @@ def swaggerize_request(request, op, **kwargs):
 
     :type request: :class:`pyramid.request.Request`
     :type op: :class:`bravado_core.operation.Operation`
-    :raises: RequestValidationError, RequestAuthenticationError
+    :param stream_body_min_size: see
+        :func:`pyramid_swagger.streaming.unmarshal_request_streaming`
+    :param enforce_body_limits: see
+        :func:`pyramid_swagger.limits.enforce_body_limits`
+    :param compiled: validate the JSON bodies with their compiled schemas
+        first, see :func:`pyramid_swagger.codegen.unmarshal_request_compiled`
+    :raises: RequestValidationError, RequestAuthenticationError,
+        RequestEntityTooLargeError
     """
+    if enforce_body_limits:
+        check_body_limits(request, op)
     try:
-        request_data = unmarshal_request(request, op)
+        if stream_body_min_size is not None:
+            request_data = unmarshal_request_streaming(
+                request, op, stream_body_min_size)
+        elif compiled:
+            request_data = unmarshal_request_compiled(request, op)
+        else:
+            request_data = unmarshal_request(request, op)
     except SwaggerSecurityValidationError as e:
         six.raise_from(RequestAuthenticationError(e), e)
     return request_data
 
 
 @validation_error(ResponseValidationError)
-def swaggerize_response(response, op):
+def swaggerize_response(response, op, sample_size=None):
     """
     Delegate handling the Swagger concerns of the response to bravado-core.
 
     :type response: :class:`pyramid.response.Response`
     :type op: :class:`bravado_core.operation.Operation`
+    :param sample_size: validate only a sample of the items of array
+        responses, see :mod:`pyramid_swagger.sampling`
+    :returns: the number of response items which were not validated
+    """
+    response_spec = get_response_spec(response.status_int, op)
+    sample_size = get_sample_size(op.swagger_spec, response_spec, sample_size)
+    if not op.swagger_spec.config['validate_responses']:
+        return 0
+
+    outgoing_response = PyramidSwaggerResponse(response)
+    skipped_items = 0
+    if sample_size is None:
+        # Checks the deadline of the response validation budget
+        validate_response_body(op, response_spec, outgoing_response)
+    else:
+        skipped_items = validate_response_body_sampled(
+            op, response_spec, outgoing_response, sample_size)
+    bravado_core.response.validate_response_headers(
+        op, response_spec, outgoing_response)
+    return skipped_items
+
+
+@validation_error(ResponseValidationError)
+def swaggerize_response_compiled(response, op, sample_size=None):
+    """
+    Same as :func:`swaggerize_response`, except that response bodies
+    accepted by the compiled schemas are not validated again by bravado-core.
+
+    :type response: :class:`pyramid.response.Response`
+    :type op: :class:`bravado_core.operation.Operation`
+    :returns: the number of response items which were not validated
     """
     response_spec = get_response_spec(response.status_int, op)
-    bravado_core.response.validate_response(
-        response_spec, op, PyramidSwaggerResponse(response))
+    if not op.swagger_spec.config['validate_responses']:
+        return 0
+
+    outgoing_response = PyramidSwaggerResponse(response)
+    skipped_items = 0
+    sample_size = get_sample_size(op.swagger_spec, response_spec, sample_size)
+    if sample_size is not None:
+        skipped_items = validate_response_body_sampled(
+            op, response_spec, outgoing_response, sample_size)
+    elif not is_valid_response_body(op, response_spec, outgoing_response):
+        validate_response_body(op, response_spec, outgoing_response)
+    bravado_core.response.validate_response_headers(
+        op, response_spec, outgoing_response)
+    return skipped_items
 
 
 def get_op_for_request(request, route_info, spec):
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Rate limited logging of validation failures and of slow validations.
+
+Events are only counted per (operation, kind) as they happen, and the counts
+are logged once per interval: a storm of invalid requests costs a dict
+increment per request, not a formatted log message. The counts of an
+interval are logged when it ends, by a timer when no later event does.
+"""
+from __future__ import absolute_import
+
+import logging
+import threading
+import time
+
+from pyramid.httpexceptions import HTTPException
+from pyramid.settings import asbool
+from six import iteritems
+
+
+log = logging.getLogger(__name__)
+
+
+DEFAULT_LOG_INTERVAL = 60.0
+
+SLOW_REQUEST_VALIDATION = 'slow_request_validation'
+SLOW_RESPONSE_VALIDATION = 'slow_response_validation'
+# Swagger 1.2 request params which could not be cast to their type
+CAST_FAILURE = 'cast_failure'
+
+
+class ValidationEventLog(object):
+    """Counts validation events, and logs the counts every `interval`
+    seconds.
+
+    Each count is logged as a separate record, with the `operation_id`, the
+    `event` kind, the `count` and the `interval` as extra attributes for
+    structured log handlers.
+
+    :param log_failures: count the validations raising an HTTP error. The kind
+        of the event is the class name of the error, eg.
+        `RequestValidationError`.
+    :param slow_threshold: seconds after which a validation is counted as
+        slow, or None
+    """
+
+    def __init__(self, log_failures=True, slow_threshold=None,
+                 interval=DEFAULT_LOG_INTERVAL, logger=log):
+        self.log_failures = log_failures
+        self.slow_threshold = slow_threshold
+        self.interval = interval
+        self.logger = logger
+        # (operation id, event kind) -> count
+        self.counts = {}
+        self._next_flush = time.monotonic() + interval
+        self._lock = threading.Lock()
+        # Logs the counts at the end of the interval if no event does
+        self._timer = None
+
+    def record(self, operation_id, event):
+        """Count an event, and log the counts when `interval` elapsed since
+        they were last logged.
+
+        :param operation_id: None for Swagger 1.2
+        """
+        key = (operation_id, event)
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+            delay = self._next_flush - time.monotonic()
+            if delay > 0:
+                if self._timer is None:
+                    self._start_timer(delay)
+                return
+            counts = self._swap()
+        self._log(counts)
+
+    def flush(self):
+        """Log the counts now."""
+        with self._lock:
+            counts = self._swap()
+        self._log(counts)
+
+    def _start_timer(self, delay):
+        self._timer = threading.Timer(delay, self._flush_if_due)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_if_due(self):
+        with self._lock:
+            self._timer = None
+            if not self.counts:
+                return
+            delay = self._next_flush - time.monotonic()
+            if delay > 0:
+                self._start_timer(delay)
+                return
+            counts = self._swap()
+        self._log(counts)
+
+    def _swap(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        counts, self.counts = self.counts, {}
+        self._next_flush = time.monotonic() + self.interval
+        return counts
+
+    def _log(self, counts):
+        if not self.logger.isEnabledFor(logging.WARNING):
+            return
+        for (operation_id, event), count in sorted(
+            iteritems(counts), key=lambda item: (str(item[0][0]), item[0][1]),
+        ):
+            self.logger.warning(
+                '%d %s for operation %s in the last %.0fs',
+                count, event, operation_id or '-', self.interval,
+                extra={
+                    'operation_id': operation_id,
+                    'event': event,
+                    'count': count,
+                    'interval': self.interval,
+                },
+            )
+
+    def wrap_handler(self, swagger_handler):
+        """
+        :type swagger_handler: :class:`pyramid_swagger.tween.SwaggerHandler`
+        :returns: a :class:`pyramid_swagger.tween.SwaggerHandler` counting
+            the failed and slow validations of `swagger_handler`, and the
+            Swagger 1.2 params which could not be cast
+        """
+        # handle_request counts the cast failures in the `event_log` it is
+        # given, instead of logging each of them
+        request_kwargs = {'event_log': self} if self.log_failures else {}
+        return swagger_handler._replace(
+            handle_request=self._wrap(
+                swagger_handler.handle_request, SLOW_REQUEST_VALIDATION,
+                **request_kwargs),
+            handle_response=self._wrap(
+                swagger_handler.handle_response, SLOW_RESPONSE_VALIDATION),
+        )
+
+    def _wrap(self, handle, slow_event, **handle_kwargs):
+        def handle_with_log(request_or_response, op, **kwargs):
+            kwargs.update(handle_kwargs)
+            start = time.perf_counter()
+            try:
+                return handle(request_or_response, op, **kwargs)
+            except HTTPException as exc:
+                if self.log_failures:
+                    self.record(
+                        getattr(op, 'operation_id', None),
+                        exc.__class__.__name__,
+                    )
+                raise
+            finally:
+                if self.slow_threshold is not None and \
+                        time.perf_counter() - start > self.slow_threshold:
+                    self.record(getattr(op, 'operation_id', None), slow_event)
+
+        return handle_with_log
+
+
+def build_validation_event_log(settings):
+    """
+    :type settings: dict
+    :returns: the :class:`ValidationEventLog` configured by
+        `pyramid_swagger.log_validation_failures` and
+        `pyramid_swagger.slow_validation_threshold_ms`, or None when neither
+        is set
+    """
+    log_failures = asbool(settings.get(
+        'pyramid_swagger.log_validation_failures', False))
+    slow_threshold_ms = settings.get(
+        'pyramid_swagger.slow_validation_threshold_ms')
+    if not log_failures and slow_threshold_ms is None:
+        return None
+    return ValidationEventLog(
+        log_failures=log_failures,
+        slow_threshold=None if slow_threshold_ms is None
+        else float(slow_threshold_ms) / 1000,
+        interval=float(settings.get(
+            'pyramid_swagger.validation_log_interval', DEFAULT_LOG_INTERVAL)),
+    )
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Build the per-operation validation state ahead of the first request which
+needs it.
+"""
+from __future__ import absolute_import
+
+import logging
+import threading
+
+from bravado_core.swagger20_validator import get_validator_type
+from pyramid.settings import asbool
+from six import itervalues
+
+
+log = logging.getLogger(__name__)
+
+
+def warm_up_swagger_12_schema(schema):
+    """Build every lazily built validator map of a Swagger 1.2 schema.
+
+    :type schema: :class:`pyramid_swagger.model.SwaggerSchema`
+    """
+    for resource_validator in schema.resource_validators:
+        for validator_map in itervalues(resource_validator):
+            build = getattr(validator_map, 'build', None)
+            if build:
+                build()
+
+
+def warm_up_operation(op):
+    """Compute the cached state bravado-core builds for an operation the
+    first time it handles a request.
+
+    :type op: :class:`bravado_core.operation.Operation`
+    """
+    op.consumes
+    op.produces
+    op.security_requirements
+    op.security_parameters
+    op.operation_id
+
+
+def warm_up_swagger_20_spec(spec):
+    """
+    :type spec: :class:`bravado_core.spec.Spec`
+    """
+    # Builds the (http_method, path) -> operation index
+    spec.get_op_for_request('get', '')
+    get_validator_type(spec)
+    for resource in itervalues(spec.resources):
+        for op in itervalues(resource.operations):
+            warm_up_operation(op)
+
+
+def warm_up(settings):
+    """Build the validation state of every operation of the configured
+    schemas.
+
+    :type settings: dict
+    """
+    schema12 = settings.get('pyramid_swagger.schema12')
+    if schema12:
+        warm_up_swagger_12_schema(schema12)
+
+    schema20 = settings.get('pyramid_swagger.schema20')
+    if schema20:
+        warm_up_swagger_20_spec(schema20)
+
+
+def _warm_up_in_background(settings):
+    try:
+        warm_up(settings)
+    except Exception:
+        # Requests build whatever is missing on their own
+        log.exception('pyramid_swagger validator warm-up failed')
+    else:
+        log.debug('pyramid_swagger validator warm-up done')
+
+
+def start_warm_up_thread(event):
+    """:class:`pyramid.events.ApplicationCreated` subscriber starting the
+    warm-up in a daemon thread when `pyramid_swagger.warm_up_validators` is
+    enabled.
+    """
+    settings = event.app.registry.settings
+    if not asbool(settings.get('pyramid_swagger.warm_up_validators', False)):
+        return None
+
+    thread = threading.Thread(
+        target=_warm_up_in_background,
+        args=(settings,),
+        name='pyramid_swagger-warm-up',
+    )
+    thread.daemon = True
+    thread.start()
+    return thread
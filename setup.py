@@ -43,9 +43,23 @@ setup(
     packages=find_packages(exclude=["contrib", "docs", "tests*"]),
     include_package_data=True,
     install_requires=[
-        'bravado-core >= 4.8.4',
+        # dereference_schemas relies on internals of bravado-core, see
+        # pyramid_swagger.ingest.BRAVADO_CORE_SPEC_INTERNALS
+        'bravado-core >= 4.8.4, < 7',
         'jsonschema >= 3.0.0',
         'pyramid',
         'simplejson',
     ],
+    extras_require={
+        'opentelemetry': ['opentelemetry-api'],
+    },
+    entry_points={
+        'console_scripts': [
+            'pyramid-swagger-compile = pyramid_swagger.artifact:main',
+            'pyramid-swagger-validate = pyramid_swagger.bulk:main',
+            'pyramid-swagger-replay = pyramid_swagger.replay:main',
+            'pyramid-swagger-memory = pyramid_swagger.memory:main',
+            'pyramid-swagger-synthetic = pyramid_swagger.synthetic:main',
+        ],
+    },
 )
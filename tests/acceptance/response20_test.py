@@ -69,6 +69,28 @@ def _validate_against_tween(request, response=None, path_pattern='/',
             validation_tween_factory(handler, registry)(request)
 
 
+def validate_array_response(body, **overrides):
+    """
+    Validates a response of `/sample_array_response` with the swagger tween.
+
+    :param body: list, serialized as the JSON body of the response
+    :param overrides: dict of overrides for `pyramid_swagger` config
+    :returns: the validated request
+    """
+    request = EnhancedDummyRequest(method='GET', path='/sample_array_response')
+    response = Response(
+        body=simplejson.dumps(body),
+        headers={'Content-Type': 'application/json; charset=UTF-8'},
+    )
+    _validate_against_tween(
+        request,
+        response=response,
+        path_pattern='/sample_array_response',
+        **overrides
+    )
+    return request
+
+
 def test_response_validation_enabled_by_default():
     request = EnhancedDummyRequest(
         method='GET',
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import pickle
+
+import mock
+import py
+import pytest
+from bravado_core.spec import Spec
+from webtest import TestApp as App
+
+from pyramid_swagger.artifact import compile_artifact
+from pyramid_swagger.artifact import CompiledArtifactError
+from pyramid_swagger.artifact import load_compiled_artifact
+from pyramid_swagger.artifact import main
+from pyramid_swagger.artifact import read_artifact
+from pyramid_swagger.artifact import write_artifact
+from tests.acceptance.app import main as app_main
+
+
+@pytest.fixture
+def settings():
+    return {
+        'pyramid_swagger.schema_directory': 'tests/sample_schemas/relative_ref/',
+        'pyramid_swagger.swagger_versions': ['2.0'],
+    }
+
+
+@pytest.fixture
+def artifact_path(settings, tmpdir):
+    path = str(tmpdir.join('spec.pickle'))
+    write_artifact(compile_artifact(settings), path)
+    settings['pyramid_swagger.compiled_artifact'] = path
+    return path
+
+
+def test_compile_artifact_renders_every_spec_file(settings):
+    artifact = compile_artifact(settings)
+    assert isinstance(artifact.spec, Spec)
+    paths = [path for path, _, _, _ in artifact.api_docs]
+    assert '/swagger.json' in paths
+    assert '/paths/common.yaml' in paths
+
+
+def test_compile_artifact_with_dereferenced_schema(settings):
+    settings['pyramid_swagger.dereference_served_schema'] = True
+    artifact = compile_artifact(settings)
+    assert [path for path, _, _, _ in artifact.api_docs] == \
+        ['/swagger.yaml', '/swagger.json']
+
+
+def test_read_artifact_round_trip(artifact_path):
+    artifact = read_artifact(artifact_path)
+    assert artifact.spec.get_op_for_request(
+        'GET', '/sample/{path_arg}/resource') is not None
+
+
+def test_read_artifact_missing_file(tmpdir):
+    with pytest.raises(CompiledArtifactError):
+        read_artifact(str(tmpdir.join('missing.pickle')))
+
+
+def test_read_artifact_incompatible_version(tmpdir):
+    path = str(tmpdir.join('old.pickle'))
+    with open(path, 'wb') as f:
+        pickle.dump({'format_version': 0}, f)
+    with pytest.raises(CompiledArtifactError):
+        read_artifact(path)
+
+
+def test_load_compiled_artifact_with_different_settings(
+        settings, artifact_path):
+    settings['pyramid_swagger.use_models'] = True
+    with pytest.raises(CompiledArtifactError):
+        load_compiled_artifact(settings)
+
+
+@pytest.mark.parametrize('name, value', [
+    ('pyramid_swagger.schema_file', 'other.json'),
+    ('pyramid_swagger.dereference_schemas', True),
+    ('pyramid_swagger.compact_spec', True),
+])
+def test_load_compiled_artifact_with_different_spec_settings(
+        settings, artifact_path, name, value):
+    settings[name] = value
+    with pytest.raises(CompiledArtifactError) as excinfo:
+        load_compiled_artifact(settings)
+    assert name.split('.')[1] in str(excinfo.value)
+
+
+def test_load_compiled_artifact_with_changed_spec_file(
+        settings, artifact_path, tmpdir):
+    schema_directory = tmpdir.join('schemas')
+    py.path.local(settings['pyramid_swagger.schema_directory']).copy(
+        schema_directory)
+    settings['pyramid_swagger.schema_directory'] = str(schema_directory)
+    write_artifact(compile_artifact(settings), artifact_path)
+    load_compiled_artifact(settings)
+
+    schema_directory.join('paths', 'common.json').write('{}', mode='a')
+    with pytest.raises(CompiledArtifactError) as excinfo:
+        load_compiled_artifact(settings)
+    assert 'spec_files' in str(excinfo.value)
+
+
+def test_load_compiled_artifact_with_other_library_versions(
+        settings, artifact_path):
+    with mock.patch(
+        'pyramid_swagger.artifact.version', return_value='0.0.1',
+    ), pytest.raises(CompiledArtifactError) as excinfo:
+        load_compiled_artifact(settings)
+    assert 'versions' in str(excinfo.value)
+
+
+def test_app_serves_compiled_artifact(settings, artifact_path):
+    test_app = App(app_main({}, **settings))
+    response = test_app.get(
+        '/sample/path_arg1/resource',
+        params={'required_arg': 'test'},
+    )
+    assert response.status_code == 200
+
+    response = test_app.get('/swagger.json')
+    assert response.json['swagger'] == '2.0'
+
+
+def test_main_writes_artifact(tmpdir):
+    path = str(tmpdir.join('spec.pickle'))
+    assert main(['tests/acceptance/app/config.ini', '-o', path]) == 0
+    assert isinstance(read_artifact(path).spec, Spec)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import mock
+import pytest
+from bravado_core.spec import Spec
+from bravado_core.swagger20_validator import get_validator_type
+from jsonschema.exceptions import ValidationError
+
+from pyramid_swagger.budget import budgeted_items
+from pyramid_swagger.budget import check_budget
+from pyramid_swagger.budget import get_budgeted_validator_type
+from pyramid_swagger.budget import get_response_validation_budget
+from pyramid_swagger.budget import validate_object
+from pyramid_swagger.budget import validate_schema_object
+from pyramid_swagger.budget import validation_budget
+from pyramid_swagger.budget import ValidationBudgetExceeded
+from pyramid_swagger.exceptions import ResponseValidationError
+from tests.acceptance.response20_test import validate_array_response
+
+
+SCHEMA = {
+    'type': 'array',
+    'items': {
+        'type': 'object',
+        'properties': {'id': {'type': 'integer'}},
+    },
+}
+
+
+@pytest.fixture
+def spec():
+    return Spec.from_dict({
+        'swagger': '2.0',
+        'info': {'title': 'budget', 'version': '1.0'},
+        'paths': {},
+        'definitions': {'items': SCHEMA},
+    })
+
+
+@pytest.fixture
+def clock():
+    with mock.patch('pyramid_swagger.budget.time.monotonic', return_value=0):
+        yield
+
+
+def test_check_budget(clock):
+    check_budget()
+    with validation_budget(1):
+        check_budget()
+        with validation_budget(None):
+            check_budget()
+        with mock.patch('pyramid_swagger.budget.time.monotonic', return_value=2):
+            with pytest.raises(ValidationBudgetExceeded):
+                check_budget()
+    with mock.patch('pyramid_swagger.budget.time.monotonic', return_value=2):
+        check_budget()
+
+
+def test_get_response_validation_budget():
+    assert get_response_validation_budget({}) is None
+    assert get_response_validation_budget(
+        {'pyramid_swagger.response_validation_budget_ms': '250'}) == 0.25
+
+
+@pytest.mark.parametrize('validate', [validate_object, validate_schema_object])
+def test_budgeted_validation(spec, validate):
+    schema = spec.spec_dict['definitions']['items']
+    for budget in (None, 3600):
+        with validation_budget(budget):
+            validate(spec, schema, [{'id': 1}] * 10)
+            with pytest.raises(ValidationError) as excinfo:
+                validate(spec, schema, [{'id': 1}, {'id': 'x'}])
+            assert list(excinfo.value.path) == [1, 'id']
+
+    times = iter(range(100))
+    with mock.patch(
+        'pyramid_swagger.budget.time.monotonic', side_effect=lambda: next(times),
+    ):
+        with validation_budget(5):
+            with pytest.raises(ValidationBudgetExceeded):
+                validate(spec, schema, [{'id': 1}] * 10)
+
+
+def test_validator_type_of_the_spec_is_left_alone(spec):
+    validator_type = get_budgeted_validator_type(spec)
+    assert get_budgeted_validator_type(spec) is validator_type
+    assert validator_type.VALIDATORS['items'] is budgeted_items
+    assert get_validator_type(spec).VALIDATORS['items'] is not budgeted_items
+
+
+def test_response_validation_budget():
+    body = [{'enum_value': 'good_enum_value'}] * 10 + [{'enum_value': 'bad'}]
+    with pytest.raises(ResponseValidationError):
+        validate_array_response(
+            body, **{'pyramid_swagger.response_validation_budget_ms': '10000'})
+
+    with mock.patch('pyramid_swagger.budget.time.monotonic', side_effect=range(10 ** 6)):
+        request = validate_array_response(
+            body, **{'pyramid_swagger.response_validation_budget_ms': '2000'})
+    assert request.environ['pyramid_swagger.response_validation_bypassed']
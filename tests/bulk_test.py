@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import json
+
+import pytest
+
+import pyramid_swagger
+from pyramid_swagger.bulk import main
+from pyramid_swagger.bulk import validate_many
+from pyramid_swagger.bulk import ValidationReport
+from pyramid_swagger.ingest import get_swagger_spec
+
+
+RECORDS = [
+    {'method': 'GET', 'path': '/sample/path_arg1/resource?required_arg=a'},
+    {'method': 'GET', 'path': '/sample/path_arg3/resource?required_arg=a'},
+    {'method': 'GET', 'path': '/sample/path_arg1/resource'},
+    {
+        'method': 'POST',
+        'path': '/sample',
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps({'foo': 'a', 'bar': 'b'}),
+    },
+    {
+        'method': 'POST',
+        'path': '/sample',
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps({'bar': 'b'}),
+    },
+    {'method': 'GET', 'path': '/sample/header'},
+    {'method': 'GET', 'path': '/does_not_exist'},
+]
+
+
+@pytest.fixture(scope='module')
+def spec():
+    return get_swagger_spec({
+        'pyramid_swagger.schema_directory': 'tests/sample_schemas/good_app/',
+    })
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_validate_many(spec, processes):
+    results = list(validate_many(spec, RECORDS, processes=processes, chunk_size=2))
+
+    assert [result.index for result in results] == list(range(len(RECORDS)))
+    assert [result.operation_id for result in results] == [
+        'standard', 'standard', 'standard', 'sample_post', 'sample_post',
+        'sample_header', None,
+    ]
+    assert [result.is_valid for result in results] == [
+        True, False, False, True, False, False, False,
+    ]
+    assert "'path_arg3' is not one of" in results[1].error
+    assert 'required_arg' in results[2].error
+    assert results[6].path == '/does_not_exist'
+
+
+def test_validate_many_is_exported():
+    assert pyramid_swagger.validate_many is validate_many
+
+
+def test_validation_report(spec):
+    report = ValidationReport()
+    for result in validate_many(spec, RECORDS, processes=1):
+        report.add(result)
+
+    assert report.requests == {'standard': 3, 'sample_post': 2, 'sample_header': 1}
+    assert report.violations == {'standard': 2, 'sample_post': 1, 'sample_header': 1}
+    assert report.unmatched == 1
+    assert report.total_violations == 4
+    assert report.format().splitlines()[1].split() == ['2', '3', 'standard']
+
+
+def test_main(tmpdir, capsys):
+    records = tmpdir.join('records.jsonl')
+    records.write('\n'.join(json.dumps(record) for record in RECORDS[:3]))
+
+    assert main([
+        'tests/acceptance/app/config.ini', str(records), '--processes', '1',
+    ]) == 1
+
+    out, err = capsys.readouterr()
+    violations = [json.loads(line) for line in out.splitlines()]
+    assert [violation['index'] for violation in violations] == [1, 2]
+    assert '2          3  standard' in err
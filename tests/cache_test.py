@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import mock
+import pytest
+
+from pyramid_swagger.cache import build_request_cache
+from pyramid_swagger.cache import cache_request_data
+from pyramid_swagger.cache import get_request_cache_key
+from pyramid_swagger.cache import RequestDataCache
+from pyramid_swagger.ingest import get_swagger_spec
+from tests.acceptance.request_test import build_test_app
+
+
+@pytest.fixture
+def spec():
+    return get_swagger_spec({
+        'pyramid_swagger.schema_directory': 'tests/sample_schemas/good_app/',
+    })
+
+
+def build_request(query_string='', path=None, headers=None):
+    return mock.Mock(
+        request=mock.Mock(query_string=query_string),
+        path=path or {},
+        headers=headers or {},
+    )
+
+
+def test_build_request_cache_disabled_by_default():
+    assert build_request_cache({}) is None
+    assert build_request_cache({'pyramid_swagger.request_cache_size': '0'}) is None
+    assert build_request_cache(
+        {'pyramid_swagger.request_cache_size': '10'}).maxsize == 10
+
+
+def test_request_data_cache_evicts_least_recently_used():
+    cache = RequestDataCache(maxsize=2)
+    cache.put('a', {'a': 1})
+    cache.put('b', {'b': 1})
+    assert cache.get('a') == {'a': 1}
+    cache.put('c', {'c': 1})
+
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert cache.get('a') == {'a': 1}
+    assert cache.get('c') == {'c': 1}
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_request_data_cache_returns_copies():
+    cache = RequestDataCache(maxsize=1)
+    request_data = {'tags': ['a']}
+    cache.put('key', request_data)
+    request_data['tags'].append('b')
+    cache.get('key')['tags'].append('c')
+    assert cache.get('key') == {'tags': ['a']}
+
+
+def test_get_request_cache_key(spec):
+    op = spec.get_op_for_request('GET', '/sample/{path_arg}/resource')
+    request = build_request('required_arg=a', {'path_arg': 'path_arg1'})
+    assert get_request_cache_key(request, op) == (
+        op, 'required_arg=a', (('path_arg', 'path_arg1'),), ())
+
+
+def test_get_request_cache_key_with_headers(spec):
+    op = spec.get_op_for_request('GET', '/sample/header')
+    key = get_request_cache_key(build_request(headers={'X-Force': 'true'}), op)
+    assert key[-1] == ('true',)
+    assert key != get_request_cache_key(
+        build_request(headers={'X-Force': 'false'}), op)
+
+
+def test_get_request_cache_key_with_api_key_header(spec):
+    op = spec.get_op_for_request('GET', '/sample/authentication')
+    key = get_request_cache_key(build_request(headers={'X-Auth-Token': 'a'}), op)
+    assert key[-1] == ('a',)
+
+
+def test_get_request_cache_key_with_body_is_none(spec):
+    op = spec.get_op_for_request('POST', '/sample')
+    assert get_request_cache_key(build_request(), op) is None
+
+
+def test_cache_request_data_does_not_cache_errors(spec):
+    op = spec.get_op_for_request('GET', '/sample/{path_arg}/resource')
+    handle_request = mock.Mock(side_effect=[ValueError, {'required_arg': 'a'}])
+    cache = RequestDataCache(maxsize=1)
+    cached_handle_request = cache_request_data(handle_request, cache)
+    request = build_request('required_arg=a')
+
+    with pytest.raises(ValueError):
+        cached_handle_request(request, op)
+    assert len(cache) == 0
+    assert cached_handle_request(request, op) == {'required_arg': 'a'}
+    assert cached_handle_request(request, op) == {'required_arg': 'a'}
+    assert handle_request.call_count == 2
+
+
+def test_request_data_is_cached():
+    test_app = build_test_app(
+        swagger_versions=['2.0'],
+        **{'pyramid_swagger.request_cache_size': '10'}
+    )
+    cache = test_app.app.registry.settings['pyramid_swagger.request_cache']
+
+    for _ in range(3):
+        test_app.get('/sample/path_arg1/resource?required_arg=a')
+    test_app.get('/sample/path_arg2/resource?required_arg=a')
+    test_app.get('/sample/path_arg3/resource?required_arg=a', status=400)
+
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (2, 3)
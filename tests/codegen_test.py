@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+"""
+Conformance of the compiled schemas with the interpreted validators: a value
+accepted by a compiled schema must be valid for jsonschema and bravado-core.
+"""
+from __future__ import absolute_import
+
+import mock
+import pytest
+import simplejson
+from bravado_core import param as bravado_param
+from bravado_core.validate import validate_object
+from jsonschema import RefResolver
+from pyramid.response import Response
+from six import iteritems
+from six import itervalues
+
+from pyramid_swagger.codegen import _swagger_20_compiled_schemas
+from pyramid_swagger.codegen import compile_schema
+from pyramid_swagger.codegen import compile_swagger_20_spec
+from pyramid_swagger.codegen import get_swagger_20_compiled_schema
+from pyramid_swagger.codegen import get_validation_backend
+from pyramid_swagger.codegen import is_valid
+from pyramid_swagger.exceptions import ResponseValidationError
+from pyramid_swagger.ingest import get_swagger_spec
+from pyramid_swagger.load_schema import build_param_schema
+from pyramid_swagger.load_schema import get_body_validator
+from pyramid_swagger.load_schema import SchemaValidator
+from pyramid_swagger.load_schema import Swagger12ParamValidator
+from tests.acceptance.request_test import build_test_app
+from tests.acceptance.response_test import EnhancedDummyRequest
+from tests.acceptance.response20_test import _validate_against_tween
+
+
+SAMPLE_SPECS = [
+    ('tests/sample_schemas/good_app/', 'swagger.json'),
+    ('tests/sample_schemas/relative_ref/', 'swagger.json'),
+    ('tests/sample_schemas/yaml_app/', 'swagger.yaml'),
+    ('tests/sample_schemas/nested_defns/', 'swagger.yaml'),
+    ('tests/sample_schemas/recursive_app/internal/', 'swagger.json'),
+    ('tests/sample_schemas/recursive_app/external/', 'swagger.json'),
+]
+
+WRONG_VALUES = [None, 'x', '', 0, 1, 1.5, -1, True, False, [], {}, ['x'], {'x': 1}]
+
+
+def sample_value(spec, schema, depth=0):
+    """A value which is likely valid for `schema`."""
+    schema = spec.deref(schema)
+    if depth > 4 or not isinstance(schema, dict):
+        return None
+    if 'enum' in schema:
+        return schema['enum'][0]
+    if 'allOf' in schema:
+        value = {}
+        for part in schema['allOf']:
+            value.update(sample_value(spec, part, depth + 1) or {})
+        return value
+
+    schema_type = schema.get('type', 'object')
+    if schema_type == 'object':
+        return dict(
+            (name, sample_value(spec, subschema, depth + 1))
+            for name, subschema in iteritems(schema.get('properties', {}))
+        )
+    if schema_type == 'array':
+        return [sample_value(spec, schema.get('items', {}), depth + 1)]
+    if schema_type == 'string':
+        return {
+            'date': '2019-01-01',
+            'date-time': '2019-01-01T00:00:00Z',
+        }.get(schema.get('format'), 'value')
+    return {'integer': 1, 'number': 1.5, 'boolean': True}.get(schema_type)
+
+
+def candidate_values(spec, schema):
+    valid = sample_value(spec, schema)
+    candidates = [valid, [valid]] + WRONG_VALUES
+    if isinstance(valid, dict):
+        candidates.append(dict(valid, unexpected_property=1))
+        for name in valid:
+            candidates.append(dict((k, v) for k, v in iteritems(valid) if k != name))
+            for wrong_value in WRONG_VALUES:
+                candidates.append(dict(valid, **{name: wrong_value}))
+    if isinstance(valid, list):
+        candidates.extend([valid + valid, [valid[0], None], []])
+        candidates.extend([[wrong_value] for wrong_value in WRONG_VALUES])
+    return valid, candidates
+
+
+def is_valid_for_bravado(spec, schema, value):
+    # validate_object validates primitives and arrays the same way
+    try:
+        validate_object(spec, schema, value)
+    except Exception:
+        return False
+    return True
+
+
+def iter_spec_schemas(spec):
+    for definition in itervalues(spec.spec_dict.get('definitions', {})):
+        yield definition
+    for resource in itervalues(spec.resources):
+        for op in itervalues(resource.operations):
+            for response in itervalues(op.op_spec.get('responses', {})):
+                schema = spec.deref(response).get('schema')
+                if schema is not None:
+                    yield spec.deref(schema)
+            for param in itervalues(op.params):
+                if param.location == 'body':
+                    yield spec.deref(param.param_spec['schema'])
+
+
+@pytest.mark.parametrize('schema_directory, schema_file', SAMPLE_SPECS)
+def test_compiled_schemas_conform_to_bravado(schema_directory, schema_file):
+    spec = get_swagger_spec({
+        'pyramid_swagger.schema_directory': schema_directory,
+        'pyramid_swagger.schema_file': schema_file,
+    })
+
+    compiled_count = 0
+    for schema in iter_spec_schemas(spec):
+        check = get_swagger_20_compiled_schema(spec, schema)
+        if check is None:
+            continue
+        compiled_count += 1
+
+        valid, candidates = candidate_values(spec, schema)
+        if is_valid_for_bravado(spec, schema, valid):
+            assert is_valid(check, valid), schema
+        for value in candidates:
+            if is_valid(check, value):
+                assert is_valid_for_bravado(spec, schema, value), (schema, value)
+
+    assert compiled_count > 0
+
+
+@pytest.mark.parametrize('schema, values', [
+    (
+        {'type': 'object', 'required': ['a'], 'additionalProperties': False,
+         'properties': {'a': {'type': 'integer', 'minimum': 1, 'exclusiveMinimum': True},
+                        'b': {'type': 'string', 'pattern': '^x+$', 'maxLength': 3}}},
+        [{'a': 2}, {'a': 1}, {'a': 2.0}, {'a': True}, {'a': 2, 'b': 'xx'},
+         {'a': 2, 'b': 'xxxx'}, {'a': 2, 'b': 'y'}, {'a': 2, 'c': 1}, {}, []],
+    ),
+    (
+        {'type': 'array', 'items': {'enum': [1, 'a', None]}, 'uniqueItems': True,
+         'minItems': 1},
+        [[1], [1.0], [True], ['a', 'a'], ['a', None], [], [[1]], {}],
+    ),
+    (
+        {'anyOf': [{'type': 'string'}, {'type': 'integer'}],
+         'patternProperties': {'^x': {'type': 'integer'}}},
+        ['a', 1, 1.5, {'x1': 1}, {'x1': 'a'}, None],
+    ),
+    (
+        {'type': ['string', 'null'], 'format': 'date'},
+        ['2019-01-01', 'not a date', None, 1],
+    ),
+])
+def test_compiled_keywords_conform_to_jsonschema(schema, values):
+    from jsonschema import Draft4Validator
+    from jsonschema import FormatChecker
+
+    validator = Draft4Validator(schema, format_checker=FormatChecker())
+    check = compile_schema(schema, validator, RefResolver('', schema))
+    assert check is not None
+    assert is_valid(check, values[0])
+    for value in values:
+        # Compiled schemas may reject valid values, which are then validated
+        # by jsonschema, but never accept invalid ones
+        if is_valid(check, value):
+            assert validator.is_valid(value), value
+
+
+def test_unsupported_keyword_is_not_compiled():
+    from jsonschema import Draft4Validator
+
+    schema = {'oneOf': [{'type': 'string'}, {'type': 'integer'}]}
+    assert compile_schema(
+        schema, Draft4Validator(schema), RefResolver('', schema)) is None
+
+
+def test_recursive_schema_is_compiled():
+    from jsonschema import Draft4Validator
+
+    schema = {
+        'type': 'object',
+        'properties': {'child': {'$ref': '#'}, 'name': {'type': 'string'}},
+    }
+    check = compile_schema(schema, Draft4Validator(schema), RefResolver('', schema))
+    assert check({'name': 'a', 'child': {'name': 'b', 'child': {}}})
+    assert not check({'name': 'a', 'child': {'name': 1}})
+
+
+def test_swagger_12_schema_validator_conforms():
+    with open('tests/sample_schemas/good_app/sample.json') as f:
+        api_declaration = simplejson.load(f)
+    models = api_declaration.get('models', {})
+    resolver = RefResolver('', '', models)
+
+    compiled_count = 0
+    for api in api_declaration['apis']:
+        for operation in api['operations']:
+            for param_type in ('query', 'path', 'header'):
+                schema = build_param_schema(operation, param_type)
+                if not schema:
+                    continue
+                interpreted = SchemaValidator.from_schema(
+                    schema, resolver, Swagger12ParamValidator)
+                compiled = SchemaValidator.from_schema(
+                    schema, resolver, Swagger12ParamValidator, compiled=True)
+                compiled_count += compiled.check is not None
+
+                valid = dict((name, 'value') for name in schema['properties'])
+                for value in [valid, {}] + [
+                    dict(valid, **{name: wrong})
+                    for name in valid for wrong in WRONG_VALUES
+                ]:
+                    try:
+                        interpreted.validate(value)
+                    except Exception as e:
+                        with pytest.raises(type(e)) as excinfo:
+                            compiled.validate(value)
+                        assert str(excinfo.value) == str(e)
+                    else:
+                        compiled.validate(value)
+
+            body = [p for p in operation['parameters'] if p['paramType'] == 'body']
+            if body:
+                assert SchemaValidator.from_schema(
+                    body[0], resolver, get_body_validator(models),
+                    compiled=True).check is not None
+
+    assert compiled_count > 0
+
+
+def test_get_validation_backend():
+    assert get_validation_backend({}) == 'interpreted'
+    assert get_validation_backend(
+        {'pyramid_swagger.validation_backend': 'compiled'}) == 'compiled'
+    with pytest.raises(ValueError):
+        get_validation_backend({'pyramid_swagger.validation_backend': 'jit'})
+
+
+@pytest.mark.parametrize('body', [
+    {'raw_response': 'foo'},
+    {'raw_response': 1, 'logging_info': {}},
+    {'raw_response': 'foo', 'logging_info': {}, 'extra': 1},
+    [],
+])
+def test_compiled_backend_raises_same_response_errors(body):
+    errors = []
+    for backend in ('interpreted', 'compiled'):
+        request = EnhancedDummyRequest(
+            method='GET',
+            path='/sample/path_arg1/resource',
+            params={'required_arg': 'test'},
+            matchdict={'path_arg': 'path_arg1'},
+        )
+        response = Response(
+            body=simplejson.dumps(body),
+            headers={'Content-Type': 'application/json; charset=UTF-8'},
+        )
+        with pytest.raises(ResponseValidationError) as excinfo:
+            _validate_against_tween(
+                request,
+                response=response,
+                path_pattern='/sample/{path_arg}/resource',
+                **{'pyramid_swagger.validation_backend': backend}
+            )
+        errors.append(str(excinfo.value))
+    assert errors[0] == errors[1]
+
+
+def test_compiled_backend_accepts_valid_response():
+    request = EnhancedDummyRequest(
+        method='GET',
+        path='/sample/path_arg1/resource',
+        params={'required_arg': 'test'},
+        matchdict={'path_arg': 'path_arg1'},
+    )
+    response = Response(
+        body=simplejson.dumps({'raw_response': 'foo', 'logging_info': {}}),
+        headers={'Content-Type': 'application/json; charset=UTF-8'},
+    )
+    _validate_against_tween(
+        request,
+        response=response,
+        path_pattern='/sample/{path_arg}/resource',
+        **{'pyramid_swagger.validation_backend': 'compiled'}
+    )
+
+
+def test_compiled_schema_is_not_reused_for_another_schema_with_same_id():
+    spec = get_swagger_spec({
+        'pyramid_swagger.schema_directory': 'tests/sample_schemas/good_app/',
+    })
+    schema = {'type': 'string'}
+    _swagger_20_compiled_schemas[spec] = {id(schema): ({'type': 'integer'}, None)}
+    check = get_swagger_20_compiled_schema(spec, schema)
+    assert check is not None
+    assert is_valid(check, 'x')
+    assert not is_valid(check, 1)
+
+
+def test_compile_swagger_20_spec_compiles_body_parameters():
+    spec = get_swagger_spec({
+        'pyramid_swagger.schema_directory': 'tests/sample_schemas/good_app/',
+    })
+    compile_swagger_20_spec(spec)
+    op = spec.resources['echo_date'].operations['echo_date']
+    body_spec = spec.deref(op.params['body'].param_spec['schema'])
+    assert id(body_spec) in _swagger_20_compiled_schemas[spec]
+
+
+def _build_app(backend):
+    return build_test_app(
+        swagger_versions=['2.0'],
+        **{'pyramid_swagger.validation_backend': backend}
+    )
+
+
+def test_compiled_backend_skips_bravado_validation_of_valid_request_body():
+    test_app = _build_app('compiled')
+    body = {'date': '2018-01-02'}
+    with mock.patch.object(
+        bravado_param, 'validate_schema_object',
+        wraps=bravado_param.validate_schema_object,
+    ) as mock_validate:
+        assert test_app.post_json('/echo_date', body).json == body
+    assert not mock_validate.called
+
+
+@pytest.mark.parametrize('body', [
+    {'date': 1},
+    {'date': 'not a date'},
+    [],
+])
+def test_compiled_backend_raises_same_request_errors(body):
+    errors = []
+    for backend in ('interpreted', 'compiled'):
+        response = _build_app(backend).post_json(
+            '/echo_date', body, expect_errors=True)
+        assert response.status_code == 400
+        errors.append(response.text)
+    assert errors[0] == errors[1]
+
+
+def test_compiled_backend_accepts_missing_optional_body():
+    test_app = _build_app('compiled')
+    assert test_app.post('/post_endpoint_with_optional_body').json == 0
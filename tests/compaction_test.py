@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+from webtest import TestApp as App
+
+from pyramid_swagger.compaction import compact
+from pyramid_swagger.compaction import Compactor
+from pyramid_swagger.compaction import trace_memory
+from pyramid_swagger.ingest import get_swagger_spec
+from tests.acceptance.app import main
+
+
+def test_compactor_shares_identical_sub_schemas():
+    error = {'type': 'object', 'properties': {'message': {'type': 'string'}}}
+    spec = {
+        'a': {'schema': dict(error), 'x-scope': ['file:///a.json']},
+        'b': {'schema': dict(error), 'x-scope': ['file:///a.json']},
+    }
+    Compactor().compact(spec)
+    assert spec['a'] is spec['b']
+
+
+def test_compactor_keeps_structure_and_types():
+    spec = {
+        'a': {'enum': [1, True, 1.0, '1', None], 'required': True},
+        'b': {'enum': [True, 1, 1.0, '1', None], 'required': 1},
+    }
+    expected = {
+        'a': {'enum': [1, True, 1.0, '1', None], 'required': True},
+        'b': {'enum': [True, 1, 1.0, '1', None], 'required': 1},
+    }
+    Compactor().compact(spec)
+    assert spec == expected
+    assert spec['a'] is not spec['b']
+    assert [type(v) for v in spec['b']['enum']] == [bool, int, float, str, type(None)]
+    assert type(spec['b']['required']) is int
+
+
+def test_compactor_keeps_key_order():
+    spec = {'a': {'x': 1, 'y': 2}, 'b': {'y': 2, 'x': 1}}
+    Compactor().compact(spec)
+    assert list(spec['a']) == ['x', 'y']
+    assert list(spec['b']) == ['y', 'x']
+
+
+def test_compactor_interns_strings():
+    first = {''.join(['descr', 'iption']): ''.join(['a ', 'value'])}
+    second = {''.join(['descr', 'iption']): ''.join(['a ', 'value'])}
+    spec = [first, {'other': second}]
+    compactor = Compactor()
+    compactor.compact(spec)
+    assert list(spec[0])[0] is list(spec[1]['other'])[0]
+    assert compactor.strings_interned == 2
+
+
+def test_compactor_handles_cycles():
+    spec = {'a': {}}
+    spec['a']['self'] = spec['a']
+    Compactor().compact(spec)
+    assert spec['a']['self'] is spec['a']
+
+
+def test_compact_reports_bytes_saved():
+    with trace_memory():
+        spec = [
+            {'type': 'string', 'description': ''.join(['x'] * 100)}
+            for _ in range(10)
+        ]
+        stats = compact([spec])
+    assert stats.containers_shared == 9
+    assert stats.bytes_saved > 0
+    assert stats.bytes_after == stats.bytes_before - stats.bytes_saved
+
+
+def test_compact_without_traced_memory_reports_no_bytes():
+    stats = compact([[{'type': 'string'}, {'type': 'string'}]])
+    assert stats.containers_shared == 1
+    assert stats.bytes_saved is None
+
+
+def test_compact_replaces_references_of_holders():
+    class Holder(object):
+        pass
+    Holder.__module__ = 'pyramid_swagger.test'
+
+    spec = {'a': {'type': 'string'}, 'b': {'type': 'string'}}
+    holder = Holder()
+    holder.schema = spec['b']
+    holder.schemas = {'b': spec['b']}
+    compact([spec], holders=[holder])
+    assert spec['a'] is spec['b']
+    assert holder.schema is spec['a']
+    assert holder.schemas['b'] is spec['a']
+
+
+def test_get_swagger_spec_compacts_spec():
+    settings = {
+        'pyramid_swagger.schema_directory': 'tests/sample_schemas/good_app/',
+        'pyramid_swagger.compact_spec': 'true',
+    }
+    reference = get_swagger_spec(
+        {'pyramid_swagger.schema_directory': 'tests/sample_schemas/good_app/'})
+    spec = get_swagger_spec(settings)
+
+    assert spec.spec_dict == reference.spec_dict
+    assert settings['pyramid_swagger.schema20_compaction'].bytes_saved > 0
+
+
+def test_get_swagger_spec_compacts_the_schemas_of_operations_and_models():
+    spec = get_swagger_spec({
+        'pyramid_swagger.schema_directory': 'tests/sample_schemas/good_app/',
+        'pyramid_swagger.compact_spec': 'true',
+    })
+    compacted = set()
+    stack = [spec.spec_dict]
+    while stack:
+        obj = stack.pop()
+        if id(obj) not in compacted and isinstance(obj, (dict, list)):
+            compacted.add(id(obj))
+            stack.extend(obj.values() if isinstance(obj, dict) else obj)
+
+    schemas = [model._model_spec for model in spec.definitions.values()]
+    for resource in spec.resources.values():
+        for op in resource.operations.values():
+            schemas.append(op.op_spec)
+            schemas.extend(
+                param.param_spec for param in op.params.values()
+                # Built by bravado-core from the security definitions
+                if param not in op.security_parameters
+            )
+    assert all(id(schema) in compacted for schema in schemas)
+
+
+def test_app_with_compacted_spec():
+    test_app = App(main({}, **{
+        'pyramid_swagger.schema_directory': 'tests/sample_schemas/good_app/',
+        'pyramid_swagger.compact_spec': 'true',
+    }))
+    response = test_app.get(
+        '/sample/path_arg1/resource',
+        params={'required_arg': 'test'},
+    )
+    assert response.status_code == 200
+    response = test_app.get(
+        '/sample/path_arg1/resource',
+        params={},
+        expect_errors=True,
+    )
+    assert response.status_code == 400
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import datetime
+import decimal
+import json
+
+import pytest
+from bravado_core.exception import SwaggerMappingError
+from bravado_core.marshal import marshal_schema_object
+from bravado_core.spec import Spec
+
+from pyramid_swagger.encoding import encode_value
+from pyramid_swagger.encoding import get_schema_encoder
+from pyramid_swagger.encoding import Unsupported
+from tests.acceptance.request_test import build_test_app
+
+
+SPEC_DICT = {
+    'swagger': '2.0',
+    'info': {'title': 'encoding', 'version': '1.0'},
+    'paths': {},
+    'definitions': {
+        'pet': {
+            'type': 'object',
+            'required': ['name'],
+            'properties': {
+                'name': {'type': 'string'},
+                'birthday': {'type': 'string', 'format': 'date'},
+                'weight': {'type': 'number'},
+                'tags': {'type': 'array', 'items': {'type': 'string'}},
+                'owner': {'type': 'string', 'x-nullable': True},
+                'kind': {'type': 'string', 'default': 'dog'},
+                'parent': {'$ref': '#/definitions/pet'},
+                'extra': {},
+            },
+            'additionalProperties': {'type': 'string', 'format': 'date'},
+        },
+        'animal': {
+            'type': 'object',
+            'discriminator': 'kind',
+            'required': ['kind'],
+            'properties': {'kind': {'type': 'string'}},
+        },
+    },
+}
+
+
+@pytest.fixture
+def spec():
+    return Spec.from_dict(SPEC_DICT, config={'use_models': False})
+
+
+def assert_same_as_two_steps(spec, schema, value):
+    expected = json.dumps(marshal_schema_object(spec, schema, value))
+    assert get_schema_encoder(spec, schema)(value, None) == expected
+
+
+@pytest.mark.parametrize('value', [
+    u'caf\xe9 "quoted"', None, True, False, 0, -12, 1.5, float('nan'),
+    [1, u'a'], {'a': [None]},
+])
+def test_encode_value_is_json_dumps(value):
+    assert encode_value(value, None) == json.dumps(value)
+
+
+def test_encode_value_uses_default():
+    assert encode_value(decimal.Decimal('1.5'), str) == '"1.5"'
+
+
+@pytest.mark.parametrize('value', [
+    {'name': u'r\xe9x'},
+    {'name': 'rex', 'birthday': datetime.date(2020, 1, 2), 'weight': 3.25},
+    {'name': 'rex', 'tags': ['a', 'b'], 'owner': None, 'kind': None},
+    {'name': 'rex', 'birthday': None, 'weight': None, 'tags': None},
+    {'name': 'rex', 'extra': {'any': [1, None]}},
+    {'name': 'rex', 'adopted': datetime.date(2021, 3, 4)},
+    {
+        'name': 'rex',
+        'parent': {'name': 'max', 'parent': {'name': 'old', 'owner': 'bob'}},
+    },
+])
+def test_encoder_matches_marshal_then_dumps(spec, value):
+    assert_same_as_two_steps(spec, spec.spec_dict['definitions']['pet'], value)
+
+
+def test_array_encoder_matches_marshal_then_dumps(spec):
+    schema = {
+        'type': 'array',
+        'items': {'type': 'string', 'format': 'date'},
+    }
+    assert_same_as_two_steps(
+        spec, schema, [datetime.date(2020, 1, 2), datetime.date(2021, 3, 4)])
+
+
+def test_encoder_is_cached_per_schema(spec):
+    schema = spec.spec_dict['definitions']['pet']
+    assert get_schema_encoder(spec, schema) is get_schema_encoder(spec, schema)
+
+
+def test_missing_required_value_raises(spec):
+    encoder = get_schema_encoder(spec, spec.spec_dict['definitions']['pet'])
+    with pytest.raises(SwaggerMappingError):
+        encoder({'name': None}, None)
+
+
+def test_value_of_the_wrong_type_raises(spec):
+    encoder = get_schema_encoder(spec, spec.spec_dict['definitions']['pet'])
+    with pytest.raises(SwaggerMappingError):
+        encoder(['rex'], None)
+
+
+def test_polymorphic_schema_is_unsupported(spec):
+    schema = spec.spec_dict['definitions']['animal']
+    for _ in range(2):
+        with pytest.raises(Unsupported):
+            get_schema_encoder(spec, schema)
+
+
+def test_keys_which_are_not_strings_are_unsupported(spec):
+    encoder = get_schema_encoder(spec, {'type': 'object'})
+    with pytest.raises(Unsupported):
+        encoder({1: 'one'}, None)
+
+
+def test_fused_renderer_renders_as_the_two_step_renderer():
+    today = datetime.date.today()
+    responses = [
+        build_test_app(
+            swagger_versions=['2.0'],
+            **{'pyramid_swagger.fused_renderer': fused}
+        ).post_json('/echo_date', {'date': today.isoformat()})
+        for fused in (False, True)
+    ]
+    assert responses[0].body == responses[1].body
+    assert responses[0].content_type == responses[1].content_type
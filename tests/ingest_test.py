@@ -6,12 +6,17 @@ import os.path
 import mock
 import pytest
 import simplejson
+from bravado_core.spec import Spec
+from bravado_core.validate import validate_schema_object
+from jsonschema.exceptions import ValidationError
 
 from pyramid_swagger.ingest import _load_resource_listing
 from pyramid_swagger.ingest import API_DOCS_FILENAME
 from pyramid_swagger.ingest import ApiDeclarationNotFoundError
 from pyramid_swagger.ingest import BRAVADO_CORE_CONFIG_PREFIX
+from pyramid_swagger.ingest import BRAVADO_CORE_SPEC_INTERNALS
 from pyramid_swagger.ingest import create_bravado_core_config
+from pyramid_swagger.ingest import dereference_spec
 from pyramid_swagger.ingest import generate_resource_listing
 from pyramid_swagger.ingest import get_resource_listing
 from pyramid_swagger.ingest import get_swagger_schema
@@ -19,6 +24,8 @@ from pyramid_swagger.ingest import get_swagger_spec
 from pyramid_swagger.ingest import ingest_resources
 from pyramid_swagger.ingest import ResourceListingGenerationError
 from pyramid_swagger.ingest import ResourceListingNotFoundError
+from pyramid_swagger.ingest import SpecFileLoader
+from pyramid_swagger.ingest import UnsupportedBravadoCoreError
 from pyramid_swagger.tween import SwaggerFormat
 
 
@@ -39,18 +46,19 @@ def test_proper_error_on_missing_api_declaration():
     assert 'fake/sample_resource.json' in str(exc.value)
 
 
-@mock.patch('pyramid_swagger.ingest.build_http_handlers',
-            return_value={'file': mock.Mock()})
+@mock.patch('pyramid_swagger.ingest.SpecFileLoader')
 @mock.patch('os.path.abspath', return_value='/bar/foo/swagger.json')
-@mock.patch('pyramid_swagger.ingest.Spec.from_dict')
+@mock.patch('pyramid_swagger.ingest.PyramidSwaggerSpec')
 def test_get_swagger_spec_passes_absolute_url(
-    mock_spec, mock_abs, mock_http_handlers,
+    mock_spec, mock_abs, mock_file_loader,
 ):
     get_swagger_spec({'pyramid_swagger.schema_directory': 'foo/'})
     mock_abs.assert_called_once_with('foo/swagger.json')
     expected_url = "file:///bar/foo/swagger.json"
+    mock_file_loader.return_value.assert_called_once_with(expected_url)
     mock_spec.assert_called_once_with(mock.ANY, config=mock.ANY,
                                       origin_url=expected_url)
+    mock_spec.return_value.build.assert_called_once_with()
 
 
 @pytest.mark.skip(reason="Deprecated swagger 1.2 tests are broken. Skip instead of fixing.")
@@ -174,3 +182,115 @@ def test_create_bravado_core_config_with_passthrough_configs(bravado_core_format
     bravado_core_config = create_bravado_core_config(pyramid_swagger_config)
 
     assert bravado_core_configs == bravado_core_config
+
+
+@pytest.fixture
+def yaml_spec_path(tmpdir):
+    path = tmpdir.join('swagger.yaml')
+    path.write('swagger: "2.0"\npaths: {}\n')
+    return str(path)
+
+
+def test_spec_file_loader_without_cache(yaml_spec_path):
+    loader = SpecFileLoader()
+    assert loader('file://' + yaml_spec_path) == {'swagger': '2.0', 'paths': {}}
+
+
+def test_spec_file_loader_reads_json():
+    loader = SpecFileLoader()
+    spec_dict = loader('file://' + os.path.abspath(
+        'tests/sample_schemas/good_app/swagger.json'))
+    assert spec_dict['swagger'] == '2.0'
+
+
+def test_spec_file_loader_caches_yaml_as_json(yaml_spec_path, tmpdir):
+    cache_dir = str(tmpdir.join('cache'))
+    loader = SpecFileLoader(cache_dir=cache_dir)
+    assert loader.load_yaml(yaml_spec_path) == {'swagger': '2.0', 'paths': {}}
+
+    with open(loader.get_cache_path(yaml_spec_path)) as f:
+        assert simplejson.load(f)['spec'] == {'swagger': '2.0', 'paths': {}}
+
+    with mock.patch('pyramid_swagger.ingest.yaml.load') as mock_yaml_load:
+        assert loader.load_yaml(yaml_spec_path) == {'swagger': '2.0', 'paths': {}}
+    assert not mock_yaml_load.called
+
+
+def test_spec_file_loader_reparses_modified_yaml(yaml_spec_path, tmpdir):
+    loader = SpecFileLoader(cache_dir=str(tmpdir.join('cache')))
+    loader.load_yaml(yaml_spec_path)
+
+    with open(yaml_spec_path, 'w') as f:
+        f.write('swagger: "2.0"\npaths: {}\nhost: "localhost"\n')
+
+    assert loader.load_yaml(yaml_spec_path)['host'] == 'localhost'
+
+
+def test_spec_file_loader_does_not_cache_non_json_yaml(tmpdir):
+    path = tmpdir.join('swagger.yaml')
+    path.write('responses:\n  200: {}\n')
+    loader = SpecFileLoader(cache_dir=str(tmpdir.join('cache')))
+
+    assert loader.load_yaml(str(path)) == {'responses': {200: {}}}
+    assert not os.path.exists(loader.get_cache_path(str(path)))
+
+
+def test_get_swagger_spec_with_yaml_cache(tmpdir):
+    cache_dir = str(tmpdir.join('cache'))
+    settings = {
+        'pyramid_swagger.schema_directory': 'tests/sample_schemas/yaml_app/',
+        'pyramid_swagger.schema_file': 'swagger.yaml',
+        'pyramid_swagger.yaml_cache_directory': cache_dir,
+    }
+    spec = get_swagger_spec(settings)
+    # swagger.yaml and the defs.yaml file it refers to
+    assert len(os.listdir(cache_dir)) == 2
+
+    cached_spec = get_swagger_spec(settings)
+    assert cached_spec.spec_dict == spec.spec_dict
+
+
+def test_get_swagger_spec_dereference_schemas():
+    spec = get_swagger_spec({
+        'pyramid_swagger.schema_directory':
+            'tests/sample_schemas/recursive_app/internal/',
+        'pyramid_swagger.dereference_schemas': 'true',
+    })
+    op = spec.get_op_for_request('GET', '/resources/widget/{code}')
+    schema = op.op_spec['responses']['200']['schema']
+    # Recursive models are cyclic
+    assert schema['properties']['children']['items'] is schema
+    # The served spec keeps its references
+    assert spec.spec_dict['paths']['/resources/widget/{code}']['get'][
+        'responses']['200']['schema']['$ref'] == '#/definitions/widget'
+
+    widget = {'name': 'a', 'children': [{'name': 'b', 'children': []}]}
+    with mock.patch.object(
+        spec.resolver, 'resolve', side_effect=AssertionError('resolved'),
+    ):
+        validate_schema_object(spec, schema, widget)
+        widget['children'][0]['name'] = ''
+        with pytest.raises(ValidationError):
+            validate_schema_object(spec, schema, widget)
+
+
+def test_bravado_core_spec_has_the_internals_of_dereference_spec():
+    # Fails when a bravado-core release drops or renames one of them, in
+    # which case dereference_spec and the pin in setup.py need an update
+    spec = Spec.from_dict({
+        'swagger': '2.0',
+        'info': {'title': 'internals', 'version': '1.0'},
+        'paths': {},
+    })
+    missing = [
+        name for name in BRAVADO_CORE_SPEC_INTERNALS
+        if not hasattr(spec, name)
+    ]
+    assert missing == []
+
+
+def test_dereference_spec_with_unsupported_bravado_core():
+    spec = mock.Mock(spec=['resources', 'deref_flattened_spec'])
+    with pytest.raises(UnsupportedBravadoCoreError) as exc:
+        dereference_spec(spec)
+    assert '_internal_spec_dict, _request_to_op_map' in str(exc.value)
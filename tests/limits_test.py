@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import io
+import json
+
+import pytest
+from bravado_core.spec import Spec
+from jsonschema import Draft4Validator
+from pyramid.request import Request
+
+from pyramid_swagger.exceptions import RequestEntityTooLargeError
+from pyramid_swagger.exceptions import RequestValidationError
+from pyramid_swagger.limits import BodyLimits
+from pyramid_swagger.limits import enforce_body_limits
+from pyramid_swagger.limits import get_body_limits
+from pyramid_swagger.limits import get_json_depth
+from pyramid_swagger.limits import get_schema_limits
+from pyramid_swagger.tween import PyramidSwaggerRequest
+from tests.acceptance.request_test import build_test_app
+
+
+TAGS = {
+    'type': 'array', 'maxItems': 3,
+    'items': {'type': 'string', 'maxLength': 5},
+}
+
+BOUNDED = {
+    'type': 'object',
+    'additionalProperties': False,
+    'properties': {
+        'id': {'type': 'integer', 'minimum': -10, 'maximum': 1000},
+        'flag': {'type': 'boolean', 'x-nullable': True},
+        'kind': {'enum': ['a', 'bb', None]},
+        'tags': TAGS,
+    },
+}
+
+
+def build_spec(schema, **op_spec):
+    return Spec.from_dict({
+        'swagger': '2.0',
+        'info': {'title': 'limits', 'version': '1.0'},
+        'paths': {
+            '/body': {
+                'post': dict({
+                    'parameters': [
+                        {'in': 'body', 'name': 'body', 'schema': schema},
+                    ],
+                    'responses': {'200': {'description': 'ok'}},
+                }, **op_spec),
+            },
+        },
+        'definitions': {
+            'node': {
+                'type': 'object',
+                'properties': {'child': {'$ref': '#/definitions/node'}},
+            },
+        },
+    }, config={'validate_swagger_spec': False})
+
+
+@pytest.mark.parametrize('schema, max_depth', [
+    ({'type': 'string'}, 0),
+    ({'type': 'array', 'items': {'type': 'integer'}}, 1),
+    (BOUNDED, 2),
+    ({'type': 'array', 'items': BOUNDED}, 3),
+    ({'type': 'object'}, None),
+    ({'type': 'array'}, None),
+    ({'$ref': '#/definitions/node'}, None),
+    ({'anyOf': [TAGS, {'type': 'string'}]}, 1),
+    ({'allOf': [{'type': 'object'}, BOUNDED]}, 2),
+])
+def test_schema_max_depth(schema, max_depth):
+    spec = build_spec(schema)
+    assert get_schema_limits(spec, schema).max_depth == max_depth
+
+
+@pytest.mark.parametrize('schema, unbounded', [
+    ({'type': 'string'}, True),
+    ({'type': 'number', 'maximum': 1, 'minimum': 0}, True),
+    ({'type': 'integer', 'maximum': 1}, True),
+    ({'enum': [1, 2]}, True),
+    ({'type': 'array', 'items': {'type': 'string', 'maxLength': 1}}, True),
+    ({'type': 'object', 'properties': {}}, True),
+    (TAGS, False),
+    (BOUNDED, False),
+    ({'anyOf': [TAGS, BOUNDED]}, False),
+    ({'anyOf': [TAGS, {'type': 'string'}]}, True),
+    ({'allOf': [{'type': 'string'}, TAGS]}, False),
+])
+def test_schema_max_bytes_bounded(schema, unbounded):
+    spec = build_spec(schema)
+    assert (get_schema_limits(spec, schema).max_bytes is None) == unbounded
+
+
+@pytest.mark.parametrize('value', [
+    {'id': -10, 'flag': None, 'kind': 'bb', 'tags': ['\U0001f600' * 5] * 3},
+    {'id': 1000, 'flag': False, 'kind': None, 'tags': ['"\\\n\x00x'] * 3},
+])
+def test_schema_max_bytes_is_conservative(value):
+    assert Draft4Validator(BOUNDED).is_valid(dict(value, flag=True))
+    max_bytes = get_schema_limits(build_spec(BOUNDED), BOUNDED).max_bytes
+    # Every character escaped, and pretty printed
+    document = json.dumps(value, ensure_ascii=True, indent=8)
+    document = document.replace('"bb"', '"\\u0062\\u0062"')
+    assert len(document.encode('utf-8')) <= max_bytes
+
+
+def test_get_body_limits_uses_vendor_extension():
+    assert get_body_limits(
+        build_spec({'type': 'object'}, **{'x-max-body-bytes': 10}).get_op_for_request(
+            'POST', '/body'),
+    ) == BodyLimits(10, None)
+    spec = build_spec(TAGS, **{'x-max-body-bytes': 10 ** 6})
+    limits = get_body_limits(spec.get_op_for_request('POST', '/body'))
+    assert limits == get_schema_limits(spec, TAGS)
+
+
+@pytest.mark.parametrize('body, depth', [
+    (b'', 0),
+    (b'1', 0),
+    (b'[]', 1),
+    (b'[{"a": [1]}, {}]', 3),
+    (b'{"a": "[[[{{{", "b": "\\"[["}', 1),
+])
+def test_get_json_depth(body, depth):
+    assert get_json_depth(body) == depth
+
+
+def build_request(body, content_length=True):
+    request = Request.blank('/body', method='POST', content_type='application/json')
+    if content_length:
+        request.body = body
+    else:
+        request.body_file_raw = io.BytesIO(body)
+        request.environ['wsgi.input_terminated'] = True
+        request.content_length = None
+    return PyramidSwaggerRequest(request, {'match': {}})
+
+
+@pytest.mark.parametrize('content_length', [True, False])
+def test_enforce_body_limits(content_length):
+    op = build_spec(TAGS, **{'x-max-body-bytes': 20}).get_op_for_request(
+        'POST', '/body')
+
+    request = build_request(b'["a", "b"]', content_length)
+    enforce_body_limits(request, op)
+    assert request.request.json_body == ['a', 'b']
+
+    with pytest.raises(RequestEntityTooLargeError):
+        enforce_body_limits(build_request(b'["a"' + b', "a"' * 10 + b']', content_length), op)
+    with pytest.raises(RequestValidationError):
+        enforce_body_limits(build_request(b'[["a"]]', content_length), op)
+
+
+def test_body_limits_are_enforced_by_the_tween():
+    test_app = build_test_app(
+        swagger_versions=['2.0'],
+        **{'pyramid_swagger.enforce_body_limits': 'true'}
+    )
+    test_app.post_json('/sample', {'foo': 'a'})
+    response = test_app.post_json('/sample', {'foo': {'a': [1]}}, status=400)
+    assert 'nested deeper than the 1 levels allowed' in response.text
@@ -1,8 +1,13 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import
 
+from copy import deepcopy
+
 import mock
 import pytest
+from jsonschema import RefResolver
+from jsonschema.exceptions import ValidationError
+from jsonschema.validators import Draft4Validator
 
 from pyramid_swagger import load_schema
 
@@ -50,3 +55,82 @@ def test_type_validator_calls_draft3_type_validator_when_not_File(mock_type_draf
     schema = {'paramType': 'form', 'type': 'number'}
     list(load_schema.type_validator(None, "number", 99, schema))
     assert mock_type_draft3.call_count == 1
+
+
+@mock.patch('pyramid_swagger.load_schema.ValidatorMap.from_operation')
+def test_lazy_validator_map_is_built_on_first_use(mock_from_operation):
+    operation, models, resolver = mock.Mock(), mock.Mock(), mock.Mock()
+    validator_map = load_schema.LazyValidatorMap(operation, models, resolver)
+    assert not validator_map.is_built
+    assert not mock_from_operation.called
+
+    assert validator_map.query is mock_from_operation.return_value.query
+    assert validator_map.is_built
+    assert validator_map.build() is validator_map.build()
+    mock_from_operation.assert_called_once_with(
+        operation, models, resolver, False, False)
+
+
+RECURSIVE_API_DECLARATION = {
+    'apis': [{
+        'path': '/widget',
+        'operations': [{
+            'method': 'POST',
+            'nickname': 'post_widget',
+            'type': 'widget',
+            'parameters': [
+                {'paramType': 'body', 'name': 'body', 'type': 'widget',
+                 'required': True},
+            ],
+        }],
+    }],
+    'models': {
+        'widget': {
+            'id': 'widget',
+            'type': 'object',
+            'properties': {
+                'name': {'type': 'string', 'minLength': 1},
+                'children': {'type': 'array', 'items': {'$ref': 'widget'}},
+            },
+        },
+    },
+}
+
+
+def test_dereference_models():
+    schema = load_schema.dereference_models(deepcopy(RECURSIVE_API_DECLARATION))
+    widget = schema['models']['widget']
+    assert widget['properties']['children']['items'] is widget
+    body = schema['apis'][0]['operations'][0]['parameters'][0]
+    assert body == {
+        'paramType': 'body', 'name': 'body', 'required': True,
+        'allOf': [widget],
+    }
+
+
+@pytest.mark.parametrize('compiled', [False, True])
+def test_validate_dereferenced_models(compiled):
+    schema = load_schema.dereference_models(deepcopy(RECURSIVE_API_DECLARATION))
+    models = schema['models']
+    operation = schema['apis'][0]['operations'][0]
+    resolver = RefResolver('', '', models)
+    validators = [
+        load_schema.SchemaValidator.from_schema(
+            load_schema.extract_body_schema(operation), resolver,
+            load_schema.get_body_validator(models), compiled=compiled),
+        load_schema.SchemaValidator.from_schema(
+            load_schema.extract_response_body_schema(
+                operation, models, dereferenced=True),
+            resolver, Draft4Validator, compiled=compiled),
+    ]
+
+    widget = {'name': 'a', 'children': [{'name': 'b', 'children': []}]}
+    with mock.patch.object(
+        RefResolver, 'resolve', side_effect=AssertionError('resolved'),
+    ):
+        for validator in validators:
+            validator.validate(widget)
+        widget['children'][0]['name'] = ''
+        for validator in validators:
+            with pytest.raises(ValidationError):
+                validator.validate(widget)
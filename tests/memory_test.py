@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import json
+import sys
+
+from pyramid_swagger.memory import deep_sizeof
+from pyramid_swagger.memory import main
+from pyramid_swagger.memory import measure_includeme
+from pyramid_swagger.replay import replay
+from tests.replay_test import RECORDS
+
+
+SETTINGS = {
+    'pyramid_swagger.schema_directory': 'tests/sample_schemas/good_app/',
+    'pyramid_swagger.enable_stats': 'true',
+}
+
+
+def test_deep_sizeof_counts_shared_objects_once():
+    shared = ['x' * 1000]
+    seen = set()
+    first = deep_sizeof({'a': shared}, seen)
+    second = deep_sizeof({'b': shared}, seen)
+    assert first > 1000
+    assert second < 1000
+
+
+def test_deep_sizeof_ignores_importable_objects():
+    shared = [deep_sizeof, json]
+    assert deep_sizeof(shared, set()) == sys.getsizeof(shared)
+
+
+def test_measure_includeme():
+    report = measure_includeme(SETTINGS)
+
+    components = report['components']
+    assert list(components)[:4] == [
+        'spec_dict', 'client_spec_dict', 'flattened_spec', 'spec',
+    ]
+    assert components['spec_dict'] > 0
+    assert components['spec'] > 0
+    assert components['api_doc_views'] > 0
+    assert components['stats'] > 0
+    assert report['allocated'] > sum(components.values()) // 2
+    assert report['top_files']
+
+
+def test_request_allocations_stay_bounded():
+    # Guards against memory regressions in the validation of small requests
+    summary = replay(
+        {'pyramid_swagger.schema_directory': 'tests/sample_schemas/good_app/'},
+        RECORDS, iterations=0, measure_allocations=True,
+    ).summary()
+    assert summary['requests'] == 0
+    for operation in summary['operations'].values():
+        assert 0 < operation['mean_peak_allocated_bytes'] < 512 * 1024
+
+
+def test_main(tmpdir, capsys):
+    config = tmpdir.join('config.ini')
+    config.write('\n'.join([
+        '[app:main]',
+        'use = call:tests.acceptance.app:main',
+        'pyramid_swagger.schema_directory = tests/sample_schemas/good_app/',
+    ]))
+
+    assert main([
+        str(config),
+        '--schema-directory', 'tests/sample_schemas/good_app/',
+        '--schema-directory', 'tests/sample_schemas/recursive_app/external/',
+        '--json',
+    ]) == 0
+
+    reports = json.loads(capsys.readouterr()[0])
+    assert list(reports) == [
+        'tests/sample_schemas/good_app/',
+        'tests/sample_schemas/recursive_app/external/',
+    ]
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import json
+
+import mock
+import pytest
+from pyramid.request import Request
+from pyramid.response import Response
+
+from pyramid_swagger.exceptions import RequestEntityTooLargeError
+from pyramid_swagger.exceptions import RequestValidationError
+from pyramid_swagger.exceptions import ResponseValidationError
+from pyramid_swagger.offload import build_offload_pool
+from pyramid_swagger.offload import START_METHOD
+from pyramid_swagger.tween import PyramidSwaggerRequest
+from tests.acceptance.request_test import build_test_app
+
+
+def test_build_offload_pool_disabled_by_default():
+    assert build_offload_pool({}, None) is None
+
+
+@pytest.fixture
+def test_app():
+    test_app = build_test_app(
+        swagger_versions=['2.0'],
+        **{
+            'pyramid_swagger.offload_min_size': '20',
+            'pyramid_swagger.offload_processes': '1',
+            'pyramid_swagger.enable_response_validation': True,
+        }
+    )
+    yield test_app
+    test_app.app.registry.settings['pyramid_swagger.offload_pool'].close()
+
+
+def get_pool(test_app):
+    return test_app.app.registry.settings['pyramid_swagger.offload_pool']
+
+
+def test_small_bodies_are_not_offloaded(test_app):
+    test_app.post_json('/sample', {'foo': 'a'})
+    assert get_pool(test_app)._pool is None
+
+
+def test_large_request_is_unmarshalled_in_the_pool(test_app):
+    # The view checks that the date is unmarshalled
+    response = test_app.post_json(
+        '/echo_date', {'date': '2017-04-01', 'name': 'x' * 100})
+
+    assert response.json == {'date': '2017-04-01', 'name': 'x' * 100}
+    assert get_pool(test_app)._pool is not None
+
+
+def test_large_invalid_request_is_rejected_by_the_pool(test_app):
+    response = test_app.post_json(
+        '/sample', {'bar': 'x' * 100}, expect_errors=True)
+
+    assert response.status_code == 400
+    assert "'foo' is a required property" in response.text
+    assert get_pool(test_app)._pool is not None
+
+
+def get_op(test_app, method, path):
+    return get_pool(test_app).swagger_spec.get_op_for_request(method, path)
+
+
+def not_offloaded(*args, **kwargs):
+    pytest.fail('The validation was not offloaded')
+
+
+def test_pool_processes_are_not_forked(test_app):
+    assert get_pool(test_app).pool._ctx.get_start_method() == START_METHOD
+
+
+def test_offloaded_request_error_keeps_its_child(test_app):
+    handle_request = get_pool(test_app).offload_request(not_offloaded)
+    request = Request.blank(
+        '/sample', method='POST', content_type='application/json',
+        body=json.dumps({'bar': 'x' * 100}).encode('utf-8'))
+
+    with pytest.raises(RequestValidationError) as excinfo:
+        handle_request(
+            PyramidSwaggerRequest(request, {'match': {}}),
+            get_op(test_app, 'POST', '/sample'),
+        )
+
+    assert excinfo.value.child.validator == 'required'
+
+
+def test_body_limits_are_checked_before_offloading(test_app):
+    pool = get_pool(test_app)
+    pool.enforce_body_limits = True
+    handle_request = pool.offload_request(not_offloaded)
+    request = Request.blank(
+        '/sample', method='POST', content_type='application/json',
+        body=json.dumps({'foo': 'x' * 100}).encode('utf-8'))
+
+    with mock.patch(
+        'pyramid_swagger.offload.check_body_limits',
+        side_effect=RequestEntityTooLargeError('too large'),
+    ), pytest.raises(RequestEntityTooLargeError):
+        handle_request(
+            PyramidSwaggerRequest(request, {'match': {}}),
+            get_op(test_app, 'POST', '/sample'),
+        )
+    assert pool._pool is None
+
+
+def test_large_response_is_validated_in_the_pool(test_app):
+    handle_response = get_pool(test_app).offload_response(not_offloaded)
+    response = Response(json_body={'date': '2017-04-01', 'name': 'x' * 100})
+
+    handle_response(response, get_op(test_app, 'POST', '/echo_date'))
+
+    assert get_pool(test_app)._pool is not None
+
+
+def test_large_invalid_response_is_rejected_by_the_pool(test_app):
+    handle_response = get_pool(test_app).offload_response(not_offloaded)
+    response = Response(json_body={'name': 'x' * 100})
+
+    with pytest.raises(ResponseValidationError) as excinfo:
+        handle_response(response, get_op(test_app, 'POST', '/echo_date'))
+
+    assert excinfo.value.child.validator == 'required'
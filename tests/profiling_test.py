@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import os.path
+import pstats
+
+from pyramid_swagger.profiling import build_request_profiler
+from pyramid_swagger.profiling import build_startup_profiler
+from pyramid_swagger.profiling import startup_phase
+from pyramid_swagger.profiling import StartupProfiler
+from tests.acceptance.app import main
+from tests.acceptance.request_test import build_test_app
+
+
+def test_startup_phases_nest():
+    profiler = StartupProfiler()
+    with profiler.phase('outer'):
+        with profiler.phase('inner'):
+            pass
+
+    phases = profiler.report()['phases']
+    assert [(p['phase'], p['parent'], p['depth']) for p in phases] == [
+        ('outer', None, 0),
+        ('inner', 'outer', 1),
+    ]
+    assert phases[0]['seconds'] >= phases[1]['seconds']
+
+
+def test_startup_phase_without_profiler_is_noop():
+    with startup_phase({}, 'anything'):
+        pass
+
+
+def test_build_startup_profiler_disabled_by_default():
+    assert build_startup_profiler({}) is None
+    assert build_startup_profiler(
+        {'pyramid_swagger.profile_startup': 'false'}) is None
+
+
+def test_includeme_reports_startup_profile(tmpdir):
+    output = str(tmpdir.join('startup.pstats'))
+    app = main({}, **{
+        'pyramid_swagger.schema_directory': 'tests/sample_schemas/good_app/',
+        'pyramid_swagger.profile_startup': 'true',
+        'pyramid_swagger.profile_startup_output': output,
+    })
+
+    report = app.registry.settings['pyramid_swagger.startup_profile']
+    phases = [p['phase'] for p in report['phases']]
+    assert phases[0] == 'includeme'
+    assert 'Spec.from_dict' in phases
+    assert 'register 2.0 api doc views' in phases
+    assert 'swagger_spec_validator' in report['functions']
+
+    assert os.path.exists(output)
+    pstats.Stats(output)
+
+
+def test_build_request_profiler_disabled_by_default():
+    assert build_request_profiler({}) is None
+    assert build_request_profiler(
+        {'pyramid_swagger.profile_sample_rate': '0'}) is None
+
+
+def test_sampled_requests_are_profiled_per_operation(tmpdir):
+    test_app = build_test_app(
+        swagger_versions=['2.0'],
+        **{
+            'pyramid_swagger.profile_sample_rate': '1',
+            'pyramid_swagger.profile_output_dir': str(tmpdir),
+            'pyramid_swagger.profile_dump_interval': '0',
+        }
+    )
+    test_app.get('/sample/path_arg1/resource', params={'required_arg': 'a'})
+    test_app.post_json('/sample', {'foo': 'a'})
+    test_app.get('/undefined/path', expect_errors=True)
+
+    assert sorted(os.listdir(str(tmpdir))) == [
+        'sample_post.pstats', 'standard.pstats', 'unmatched.pstats',
+    ]
+    stats = pstats.Stats(str(tmpdir.join('standard.pstats')))
+    functions = set(name for _, _, name in stats.stats)
+    assert 'validator_tween' in functions
+    # The view is not profiled
+    assert 'standard' not in functions
+
+
+def test_only_listed_routes_are_profiled(tmpdir):
+    test_app = build_test_app(
+        swagger_versions=['2.0'],
+        **{
+            'pyramid_swagger.profile_sample_rate': '1',
+            'pyramid_swagger.profile_routes': 'sample_post',
+            'pyramid_swagger.profile_output_dir': str(tmpdir),
+            'pyramid_swagger.profile_dump_interval': '0',
+        }
+    )
+    test_app.get('/sample/path_arg1/resource', params={'required_arg': 'a'})
+    test_app.post_json('/sample', {'foo': 'a'})
+
+    assert os.listdir(str(tmpdir)) == ['sample_post.pstats']
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import gzip
+import json
+import os.path
+
+import mock
+import pytest
+from pyramid.request import Request
+from pyramid.response import Response
+
+from pyramid_swagger.bulk import validate_many
+from pyramid_swagger.ingest import get_swagger_spec
+from pyramid_swagger.recorder import build_traffic_recorder
+from pyramid_swagger.recorder import read_traffic
+from pyramid_swagger.recorder import TrafficRecorder
+from tests.acceptance.request_test import build_test_app
+
+
+def test_build_traffic_recorder():
+    assert build_traffic_recorder({}) is None
+    recorder = build_traffic_recorder({
+        'pyramid_swagger.record_traffic_path': '/tmp/traffic.jsonl',
+        'pyramid_swagger.record_traffic_rate': '0.5',
+        'pyramid_swagger.record_traffic_headers': 'Content-Type X-Force',
+    })
+    assert recorder.rate == 0.5
+    assert recorder.headers == ['Content-Type', 'X-Force']
+    assert recorder.max_body_bytes == 1048576
+
+
+@pytest.fixture(params=['traffic.jsonl', 'traffic.jsonl.gz'])
+def traffic_path(request, tmpdir):
+    return str(tmpdir.join(request.param))
+
+
+def test_tween_records_traffic(traffic_path):
+    test_app = build_test_app(
+        swagger_versions=['2.0'],
+        **{
+            'pyramid_swagger.record_traffic_path': traffic_path,
+            'pyramid_swagger.record_traffic_rate': '1',
+        }
+    )
+    test_app.get('/sample/path_arg1/resource', params={'required_arg': 'a'})
+    test_app.post_json(
+        '/sample', {'foo': 'a'}, headers={'Cookie': 'secret=1'})
+    test_app.get('/sample/path_arg3/resource', params={'required_arg': 'a'},
+                 status=400)
+
+    get, post, invalid = read_traffic(traffic_path)
+    assert get['path'] == '/sample/path_arg1/resource?required_arg=a'
+    assert get['route'] == '/sample/{path_arg}/resource'
+    assert get['operation'] == 'standard'
+    assert get['status'] == 200
+    assert json.loads(get['response_body'])['raw_response'] == 'foo'
+
+    assert json.loads(post['body']) == {'foo': 'a'}
+    assert post['headers'] == {'Content-Type': 'application/json'}
+
+    assert invalid['status'] is None
+    assert invalid['operation'] is None
+
+    # The records can be validated offline
+    spec = get_swagger_spec(
+        {'pyramid_swagger.schema_directory': 'tests/sample_schemas/good_app/'})
+    results = validate_many(spec, read_traffic(traffic_path), processes=1)
+    assert [result.is_valid for result in results] == [True, True, False]
+
+
+def test_record_response_leaves_streamed_bodies_alone():
+    def app_iter():
+        yield b'[1, '
+        pytest.fail('The streamed body was read')
+
+    response = Response(app_iter=app_iter(), content_type='application/json')
+    assert TrafficRecorder.record_response(response) == {
+        'status': 200,
+        'response_headers': {'Content-Type': 'application/json'},
+        'response_body': None,
+        'response_streamed': True,
+    }
+
+
+def test_recorder_samples_requests(tmpdir):
+    path = str(tmpdir.join('traffic.jsonl'))
+    recorder = TrafficRecorder(path, rate=0.5, rng=mock.Mock())
+    tween = recorder.wrap(mock.Mock(), route_mapper=mock.Mock())
+
+    recorder.rng.random.return_value = 0.5
+    tween(mock.Mock())
+    assert not os.path.exists(path)
+
+
+def build_body_request(body, **kwargs):
+    request = Request.blank('/sample', method='POST', **kwargs)
+    request.body = body
+    return request
+
+
+def test_record_request_leaves_large_bodies_alone():
+    recorder = TrafficRecorder('traffic.jsonl', max_body_bytes=4)
+    assert recorder.record_request(build_body_request(b'1234'), {})[
+        'body'] == '1234'
+
+    request = build_body_request(b'12345')
+    request.body_file_raw = mock.Mock(read=mock.Mock(
+        side_effect=AssertionError('The body was read')))
+    record = recorder.record_request(request, {})
+    assert record['body'] is None
+    assert record['body_truncated']
+
+
+def test_record_request_leaves_bodies_of_unknown_length_alone():
+    request = build_body_request(b'1234')
+    request.content_length = None
+    request.environ['wsgi.input_terminated'] = True
+    record = TrafficRecorder('traffic.jsonl').record_request(request, {})
+    assert record['body'] is None
+    assert record['body_truncated']
+
+
+def test_recorder_writes_a_single_gzip_stream(tmpdir):
+    path = str(tmpdir.join('traffic-{pid}.jsonl.gz'))
+    recorder = TrafficRecorder(path)
+    with mock.patch('pyramid_swagger.recorder.gzip.open', wraps=gzip.open) \
+            as gzip_open:
+        for index in range(3):
+            recorder.write({'index': index})
+        # Readable while it is recorded
+        recorded_path = path.replace('{pid}', str(os.getpid()))
+        assert [record['index'] for record in read_traffic(recorded_path)] \
+            == [0, 1, 2]
+        recorder.close()
+    assert gzip_open.call_count == 2
+    with open(recorded_path, 'rb') as traffic_file:
+        assert traffic_file.read().count(b'\x1f\x8b\x08') == 1
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import os.path
+import shutil
+
+import mock
+import pytest
+from webtest import TestApp as App
+
+from pyramid_swagger.ingest import get_swagger_spec
+from pyramid_swagger.ingest import SpecFileLoader
+from pyramid_swagger.reload import build_spec_reloader
+from pyramid_swagger.reload import SpecReloader
+from tests.acceptance.app import main
+
+
+@pytest.fixture
+def schema_dir(tmpdir):
+    path = str(tmpdir.join('yaml_app'))
+    shutil.copytree('tests/sample_schemas/yaml_app', path)
+    return path
+
+
+def edit_file(path, old, new):
+    with open(path) as f:
+        content = f.read()
+    with open(path, 'w') as f:
+        f.write(content.replace(old, new))
+    # Make sure the change is noticed on file systems with a coarse mtime
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+
+@pytest.fixture
+def test_app(schema_dir):
+    return App(main({}, **{
+        'pyramid_swagger.schema_directory': schema_dir,
+        'pyramid_swagger.schema_file': 'swagger.yaml',
+        'pyramid_swagger.reload_spec': 'true',
+        'pyramid_swagger.reload_spec_interval': '0',
+    }))
+
+
+def post_body(test_app, body):
+    return test_app.post_json(
+        '/sample/path_arg1/resource', body, expect_errors=True)
+
+
+def test_build_spec_reloader_disabled_by_default():
+    assert build_spec_reloader({}) is None
+
+
+def test_spec_file_loader_changed_files(schema_dir):
+    swagger_path = os.path.join(schema_dir, 'swagger.yaml')
+    loader = SpecFileLoader()
+    loader('file://' + swagger_path)
+    assert loader.changed_files() == []
+
+    edit_file(swagger_path, 'Title was not specified', 'Title')
+    assert loader.changed_files() == [swagger_path]
+
+
+def test_spec_file_loader_memory_cache_parses_unchanged_files_once(schema_dir):
+    swagger_path = os.path.join(schema_dir, 'swagger.yaml')
+    loader = SpecFileLoader(memory_cache=True)
+    spec_dict = loader('file://' + swagger_path)
+
+    with mock.patch('pyramid_swagger.ingest.yaml.load') as mock_yaml_load:
+        assert loader('file://' + swagger_path) == spec_dict
+    assert not mock_yaml_load.called
+
+    edit_file(swagger_path, 'Title was not specified', 'Title')
+    assert loader('file://' + swagger_path)['info']['title'] == 'Title'
+
+
+def test_spec_reloader_checks_at_most_once_per_interval():
+    file_loader = mock.Mock(spec=SpecFileLoader)
+    file_loader.changed_files.return_value = []
+    reloader = SpecReloader({}, file_loader, interval=60)
+
+    assert not reloader.check()
+    assert not reloader.check()
+    assert file_loader.changed_files.call_count == 1
+
+
+@pytest.fixture
+def relative_ref_reloader(tmpdir):
+    path = str(tmpdir.join('relative_ref'))
+    shutil.copytree('tests/sample_schemas/relative_ref', path)
+    settings = {'pyramid_swagger.schema_directory': path}
+    reloader = build_spec_reloader(
+        dict(settings, **{'pyramid_swagger.reload_spec': 'true'}))
+    reloader.interval = 0
+    settings['pyramid_swagger.schema20'] = get_swagger_spec(
+        settings, file_loader=reloader.file_loader)
+    reloader.settings = settings
+    return reloader
+
+
+def test_spec_reloader_forgets_files_no_longer_referenced(
+    relative_ref_reloader,
+):
+    file_loader = relative_ref_reloader.file_loader
+    schema_dir = relative_ref_reloader.settings[
+        'pyramid_swagger.schema_directory']
+    old_path = os.path.join(schema_dir, 'paths', 'common.json')
+    new_path = os.path.join(schema_dir, 'paths', 'renamed.json')
+    assert old_path in file_loader.files
+
+    os.rename(old_path, new_path)
+    edit_file(
+        os.path.join(schema_dir, 'swagger.json'),
+        'paths/common.json', 'paths/renamed.json',
+    )
+    assert relative_ref_reloader.check()
+    assert old_path not in file_loader.files
+    assert new_path in file_loader.files
+    assert file_loader.changed_files() == []
+    assert not relative_ref_reloader.check()
+
+
+def test_spec_reloader_keeps_files_when_reload_fails(relative_ref_reloader):
+    file_loader = relative_ref_reloader.file_loader
+    schema_dir = relative_ref_reloader.settings[
+        'pyramid_swagger.schema_directory']
+    swagger_path = os.path.join(schema_dir, 'swagger.json')
+    files = dict(file_loader.files)
+
+    edit_file(swagger_path, 'paths/common.json', 'paths/missing.json')
+    assert not relative_ref_reloader.check()
+    assert file_loader.files == files
+    assert file_loader.changed_files() == [swagger_path]
+
+
+def test_app_reloads_modified_spec_file(test_app, schema_dir):
+    assert post_body(test_app, {'foo': 'x'}).status_code == 200
+
+    edit_file(
+        os.path.join(schema_dir, 'defs.yaml'),
+        'required:\n      - "foo"',
+        'required:\n      - "foo"\n      - "bar"',
+    )
+    assert post_body(test_app, {'foo': 'x'}).status_code == 400
+    assert post_body(test_app, {'foo': 'x', 'bar': 'y'}).status_code == 200
+
+
+def test_app_keeps_spec_when_reload_fails(test_app, schema_dir):
+    edit_file(
+        os.path.join(schema_dir, 'defs.yaml'),
+        'body_model:',
+        'body_model: [',
+    )
+    assert post_body(test_app, {'foo': 'x'}).status_code == 200
+    assert post_body(test_app, {'bar': 'y'}).status_code == 400
@@ -14,6 +14,7 @@ from pyramid.testing import DummyRequest
 
 from pyramid_swagger import PyramidSwaggerRendererFactory
 from pyramid_swagger import renderer
+from pyramid_swagger.exceptions import ResponseValidationError
 
 
 class TestPyramidSwaggerRendererFactoryUnitTest(object):
@@ -279,3 +280,165 @@ class TestPyramidSwaggerRendererFactoryIntegrationTest(object):
             value=value_to_renderer,
         )
         assert rendered_value == json.dumps(value_to_renderer)
+
+
+STREAMING_SPEC_DICT = {
+    'swagger': '2.0',
+    'info': {'title': 'streaming', 'version': '1.0'},
+    'produces': ['application/json'],
+    'paths': {
+        '/items': {
+            'get': {
+                'operationId': 'get_items',
+                'responses': {
+                    '200': {
+                        'description': 'items',
+                        'schema': {
+                            'type': 'array',
+                            'maxItems': 4,
+                            'items': {
+                                'type': 'object',
+                                'required': ['date'],
+                                'properties': {
+                                    'date': {'type': 'string', 'format': 'date'},
+                                    'count': {'type': 'integer'},
+                                },
+                            },
+                        },
+                    },
+                },
+            },
+        },
+        '/object': {
+            'get': {
+                'responses': {
+                    '200': {
+                        'description': 'object',
+                        'schema': {
+                            'type': 'object',
+                            'properties': {
+                                'date': {'type': 'string', 'format': 'date'},
+                            },
+                        },
+                    },
+                },
+            },
+        },
+    },
+}
+
+TODAY = datetime.date(2020, 1, 2)
+
+
+def build_streaming_app(tmpdir, items, **overrides):
+    from webtest import TestApp
+    from pyramid.config import Configurator
+
+    tmpdir.join('swagger.json').write(json.dumps(STREAMING_SPEC_DICT))
+    settings = dict({
+        'pyramid_swagger.schema_directory': str(tmpdir),
+        'pyramid_swagger.swagger_versions': ['2.0'],
+        'pyramid_swagger.enable_response_validation': True,
+        'pyramid_swagger.stream_chunk_items': 2,
+    }, **overrides)
+    config = Configurator(settings=settings)
+    config.include('pyramid_swagger')
+    config.add_route('items', '/items')
+    config.add_route('object', '/object')
+    config.add_view(
+        lambda request: items, route_name='items',
+        renderer='pyramid_swagger_stream')
+    config.add_view(
+        lambda request: {'date': TODAY}, route_name='object',
+        renderer='pyramid_swagger_stream')
+    return TestApp(config.make_wsgi_app())
+
+
+def expected_body(items):
+    return json.dumps([
+        dict(item, date=item['date'].isoformat()) for item in items
+    ]).encode('utf-8')
+
+
+@pytest.mark.parametrize('count', [0, 1, 2, 3, 4])
+def test_streaming_renderer_renders_as_json_dumps(tmpdir, count):
+    items = [{'date': TODAY, 'count': i} for i in range(count)]
+    response = build_streaming_app(tmpdir, items).get('/items')
+
+    assert response.content_type == 'application/json'
+    assert response.body == expected_body(items)
+
+
+def test_streaming_renderer_streams_chunks(tmpdir):
+    from webob import Request
+
+    items = [{'date': TODAY, 'count': i} for i in range(3)]
+    app = build_streaming_app(tmpdir, items)
+    with mock.patch(
+        'pyramid_swagger.tween.swaggerize_response',
+    ) as swaggerize_response:
+        _, _, app_iter = Request.blank('/items').call_application(app.app)
+
+    assert list(app_iter) == [
+        b'[{"date": "2020-01-02", "count": 0}, {"date": "2020-01-02", "count": 1}',
+        b', {"date": "2020-01-02", "count": 2}]',
+    ]
+    # Streamed bodies are not validated again by the tween
+    assert not swaggerize_response.called
+
+
+def test_streaming_renderer_renders_other_responses(tmpdir):
+    response = build_streaming_app(tmpdir, []).get('/object')
+
+    assert response.json == {'date': TODAY.isoformat()}
+
+
+def test_streaming_renderer_rejects_invalid_first_chunk(tmpdir):
+    app = build_streaming_app(tmpdir, [{'date': TODAY}, {'count': 1}])
+
+    response = app.get('/items', expect_errors=True)
+
+    assert response.status_code == 500
+
+
+@pytest.mark.parametrize('items', [
+    [{'date': TODAY}, {'date': TODAY}, {'count': 1}],
+    [{'date': TODAY}] * 5,
+])
+def test_streaming_renderer_aborts_on_invalid_items(tmpdir, items):
+    app = build_streaming_app(tmpdir, items)
+
+    with pytest.raises(ResponseValidationError):
+        app.get('/items')
+
+
+def test_streaming_renderer_logs_invalid_items(tmpdir):
+    items = [{'date': TODAY}, {'date': TODAY}, {'count': 1}]
+    app = build_streaming_app(
+        tmpdir, items,
+        **{'pyramid_swagger.stream_on_invalid_item': 'log'}
+    )
+
+    with mock.patch.object(renderer, 'log') as log:
+        response = app.get('/items')
+
+    assert response.json == [
+        {'date': TODAY.isoformat()}, {'date': TODAY.isoformat()}, {'count': 1},
+    ]
+    log.warning.assert_called_once_with(
+        '%d validation errors in the streamed response of %s', 1, 'get_items')
+
+
+def test_streaming_renderer_does_not_validate_when_disabled(tmpdir):
+    items = [{'count': 1}]
+    app = build_streaming_app(
+        tmpdir, items,
+        **{'pyramid_swagger.enable_response_validation': False}
+    )
+
+    assert app.get('/items').json == items
+
+
+def test_streaming_renderer_rejects_unknown_policy():
+    with pytest.raises(ValueError):
+        renderer.PyramidSwaggerStreamingRendererFactory(on_invalid_item='drop')
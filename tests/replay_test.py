@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import json
+
+import pytest
+
+from pyramid_swagger.replay import main
+from pyramid_swagger.replay import percentile
+from pyramid_swagger.replay import replay
+
+
+SETTINGS = {
+    'pyramid_swagger.schema_directory': 'tests/sample_schemas/good_app/',
+    'pyramid_swagger.enable_response_validation': True,
+    'pyramid_swagger.record_traffic_path': '/does/not/exist.jsonl',
+}
+
+STANDARD_RESPONSE = json.dumps({'raw_response': 'foo', 'logging_info': {}})
+
+RECORDS = [
+    {
+        'method': 'GET',
+        'path': '/sample/path_arg1/resource?required_arg=a',
+        'route': '/sample/{path_arg}/resource',
+        'operation': 'standard',
+        'status': 200,
+        'response_headers': {'Content-Type': 'application/json'},
+        'response_body': STANDARD_RESPONSE,
+    },
+    {
+        'method': 'GET',
+        'path': '/sample/path_arg3/resource?required_arg=a',
+        'route': '/sample/{path_arg}/resource',
+        'operation': None,
+        'status': None,
+    },
+    {
+        'method': 'POST',
+        'path': '/sample',
+        'route': '/sample',
+        'operation': 'sample_post',
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps({'foo': 'a'}),
+        'status': 200,
+        'response_headers': {'Content-Type': 'application/json'},
+        'response_body': '{}',
+    },
+]
+
+
+def test_percentile():
+    values = list(range(101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([1], 90) == 1
+
+
+def test_replay():
+    report = replay(SETTINGS, RECORDS, iterations=3, measure_allocations=True)
+    summary = report.summary()
+
+    assert summary['requests'] == 9
+    assert summary['requests_per_second'] > 0
+    operations = summary['operations']
+    assert sorted(operations) == [
+        'GET /sample/{path_arg}/resource', 'sample_post', 'standard']
+    assert operations['standard']['requests'] == 3
+    assert operations['standard']['errors'] == 0
+    assert operations['GET /sample/{path_arg}/resource']['errors'] == 3
+    assert operations['sample_post']['p50_ms'] <= operations['sample_post']['p99_ms']
+    assert operations['sample_post']['mean_peak_allocated_bytes'] > 0
+    assert 'sample_post' in report.format()
+
+
+def test_replay_streamed_response():
+    record = dict(
+        RECORDS[0], response_body=None, response_streamed=True)
+
+    summary = replay(SETTINGS, [record], iterations=1).summary()
+
+    assert summary['operations']['standard']['errors'] == 0
+
+
+def test_replay_skips_records_without_request_body():
+    record = dict(RECORDS[2], body=None, body_truncated=True)
+
+    summary = replay(SETTINGS, [RECORDS[0], record], iterations=1).summary()
+
+    assert sorted(summary['operations']) == ['standard']
+
+
+@pytest.mark.parametrize('as_json', [False, True])
+def test_main(tmpdir, capsys, as_json):
+    traffic = tmpdir.join('traffic.jsonl')
+    traffic.write('\n'.join(json.dumps(record) for record in RECORDS))
+
+    config = tmpdir.join('config.ini')
+    config.write(
+        '[app:main]\n'
+        'use = call:tests.acceptance.app:main\n'
+        'pyramid_swagger.schema_directory = tests/sample_schemas/good_app\n'
+    )
+
+    argv = [str(config), str(traffic), '-n', '2']
+    assert main(argv + (['--json'] if as_json else [])) == 0
+
+    out, _ = capsys.readouterr()
+    if as_json:
+        assert json.loads(out)['requests'] == 6
+    else:
+        assert '6 requests in' in out
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import mock
+import pytest
+from bravado_core import response
+from bravado_core.exception import MatchingResponseNotFound
+from bravado_core.spec import Spec
+
+from pyramid_swagger import response_specs
+from pyramid_swagger.response_specs import get_response_spec
+
+
+SPEC_DICT = {
+    'swagger': '2.0',
+    'info': {'title': 'responses', 'version': '1.0'},
+    'paths': {
+        '/with_default': {
+            'get': {
+                'responses': {
+                    '200': {'$ref': '#/responses/ok'},
+                    'default': {'description': 'error'},
+                },
+            },
+        },
+        '/without_default': {
+            'get': {
+                'responses': {'204': {'description': 'no content'}},
+            },
+        },
+    },
+    'responses': {
+        'ok': {'description': 'ok', 'schema': {'type': 'string'}},
+    },
+}
+
+
+@pytest.fixture
+def spec():
+    return Spec.from_dict(SPEC_DICT)
+
+
+def get_op(spec, path):
+    return spec.get_op_for_request('GET', path)
+
+
+@pytest.mark.parametrize('path, status_code', [
+    ('/with_default', 200),
+    ('/with_default', 500),
+    ('/without_default', 204),
+])
+def test_same_as_bravado_core(spec, path, status_code):
+    op = get_op(spec, path)
+    assert get_response_spec(status_code, op) == \
+        response.get_response_spec(status_code, op)
+
+
+def test_response_specs_are_resolved_once_per_status_code(spec):
+    op = get_op(spec, '/with_default')
+    with mock.patch.object(
+        response_specs, '_resolve_response_spec',
+        wraps=response_specs._resolve_response_spec,
+    ) as resolve:
+        first = get_response_spec(200, op)
+        assert get_response_spec(200, op) is first
+        get_response_spec(500, op)
+    assert resolve.call_count == 2
+
+
+def test_missing_response_spec_is_cached(spec):
+    op = get_op(spec, '/without_default')
+    with mock.patch.object(
+        response_specs, '_resolve_response_spec',
+        wraps=response_specs._resolve_response_spec,
+    ) as resolve:
+        for _ in range(2):
+            with pytest.raises(MatchingResponseNotFound):
+                get_response_spec(200, op)
+    assert resolve.call_count == 1
+
+
+def test_reloaded_spec_gets_its_own_table(spec):
+    get_response_spec(200, get_op(spec, '/with_default'))
+    reloaded_spec = Spec.from_dict(SPEC_DICT)
+    op = get_op(reloaded_spec, '/with_default')
+    assert get_response_spec(200, op) is \
+        reloaded_spec.deref(op.op_spec['responses']['200'])
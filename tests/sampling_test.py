@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import random
+
+import pytest
+import simplejson
+from bravado_core.spec import Spec
+from jsonschema.exceptions import ValidationError
+from pyramid.response import Response
+
+from pyramid_swagger.exceptions import ResponseValidationError
+from pyramid_swagger.sampling import get_sample_size
+from pyramid_swagger.sampling import sample_items
+from pyramid_swagger.sampling import validate_response_body_sampled
+from pyramid_swagger.tween import PyramidSwaggerResponse
+from tests.acceptance.response20_test import validate_array_response
+
+
+ITEM = {
+    'type': 'object',
+    'required': ['id'],
+    'properties': {'id': {'type': 'integer'}},
+}
+
+
+@pytest.fixture
+def spec():
+    return Spec.from_dict({
+        'swagger': '2.0',
+        'info': {'title': 'sampling', 'version': '1.0'},
+        'produces': ['application/json'],
+        'paths': {
+            '/list': {
+                'get': {
+                    'responses': {'200': {'description': 'ok', 'schema': {
+                        'type': 'array', 'minItems': 1, 'items': ITEM,
+                    }}},
+                },
+            },
+            '/envelope': {
+                'get': {
+                    'responses': {'200': {'description': 'ok', 'schema': {
+                        'type': 'object',
+                        'required': ['total'],
+                        'x-validation-sample-size': 5,
+                        'properties': {
+                            'total': {'type': 'integer'},
+                            'items': {'type': 'array', 'items': ITEM},
+                        },
+                    }}},
+                },
+            },
+        },
+    })
+
+
+def validate(spec, path, body, sample_size=2):
+    op = spec.get_op_for_request('GET', path)
+    response = PyramidSwaggerResponse(Response(
+        body=simplejson.dumps(body),
+        headers={'Content-Type': 'application/json; charset=UTF-8'},
+    ))
+    return validate_response_body_sampled(
+        op, op.op_spec['responses']['200'], response, sample_size)
+
+
+def test_sample_items():
+    items = list(range(100))
+    assert sample_items(items[:10], 5) == (items[:10], 0)
+
+    sampled, skipped = sample_items(items, 5, random.Random(0))
+    assert skipped == 90
+    assert sampled[:5] == items[:5]
+    assert len(set(sampled[5:])) == 5
+    assert all(item >= 5 for item in sampled[5:])
+
+
+def test_get_sample_size(spec):
+    responses = spec.spec_dict['paths']
+    assert get_sample_size(spec, responses['/list']['get']['responses']['200']) is None
+    assert get_sample_size(
+        spec, responses['/list']['get']['responses']['200'], default=3) == 3
+    assert get_sample_size(
+        spec, responses['/envelope']['get']['responses']['200'], default=3) == 5
+
+
+def test_sampled_array_response(spec):
+    assert validate(spec, '/list', [{'id': 1}] * 10) == 6
+    assert validate(spec, '/list', [{'id': 1}] * 3) == 0
+    # Only a sample of the items is validated
+    assert validate(spec, '/list', [{'id': 1}] * 100 + [{'id': 'x'}], 0) == 101
+
+    with pytest.raises(ValidationError):
+        validate(spec, '/list', [{'id': 'x'}] + [{'id': 1}] * 10)
+    with pytest.raises(ValidationError):
+        validate(spec, '/list', [])
+
+
+def test_sampled_envelope_response(spec):
+    assert validate(spec, '/envelope', {'total': 1, 'items': [{'id': 1}] * 20}, 5) == 10
+    assert validate(spec, '/envelope', {'total': 1}) == 0
+
+    with pytest.raises(ValidationError):
+        validate(spec, '/envelope', {'total': 'x', 'items': [{'id': 1}] * 20})
+    with pytest.raises(ValidationError):
+        validate(spec, '/envelope', {'total': 1, 'items': [{}]})
+    with pytest.raises(ValidationError):
+        validate(spec, '/envelope', {'total': 1, 'items': {}})
+
+
+@pytest.mark.parametrize('backend', ['interpreted', 'compiled'])
+def test_response_validation_sample_routes(backend):
+    body = [{'enum_value': 'good_enum_value'}] * 10 + [{'enum_value': 'bad'}]
+    with pytest.raises(ResponseValidationError):
+        validate_array_response(
+            body, **{'pyramid_swagger.validation_backend': backend})
+
+    request = validate_array_response(body, **{
+        'pyramid_swagger.validation_backend': backend,
+        'pyramid_swagger.response_validation_sample_routes': [
+            '/sample_array_response'],
+        'pyramid_swagger.response_validation_sample_size': 0,
+    })
+    assert request.environ['pyramid_swagger.skipped_response_items'] == 11
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import threading
+
+import pytest
+
+from pyramid_swagger.stats import histogram_percentile
+from pyramid_swagger.stats import LATENCY_BUCKETS
+from pyramid_swagger.stats import OperationStats
+from pyramid_swagger.stats import ValidationStats
+from tests.acceptance.request_test import build_test_app
+
+
+def test_histogram_percentile():
+    stats = OperationStats()
+    assert histogram_percentile(stats.request_seconds, 50) is None
+
+    for _ in range(100):
+        stats.observe('request_seconds', 0.0002)
+    stats.observe('request_seconds', 10)
+    assert LATENCY_BUCKETS[0] < histogram_percentile(stats.request_seconds, 50) <= \
+        LATENCY_BUCKETS[1]
+    assert histogram_percentile(stats.request_seconds, 100) == LATENCY_BUCKETS[-1]
+    assert stats.request_seconds_sum == pytest.approx(10.02)
+
+
+def test_stats_are_merged_across_threads():
+    stats = ValidationStats()
+
+    def record():
+        for _ in range(1000):
+            operation_stats = stats.get('op')
+            operation_stats.requests += 1
+            operation_stats.observe('request_seconds', 0.001)
+        stats.get('other').responses += 1
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    merged = stats.merged()
+    assert merged['op'].requests == 8000
+    assert sum(merged['op'].request_seconds) == 8000
+    assert merged['other'].responses == 8
+
+
+@pytest.fixture
+def test_app():
+    return build_test_app(
+        swagger_versions=['2.0'],
+        **{
+            'pyramid_swagger.enable_stats': 'true',
+            'pyramid_swagger.enable_response_validation': True,
+        }
+    )
+
+
+def test_stats_endpoint(test_app):
+    test_app.get('/sample/path_arg1/resource', params={'required_arg': 'a'})
+    test_app.get('/sample/path_arg3/resource', params={'required_arg': 'a'},
+                 status=400)
+    test_app.post_json('/sample', {'foo': 'a'})
+
+    operations = test_app.get('/_stats').json['operations']
+    standard = operations['standard']
+    assert standard['requests'] == 2
+    assert standard['request_failures'] == 1
+    assert standard['responses'] == 1
+    assert standard['response_failures'] == 0
+    assert standard['response_bytes'] > 0
+    assert standard['request_p50_ms'] > 0
+    assert operations['sample_post']['request_bytes'] == len('{"foo": "a"}')
+
+
+def test_stats_endpoint_prometheus(test_app):
+    test_app.get('/sample/path_arg1/resource', params={'required_arg': 'a'})
+
+    response = test_app.get('/_stats', params={'format': 'prometheus'})
+    assert response.content_type == 'text/plain'
+    lines = response.text.splitlines()
+    assert '# TYPE pyramid_swagger_requests_total counter' in lines
+    assert 'pyramid_swagger_requests_total{operation="standard"} 1' in lines
+    assert 'pyramid_swagger_request_seconds_bucket{operation="standard",le="+Inf"} 1' \
+        in lines
+    assert 'pyramid_swagger_request_seconds_count{operation="standard"} 1' in lines
+
+
+def test_stats_endpoint_under_api_docs_base_path():
+    test_app = build_test_app(
+        swagger_versions=['2.0'],
+        **{
+            'pyramid_swagger.enable_stats': 'true',
+            'pyramid_swagger.base_path_api_docs': '/docs/',
+            'pyramid_swagger.exclude_paths': [],
+        }
+    )
+    test_app.get('/sample/path_arg1/resource', params={'required_arg': 'a'})
+
+    operations = test_app.get('/docs/_stats').json['operations']
+    assert operations['standard']['requests'] == 1
+    test_app.get('/docs/swagger.json')
+
+
+def test_stats_are_disabled_by_default():
+    test_app = build_test_app(swagger_versions=['2.0'])
+    test_app.get('/_stats', status=404)
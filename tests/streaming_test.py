@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import io
+import json
+
+import pytest
+from bravado_core.exception import SwaggerMappingError
+from bravado_core.request import unmarshal_request
+from bravado_core.spec import Spec
+from jsonschema.exceptions import ValidationError
+from pyramid.request import Request
+
+from pyramid_swagger.streaming import get_stream_body_min_size
+from pyramid_swagger.streaming import JSONStreamParser
+from pyramid_swagger.streaming import unmarshal_request_streaming
+from pyramid_swagger.tween import PyramidSwaggerRequest
+from tests.acceptance.request_test import build_test_app
+
+
+SPEC_DICT = {
+    'swagger': '2.0',
+    'info': {'title': 'streaming', 'version': '1.0'},
+    'paths': {
+        '/array': {
+            'post': {
+                'parameters': [
+                    {'in': 'query', 'name': 'q', 'type': 'integer'},
+                    {
+                        'in': 'body', 'name': 'body', 'required': True,
+                        'schema': {
+                            'type': 'array', 'maxItems': 3, 'uniqueItems': True,
+                            'items': {'$ref': '#/definitions/item'},
+                        },
+                    },
+                ],
+                'responses': {'200': {'description': 'ok'}},
+            },
+        },
+        '/object': {
+            'post': {
+                'parameters': [
+                    {
+                        'in': 'body', 'name': 'body', 'required': False,
+                        'schema': {
+                            'type': 'object',
+                            'required': ['items'],
+                            'additionalProperties': False,
+                            'properties': {
+                                'name': {'type': 'string'},
+                                'items': {
+                                    'type': 'array', 'minItems': 1,
+                                    'items': {'$ref': '#/definitions/item'},
+                                },
+                            },
+                        },
+                    },
+                ],
+                'responses': {'200': {'description': 'ok'}},
+            },
+        },
+    },
+    'definitions': {
+        'item': {
+            'type': 'object',
+            'required': ['id'],
+            'properties': {
+                'id': {'type': 'integer'},
+                'date': {'type': 'string', 'format': 'date'},
+            },
+        },
+    },
+}
+
+
+@pytest.fixture
+def spec():
+    return Spec.from_dict(SPEC_DICT, config={'use_models': False})
+
+
+def parse(document, chunk_size):
+    return JSONStreamParser(
+        io.BytesIO(document.encode('utf-8')), chunk_size=chunk_size)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 1024])
+@pytest.mark.parametrize('document', [
+    '[]',
+    ' [ 1 , 22.5e3, -333 ] ',
+    '[{"a": [1, {"b": null}]}, "café ☃", true, false, null]',
+    '["\\"]", "\\u2603", 12345678901234567890]',
+    '["\\ud83d\\ude00", -Infinity, NaN, 1e-3]',
+])
+def test_parse_array(document, chunk_size):
+    parser = parse(document, chunk_size)
+    items = []
+    assert parser.parse_array(items.append) == json.loads(document)
+    assert items == json.loads(document)
+    parser.end()
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 1024])
+def test_parse_object(chunk_size):
+    document = '{"items": [1, 2], "name": "x", "other": [3], "items": [4]}'
+    items = []
+    assert parse(document, chunk_size).parse_object(
+        {'items': items.append}) == json.loads(document)
+    assert items == [1, 2, 4]
+
+
+@pytest.mark.parametrize('document', [
+    '', '[', '[1,', '[1 2]', '[1,]', '{"a" 1}', '{1: 2}', 'nul',
+])
+def test_parse_invalid_document(document):
+    parser = parse(document, 2)
+    with pytest.raises(ValueError):
+        if parser.peek() == '{':
+            parser.parse_object({})
+        else:
+            parser.parse_array(lambda item: None)
+
+
+def test_parse_extra_data():
+    parser = parse('[1] 2', 2)
+    parser.parse_array(lambda item: None)
+    with pytest.raises(ValueError):
+        parser.end()
+
+
+def test_parse_array_stops_at_first_invalid_item():
+    def validate_item(item):
+        if item == 2:
+            raise ValidationError('invalid')
+
+    stream = io.BytesIO(b'[1, 2, ' + b'3, ' * 10000 + b'4]')
+    with pytest.raises(ValidationError):
+        JSONStreamParser(stream, chunk_size=16).parse_array(validate_item)
+    assert stream.tell() <= 32
+
+
+@pytest.mark.parametrize('malformed_item', [
+    b'{"a": 1 "b": 2}', b'[1 2]', b'{"a": x}', b'"\\x"', b'tru e',
+])
+def test_parse_array_stops_at_first_malformed_item(malformed_item):
+    stream = io.BytesIO(
+        b'[' + malformed_item + b', ' + b'{"a": 3}, ' * 200000 + b'4]')
+    with pytest.raises(ValueError):
+        JSONStreamParser(stream, chunk_size=16).parse_array(lambda item: None)
+    assert stream.tell() <= 64
+
+
+def build_request(path, body, query_string=''):
+    request = Request.blank(
+        path + '?' + query_string,
+        method='POST',
+        body=body.encode('utf-8'),
+        content_type='application/json',
+    )
+    return PyramidSwaggerRequest(request, {'match': {}})
+
+
+def unmarshal(unmarshal_function, spec, path, body, query_string=''):
+    try:
+        return unmarshal_function(
+            build_request(path, body, query_string),
+            spec.get_op_for_request('POST', path),
+        )
+    except (ValidationError, SwaggerMappingError) as e:
+        return type(e)
+
+
+@pytest.mark.parametrize('path, body', [
+    ('/array', '[{"id": 1}, {"id": 2, "date": "2019-01-01"}]'),
+    ('/array', '[]'),
+    ('/array', '[{"id": 1}, {"id": "2"}]'),
+    ('/array', '[{"id": 1}, {"id": 1}]'),
+    ('/array', '[{"id": 1}, {"id": 2}, {"id": 3}, {"id": 4}]'),
+    ('/array', '[{"id": 1}, {"id": 2, "date": "not a date"}]'),
+    ('/array', '{"id": 1}'),
+    ('/array', 'null'),
+    ('/array', '[{"id": 1}'),
+    ('/array', ''),
+    ('/object', '{"name": "x", "items": [{"id": 1}]}'),
+    ('/object', '{"name": "x", "items": []}'),
+    ('/object', '{"name": "x", "items": [{"id": "1"}]}'),
+    ('/object', '{"name": "x", "items": [{"id": 1}], "extra": 1}'),
+    ('/object', '{"name": "x"}'),
+    ('/object', '{"items": {"id": 1}}'),
+    ('/object', '[]'),
+    ('/object', 'null'),
+    ('/object', '{"items": [}'),
+])
+@pytest.mark.parametrize('query_string', ['', 'q=1', 'q=x'])
+def test_unmarshal_request_streaming_is_unmarshal_request(
+    spec, path, body, query_string,
+):
+    expected = unmarshal(unmarshal_request, spec, path, body, query_string)
+    assert unmarshal(
+        unmarshal_request_streaming, spec, path, body, query_string,
+    ) == expected
+
+
+def test_unmarshal_request_streaming_leaves_body_readable(spec):
+    request = build_request('/array', '[{"id": 1}]')
+    unmarshal_request_streaming(request, spec.get_op_for_request('POST', '/array'))
+    assert request.request.json_body == [{'id': 1}]
+
+
+def test_get_stream_body_min_size():
+    assert get_stream_body_min_size({}) is None
+    assert get_stream_body_min_size(
+        {'pyramid_swagger.stream_request_body_min_size': '0'}) == 0
+
+
+def test_streamed_request_body():
+    test_app = build_test_app(
+        swagger_versions=['2.0'],
+        **{'pyramid_swagger.stream_request_body_min_size': '0'}
+    )
+    test_app.post_json('/post_with_primitive_body', ['a', 'b'])
+    test_app.post_json('/post_with_primitive_body', ['a', 1], status=400)
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import os.path
+
+from swagger_spec_validator import validator12
+
+from pyramid_swagger.ingest import get_swagger_spec
+from pyramid_swagger.replay import replay
+from pyramid_swagger.synthetic import benchmark_scaling
+from pyramid_swagger.synthetic import format_scaling
+from pyramid_swagger.synthetic import generate_requests
+from pyramid_swagger.synthetic import generate_spec_settings
+from pyramid_swagger.synthetic import generate_swagger20_spec
+from pyramid_swagger.synthetic import get_path
+from pyramid_swagger.synthetic import growth_exponent
+from pyramid_swagger.synthetic import main
+
+
+def test_generate_swagger20_spec_spreads_models_across_files():
+    documents = generate_swagger20_spec(paths=4, models=7, files=3, fan_out=2)
+
+    assert list(documents) == [
+        'swagger.json', 'models0.json', 'models1.json', 'models2.json',
+    ]
+    assert documents['swagger.json']['definitions'] == {}
+    # Model0 refers to Model1 and Model2, in other files
+    assert documents['models0.json']['Model0']['properties']['model1'] == \
+        {'$ref': 'models1.json#/Model1'}
+    assert documents['models0.json']['Model3']['properties'] == {
+        'id': {'type': 'integer'},
+        'name': {'type': 'string'},
+    }
+    assert len(documents['swagger.json']['paths']) == 4
+
+
+def test_generated_swagger20_spec_validates_requests(tmpdir):
+    settings = generate_spec_settings(
+        str(tmpdir), '2.0', paths=30, models=10, files=3, recursive=True,
+        schema_format='yaml',
+    )
+    spec = get_swagger_spec(settings)
+    assert len(spec.spec_dict['paths']) == 30
+
+    report = replay(settings, generate_requests(30, 20),
+                    routes=[get_path(index) for index in range(30)])
+    assert report.requests == 20
+    assert not report.errors
+
+
+def test_generated_swagger12_spec_is_valid(tmpdir):
+    generate_spec_settings(
+        str(tmpdir), '1.2', paths=30, models=10, files=3, recursive=True)
+
+    validator12.validate_spec_url(
+        'file://' + os.path.join(str(tmpdir), 'api_docs.json'))
+
+
+def test_growth_exponent():
+    assert growth_exponent([10], [1.0]) is None
+    assert growth_exponent([10, 100], [1.0, 10.0]) == 1.0
+    assert growth_exponent([10, 100], [1.0, 100.0]) == 2.0
+
+
+def test_benchmark_scaling():
+    rows = benchmark_scaling(sizes=[5, 10], requests=5)
+
+    assert [row['paths'] for row in rows] == [5, 10]
+    assert rows[0]['startup_seconds_exponent'] is None
+    assert rows[1]['memory_bytes_exponent'] > 0
+    assert rows[1]['request_seconds'] > 0
+    assert format_scaling(rows).splitlines()[2].split()[0] == '10'
+
+
+def test_main_generate(tmpdir):
+    assert main(['--files', '2', '--models', '4', 'generate', str(tmpdir), '--paths', '5']) == 0
+    assert sorted(os.listdir(str(tmpdir))) == [
+        'models0.json', 'models1.json', 'swagger.json',
+    ]
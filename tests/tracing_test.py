@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import pytest
+
+from pyramid_swagger.tracing import noop_span
+from pyramid_swagger.tracing import SPAN_HANDLER
+from pyramid_swagger.tracing import SPAN_OP_FOR_REQUEST
+from pyramid_swagger.tracing import SPAN_REQUEST
+from pyramid_swagger.tracing import SPAN_RESPONSE
+from pyramid_swagger.tracing import Tracer
+from tests.acceptance.request_test import build_test_app
+
+
+class RecordingTracer(Tracer):
+
+    def __init__(self):
+        self.spans = []
+
+    def start_span(self, name, request):
+        return name
+
+    def finish_span(self, span, tags):
+        self.spans.append((span, tags))
+
+
+recording_tracer = RecordingTracer()
+
+
+@pytest.fixture
+def test_app():
+    del recording_tracer.spans[:]
+    return build_test_app(
+        swagger_versions=['2.0'],
+        **{
+            'pyramid_swagger.tracer': 'tests.tracing_test.recording_tracer',
+            'pyramid_swagger.enable_response_validation': True,
+        }
+    )
+
+
+def test_phases_are_traced(test_app):
+    test_app.post_json('/sample', {'foo': 'a'})
+
+    assert [name for name, _ in recording_tracer.spans] == [
+        SPAN_OP_FOR_REQUEST, SPAN_REQUEST, SPAN_HANDLER, SPAN_RESPONSE,
+    ]
+    for _, tags in recording_tracer.spans:
+        assert tags['operation_id'] == 'sample_post'
+        assert tags['outcome'] == 'ok'
+    assert recording_tracer.spans[1][1]['body_bytes'] == len('{"foo": "a"}')
+    assert recording_tracer.spans[3][1]['body_bytes'] > 0
+
+
+def test_invalid_request_is_traced(test_app):
+    test_app.get('/sample/path_arg3/resource', params={'required_arg': 'a'},
+                 status=400)
+
+    assert [(name, tags['outcome']) for name, tags in recording_tracer.spans] == [
+        (SPAN_OP_FOR_REQUEST, 'ok'),
+        (SPAN_REQUEST, 'invalid'),
+    ]
+
+
+def test_tracer_class_is_instantiated():
+    test_app = build_test_app(
+        swagger_versions=['2.0'],
+        **{'pyramid_swagger.tracer': 'pyramid_swagger.tracing.Tracer'}
+    )
+    test_app.get('/sample/path_arg1/resource', params={'required_arg': 'a'})
+
+
+def test_noop_span_is_shared_and_propagates_errors():
+    assert noop_span(SPAN_REQUEST, None) is noop_span(SPAN_HANDLER, None)
+    with noop_span(SPAN_REQUEST, None, operation_id='op') as tags:
+        tags['body_bytes'] = 1
+    with pytest.raises(ValueError):
+        with noop_span(SPAN_REQUEST, None):
+            raise ValueError()
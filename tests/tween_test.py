@@ -20,6 +20,7 @@ from pyramid_swagger.exceptions import ResponseValidationError
 from pyramid_swagger.load_schema import SchemaValidator
 from pyramid_swagger.load_schema import ValidatorMap
 from pyramid_swagger.model import PathNotMatchedError
+from pyramid_swagger.tween import cast_request_param
 from pyramid_swagger.tween import DEFAULT_EXCLUDED_PATHS
 from pyramid_swagger.tween import get_exclude_paths
 from pyramid_swagger.tween import get_op_for_request
@@ -284,6 +285,24 @@ def test_validaton_error_decorator_transforms_SwaggerMappingError():
     assert 'kaboom' in str(excinfo.value)
 
 
+def test_validation_error_message_is_formatted_when_read():
+    child = SwaggerMappingError('kaboom')
+
+    @validation_error(RequestValidationError)
+    def foo():
+        raise child
+
+    with mock.patch.object(
+        SwaggerMappingError, '__str__', autospec=True, return_value='kaboom',
+    ) as to_str:
+        with pytest.raises(RequestValidationError) as excinfo:
+            foo()
+        assert not to_str.called
+        assert excinfo.value.detail == 'kaboom'
+        assert excinfo.value.message == 'kaboom'
+    assert to_str.call_count == 1
+
+
 def test_validation_error_includes_child():
 
     @validation_error(RequestValidationError)
@@ -419,3 +438,18 @@ def test_empty_response_properties():
     assert response.text is None
     assert "foobar" == response.headers["X-Some-Special-Header"]
     assert response.content_type is None
+
+
+def test_cast_request_param_failure_is_a_warning():
+    with mock.patch('pyramid_swagger.tween.log') as log:
+        assert cast_request_param('integer', 'count', 'many') == 'many'
+    assert log.warn.call_count == 1
+
+
+def test_cast_request_param_failure_is_counted_in_the_event_log():
+    event_log = mock.Mock()
+    with mock.patch('pyramid_swagger.tween.log') as log:
+        assert cast_request_param(
+            'integer', 'count', 'many', event_log) == 'many'
+    assert not log.warn.called
+    event_log.record.assert_called_once_with(None, 'cast_failure')
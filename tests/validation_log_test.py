@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import logging
+import time
+
+import mock
+import pytest
+
+from pyramid_swagger.tween import SwaggerHandler
+from pyramid_swagger.validation_log import build_validation_event_log
+from pyramid_swagger.validation_log import SLOW_REQUEST_VALIDATION
+from pyramid_swagger.validation_log import ValidationEventLog
+from tests.acceptance.request_test import build_test_app
+
+
+def test_build_validation_event_log_disabled_by_default():
+    assert build_validation_event_log({}) is None
+
+
+def test_events_are_aggregated_per_interval():
+    logger = mock.Mock(isEnabledFor=mock.Mock(return_value=True))
+    event_log = ValidationEventLog(interval=3600, logger=logger)
+    for _ in range(1000):
+        event_log.record('op', 'RequestValidationError')
+    event_log.record(None, 'ResponseValidationError')
+    assert not logger.warning.called
+
+    event_log.flush()
+    assert [call[0][:3] for call in logger.warning.call_args_list] == [
+        ('%d %s for operation %s in the last %.0fs', 1, 'ResponseValidationError'),
+        ('%d %s for operation %s in the last %.0fs', 1000, 'RequestValidationError'),
+    ]
+    assert logger.warning.call_args[1]['extra']['operation_id'] == 'op'
+    assert event_log.counts == {}
+
+
+def test_counts_are_logged_when_the_interval_ends():
+    logger = mock.Mock(isEnabledFor=mock.Mock(return_value=True))
+    event_log = ValidationEventLog(interval=0.05, logger=logger)
+    event_log.record('op', 'RequestValidationError')
+    event_log.record('op', 'RequestValidationError')
+    assert not logger.warning.called
+
+    deadline = time.monotonic() + 5
+    while not logger.warning.called and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert logger.warning.call_args[0][1:3] == (2, 'RequestValidationError')
+    assert event_log.counts == {}
+
+
+def test_request_handlers_count_cast_failures():
+    swagger_handler = SwaggerHandler(
+        op_for_request=None,
+        handle_request=mock.Mock(),
+        handle_response=mock.Mock(),
+    )
+    event_log = ValidationEventLog(interval=3600)
+    wrapped = event_log.wrap_handler(swagger_handler)
+    wrapped.handle_request('request', 'op')
+    swagger_handler.handle_request.assert_called_once_with(
+        'request', 'op', event_log=event_log)
+    wrapped.handle_response('response', 'op')
+    swagger_handler.handle_response.assert_called_once_with('response', 'op')
+
+
+def test_disabled_logger_formats_nothing():
+    logger = mock.Mock(isEnabledFor=mock.Mock(return_value=False))
+    event_log = ValidationEventLog(interval=0, logger=logger)
+    event_log.record('op', 'RequestValidationError')
+    assert not logger.warning.called
+
+
+@pytest.fixture
+def test_app():
+    return build_test_app(
+        swagger_versions=['2.0'],
+        **{
+            'pyramid_swagger.log_validation_failures': 'true',
+            'pyramid_swagger.slow_validation_threshold_ms': '0',
+            'pyramid_swagger.validation_log_interval': '0',
+        }
+    )
+
+
+def test_failed_and_slow_validations_are_logged(test_app, caplog):
+    with caplog.at_level(logging.WARNING, 'pyramid_swagger.validation_log'):
+        test_app.get('/sample/path_arg3/resource', params={'required_arg': 'a'},
+                     status=400)
+
+    events = [(record.operation_id, record.event) for record in caplog.records]
+    assert ('standard', 'RequestValidationError') in events
+    assert ('standard', SLOW_REQUEST_VALIDATION) in events
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import mock
+import pytest
+from six import itervalues
+
+from pyramid_swagger.ingest import compile_swagger_schema
+from pyramid_swagger.ingest import get_resource_listing
+from pyramid_swagger.ingest import get_swagger_spec
+from pyramid_swagger.warmup import start_warm_up_thread
+from pyramid_swagger.warmup import warm_up
+
+
+def get_lazy_swagger_schema(schema_dir='tests/sample_schemas/good_app/'):
+    return compile_swagger_schema(
+        schema_dir,
+        get_resource_listing(schema_dir, False),
+        lazy_validators=True,
+    )
+
+
+def all_validator_maps(schema):
+    return [
+        validator_map
+        for resource_validator in schema.resource_validators
+        for validator_map in itervalues(resource_validator)
+    ]
+
+
+@pytest.yield_fixture(autouse=True)
+def mock_from_operation():
+    # Building Swagger 1.2 validators is broken with recent jsonschema
+    # versions, we only care about when they get built.
+    with mock.patch(
+        'pyramid_swagger.load_schema.ValidatorMap.from_operation',
+    ) as _mock:
+        yield _mock
+
+
+def test_warm_up_builds_lazy_validator_maps():
+    schema12 = get_lazy_swagger_schema()
+    assert not any(vm.is_built for vm in all_validator_maps(schema12))
+
+    warm_up({'pyramid_swagger.schema12': schema12})
+
+    assert all(vm.is_built for vm in all_validator_maps(schema12))
+
+
+def test_warm_up_builds_swagger_20_operation_state():
+    spec = get_swagger_spec({
+        'pyramid_swagger.schema_directory': 'tests/sample_schemas/good_app/',
+    })
+    warm_up({'pyramid_swagger.schema20': spec})
+
+    assert spec._request_to_op_map
+    op = spec.get_op_for_request('GET', '/sample/{path_arg}/resource')
+    assert 'security_requirements' in op.__dict__
+
+
+def test_start_warm_up_thread_disabled_by_default():
+    event = mock.Mock()
+    event.app.registry.settings = {}
+    assert start_warm_up_thread(event) is None
+
+
+def test_start_warm_up_thread():
+    schema12 = get_lazy_swagger_schema()
+    event = mock.Mock()
+    event.app.registry.settings = {
+        'pyramid_swagger.warm_up_validators': 'true',
+        'pyramid_swagger.schema12': schema12,
+    }
+
+    start_warm_up_thread(event).join()
+
+    assert all(vm.is_built for vm in all_validator_maps(schema12))